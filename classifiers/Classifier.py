@@ -41,6 +41,7 @@ cyan_err('import Classifier')
 
 import copy
 import numpy as np
+import scipy.sparse
 from myrepr import myrepr
 
 
@@ -70,6 +71,14 @@ class Classifier:
     of testing feature, and the vector of testing labels,
     respectively.
 
+    The features are kept in 'self._vftr' and 'self._vfte' as
+    read-only 2-D float arrays: contiguous float arrays are not
+    copied, only viewed.  A classifier whose backend needs lists of
+    lists must set the class attribute '_list_features' to 'True'.  A
+    classifier that accepts scipy sparse matrices sets
+    '_sparse_features' to 'True', and keeps them as CSR matrices.  The
+    labels are kept as lists.
+
     In fitting step (in the call of 'fit(self, vftr, vltr)'), the
     'simple__gridsearch__(self)' function is called if
     'self._gridsearch' is defined 'False' in 'simple__init__()'
@@ -78,6 +87,9 @@ class Classifier:
     implementation of 'simple__gridsearch__(self)' as a form of
     assertion.
     """
+    _list_features = False
+    _sparse_features = False
+
     def __save__(self, path):
         self.simple__save__(path)
 
@@ -144,13 +156,10 @@ class Classifier:
         """
         assert not self._trained
 
-        self._vftr = vftr.tolist() if isinstance(vftr, np.ndarray) else copy.deepcopy(vftr)
-        self._vltr = vltr.tolist() if isinstance(vltr, np.ndarray) else copy.deepcopy(vltr)
+        self._vftr = self._features(vftr)
+        self._vltr = vltr.tolist() if isinstance(vltr, np.ndarray) else list(vltr)
 
-        assert isinstance(self._vftr, list)
-        assert isinstance(self._vltr, list)
-        assert len(self._vftr) == len(self._vltr)
-        assert len(set(map(len, self._vftr))) == 1
+        assert self._samples(self._vftr) == len(self._vltr)
 
         self._acs = list(set(filter(lambda label: label is not None,
                                     self._vltr)))
@@ -177,16 +186,13 @@ class Classifier:
         """
         assert self._trained
 
-        self._vfte = vfte.tolist() if isinstance(vfte, np.ndarray) else copy.deepcopy(vfte)
+        self._vfte = self._features(vfte)
         if vlte is not None:
-            self._vlte = vlte.tolist() if isinstance(vlte, np.ndarray) else copy.deepcopy(vlte)
+            self._vlte = vlte.tolist() if isinstance(vlte, np.ndarray) else list(vlte)
         else:
-            self._vlte = [None] * len(self._vfte)
+            self._vlte = [None] * self._samples(self._vfte)
 
-        assert isinstance(self._vfte, list)
-        assert isinstance(self._vlte, list)
-        assert len(self._vfte) == len(self._vlte)
-        assert len(set(map(len, self._vfte))) == 1
+        assert self._samples(self._vfte) == len(self._vlte)
 
         assert self._unknown_label not in self._vlte
         assert all([label in self._acs
@@ -205,6 +211,37 @@ class Classifier:
 
         return ret
 
+    def _features(self, vf):
+        """
+        Input:
+        vf = feature vectors, as a 2-D array or as a list of lists.
+
+        Output:
+        Read-only 2-D float array of 'vf', sharing the memory of 'vf'
+        when it already is a contiguous float array, or a list of lists
+        if '_list_features' is 'True'.  A sparse 'vf' is kept as a CSR
+        matrix if '_sparse_features' is 'True'.
+        """
+        if self._sparse_features and scipy.sparse.issparse(vf):
+            return scipy.sparse.csr_matrix(vf, dtype=np.float64)
+
+        ret = np.ascontiguousarray(vf, dtype=np.float64)
+        assert ret.ndim == 2
+
+        if self._list_features:
+            return ret.tolist()
+
+        ret = ret.view()
+        ret.flags.writeable = False
+        return ret
+
+    def _samples(self, vf):
+        """
+        Number of samples of the features 'vf', which may be a sparse
+        matrix.
+        """
+        return vf.shape[0] if scipy.sparse.issparse(vf) else len(vf)
+
     def copy(self):
         """
         See doc of 'Classifier' class.
@@ -234,8 +271,8 @@ class Classifier:
         See doc of 'Classifier' class.
         """
         assert not self._trained
-        assert self._vftr
-        assert self._vltr
+        assert self._samples(self._vftr) > 0
+        assert len(self._vltr) > 0
         assert self._unknown_label not in self._acs
 
     def simpleclassify(self, auxiliar=None):
@@ -245,5 +282,5 @@ class Classifier:
         This function must return 'None' for unknown samples.
         """
         assert self._trained
-        assert self._vfte
-        assert self._vlte
+        assert self._samples(self._vfte) > 0
+        assert len(self._vlte) > 0
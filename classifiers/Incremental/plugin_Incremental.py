@@ -0,0 +1,186 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+#Python imports
+import os
+import sys
+import numpy
+from sklearn.externals import joblib
+from sklearn import linear_model
+from sklearn import naive_bayes
+
+#Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+import common
+
+#CONSTANTS
+POS_CLASSES = 0
+POS_FV = 1
+INDEX_ZERO = 0
+
+"""
+Incremental classifiers, trained with partial_fit on batches of the training
+set. The framework reads the batches from the file of the split, so the
+training set is never loaded whole in memory (classify.classify_file), except
+when the features are already in memory (classify below).
+"""
+
+def new_model(parameters):
+    """
+    Untrained classifier of the parameter "Model", seeded by the parameter
+    "Seed".
+    """
+    
+    model = parameters["Model"]
+    seed = int(parameters.get("Seed", 0))
+    if model == "SGD hinge":
+        return linear_model.SGDClassifier(loss="hinge", random_state=seed)
+    elif model == "SGD log":
+        return linear_model.SGDClassifier(loss="log", random_state=seed)
+    elif model == "Naive Bayes":
+        return naive_bayes.GaussianNB()
+    elif model == "Passive-Aggressive":
+        return linear_model.PassiveAggressiveClassifier(random_state=seed)
+    else:
+        raise ValueError("Unknown incremental classifier: %s" % model)
+
+def new_random_state(parameters):
+    """
+    Random number generator of the order of the training set, seeded by the
+    parameter "Seed".
+    """
+    
+    return numpy.random.RandomState(int(parameters.get("Seed", 0)))
+
+def partial_fit(list_fv, list_classes, parameters, model, num_classes,
+                random_state=None):
+    """
+    Fits the model (a new one if None) with a batch of the training set, in
+    the random order of random_state, and returns it.
+    
+    The classes of list_classes are indexes of the num_classes classes of the
+    classifier.  The same random_state must be given for all the batches of a
+    fit, so the order differs between batches and epochs but not between
+    executions with the same "Seed".
+    """
+    
+    if model is None:
+        model = new_model(parameters)
+    if random_state is None:
+        random_state = new_random_state(parameters)
+    
+    order = random_state.permutation(len(list_fv))
+    model.partial_fit(list_fv[order], list_classes[order],
+                      classes=numpy.arange(num_classes))
+    
+    return model
+
+def save_model(model, pos_fold):
+    """
+    Saves the model and returns the paths of its files.
+    """
+    
+    temp_path = common.tempFolder()
+    model_path = os.path.join(temp_path, "iteration:" + str(iteration) + \
+            "-Incremental_" + str(pos_fold) + ".model")
+    
+    return joblib.dump(model, model_path)
+
+def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
+        parameters):
+    """
+    Performs the classification of the test_set according to the train_set,
+    with the feature vectors already in memory.
+    """
+    
+    print "Classification: Incremental", parameters["Model"]
+    
+    batch_size = int(parameters["Batch size"])
+    epochs = int(parameters["Epochs"])
+    
+    #Train and test matrices, with the classes of the training set encoded
+    #as indexes of the classes of the experiment
+    classes, list_train, list_train_class, list_test, list_test_class = \
+            common.foldMatrices(images, classes_list, train_set, test_set)
+    print "List of classes of this experiment:", classes
+    
+    #Fit, one batch of the training set at a time, with the training set in a
+    #new random order in each epoch
+    print "\tFit: Beginning"
+    model = None
+    random_state = new_random_state(parameters)
+    for epoch in range(epochs):
+        order = random_state.permutation(len(train_set))
+        for begin in range(0, len(train_set), batch_size):
+            batch = order[begin:begin + batch_size]
+            model = partial_fit(list_train[batch], list_train_class[batch],
+                                parameters, model, len(classes),
+                                random_state)
+    print "\tFit: Done!"
+    
+    model_paths = save_model(model, pos_fold)
+    
+    #Predict, one batch of the testing set at a time
+    print "\tPredict: Beginning"
+    list_img = test_set
+    list_predict = []
+    for begin in range(0, len(test_set), batch_size):
+        list_predict.extend(predict(model, list_test[begin:begin + batch_size],
+                                    parameters))
+    print "\tPredict: Done"
+    
+    list_result = common.oneHot(list_predict, len(classes)).tolist()
+    
+    return list_img, list_test_class, list_result, classes, \
+           model_paths
+
+def load_model(model_paths, parameters):
+    """
+    Loads the model saved by classify, given the paths of its files, with its
+    arrays memory-mapped.
+    """
+    
+    return joblib.load(model_paths[INDEX_ZERO], mmap_mode='r')
+
+def predict(model, list_fv, parameters):
+    """
+    Predicts the classes of the feature vectors in list_fv with a model
+    loaded by load_model, as indexes of the classes of the classifier.
+    """
+    
+    return map(int, model.predict(list_fv))
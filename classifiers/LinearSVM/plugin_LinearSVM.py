@@ -0,0 +1,166 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+#Python imports
+import os
+import sys
+import numpy
+import scipy.sparse
+from sklearn.externals import joblib
+from subprocess import call
+
+#Framework Imports
+dirname = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+sys.path.append(dirname)
+SVM_path = os.path.join(dirname, 'SVM')
+sys.path.append(SVM_path)
+call(["./prepareLibSVM.sh", "clean"], cwd="{0}".format(SVM_path))
+call(["./prepareLibSVM.sh"], cwd="{0}".format(SVM_path))
+call(["./prepareLib1VS.sh", "clean"], cwd="{0}".format(SVM_path))
+call(["./prepareLib1VS.sh"], cwd="{0}".format(SVM_path))
+import common
+import SVM
+import LinearSVM
+
+#CONSTANTS
+INDEX_ZERO = 0
+#Fraction of nonzero features below which the features are given to
+#LIBLINEAR as a sparse matrix
+SPARSE_DENSITY = 0.1
+
+def svm_search(string):
+    """
+    Function to translate the string of the hyperparameter search to a string
+    recognized by the plugin.  Experiments without the parameter use the
+    exhaustive grid.
+    """
+    
+    if string == 'Successive Halving':
+        return 'halving'
+    else:
+        return 'grid'
+
+def linear_parameters(parameters):
+    """
+    Parameters of the LinearSVM classifiers from the parameters of the plugin.
+    C is searched when it is not given, or not positive.
+    """
+    
+    result = {'loss': 'logistic' if parameters['Loss'] == 'Logistic'
+                      else 'hinge',
+              'search': svm_search(parameters.get('Search'))}
+    if float(parameters.get('C', 0.0)) > 0.0:
+        result['C'] = float(parameters['C'])
+    return result
+
+def sparse(list_fv):
+    """
+    The feature vectors as a CSR matrix, if few of them are nonzero.
+    """
+    
+    if list_fv.size and \
+            numpy.count_nonzero(list_fv) < SPARSE_DENSITY * list_fv.size:
+        return scipy.sparse.csr_matrix(list_fv)
+    return list_fv
+
+def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
+        parameters):
+    """
+    Performs the classification of the test_set according to the train_set.
+    
+    Linear SVM, or logistic regression, trained by the dual coordinate
+    descent of LIBLINEAR: One vs All by LIBLINEAR itself, or One vs One by a
+    MCBBClassifier of binary linear SVMs.
+    """
+    
+    print "Classification: LinearSVM"
+    
+    #Paths
+    temp_path = common.tempFolder()
+    model_path = os.path.join(temp_path, "iteration:" + str(iteration) + \
+            "-LinearSVM_" + str(pos_fold) + ".model")
+    
+    #Train and test matrices, with the classes of the training set encoded
+    #as indexes of the classes of the experiment
+    classes, list_train, list_train_class, list_test, list_test_class = \
+            common.foldMatrices(images, classes_list, train_set, test_set)
+    list_img = test_set
+    print "List of classes of this experiment:", classes
+    
+    #Classification
+    #--------------------------------------------------------------------------
+    if parameters['Approach'] == 'One vs One':
+        clf = SVM.MCLinearSVM(approach='OVO', **linear_parameters(parameters))
+    else:
+        clf = LinearSVM.LinearSVM(**linear_parameters(parameters))
+        list_train, list_test = sparse(list_train), sparse(list_test)
+    
+    #Fit
+    print "\tFit: Beginning"
+    clf.fit(list_train, list_train_class)
+    print "\tFit: Done!"
+    
+    #Save configuration of the LinearSVM
+    model_paths = joblib.dump(clf, model_path)
+    
+    #Predict
+    print "\tPredict: Beginning"
+    list_predict = clf.classify(list_test)
+    print "\tPredict: Done"
+    
+    list_result = common.oneHot(list_predict, len(classes)).tolist()
+    
+    #--------------------------------------------------------------------------
+    
+    return list_img, list_test_class, list_result, classes, \
+           model_paths
+
+def load_model(model_paths, parameters):
+    """
+    Loads the model saved by classify, given the paths of its files.
+    """
+    
+    return joblib.load(model_paths[INDEX_ZERO])
+
+def predict(model, list_fv, parameters):
+    """
+    Predicts the classes of the feature vectors in list_fv with a model
+    loaded by load_model, as indexes of the classes of the classifier.
+    """
+    
+    return map(int, model.classify(numpy.asarray(list_fv, dtype=float)))
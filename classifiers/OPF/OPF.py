@@ -39,6 +39,7 @@ from termcolor import *
 import sys
 cyan_err('import OPF')
 
+import os
 import hashfile
 import numpy as np
 from scipy.spatial import distance
@@ -51,7 +52,24 @@ from heapq import heappush, heappop, heapify
 import copy
 from Classifier import Classifier
 
+"""
+Memory, in bytes, of the block of distances between test and training
+samples computed at once by 'OPF.simpleclassify', when the number of test
+samples of a block is not given by the 'chunk_size' parameter.
+"""
+CHUNK_MEMORY = 2**27
+
+
 class OPF(Classifier):
+    """
+    Parameters: 'distance', the metric; 'chunk_size', the number of test
+    samples classified at once (default: as many as fit in CHUNK_MEMORY);
+    and 'prune' (default False), to drop the training samples that do
+    not conquer any other training sample, which makes the classification
+    of large training sets faster.  The pruning is approximate: a dropped
+    sample may still be the one that conquers a test sample, so the
+    predictions may differ from those of the complete graph.
+    """
     def simple__init__(self):
 #         assert False            # I don't want to use it.
         self._gridsearch = False
@@ -63,16 +81,60 @@ class OPF(Classifier):
         assert isinstance(self._distance, str)
         #-------
 
+        self._chunk_size = (self._parameters['chunk_size']
+                            if self._parameters.has_key('chunk_size')
+                            else 0)
+        self._prune = (self._parameters['prune']
+                       if self._parameters.has_key('prune')
+                       else False)
+
     def simple__repr__(self):
         return 'OPF'
 
     def simplefit(self):
         Classifier.simplefit(self)
 
+        vftr = np.asarray(self._vftr, dtype=np.float64)
+        metric, metric_kwargs = self._trainingMetric(vftr)
+
+        pred, weight = self.__prim(vftr, metric, metric_kwargs)  # minimum spanning tree
+        prototypes = self.__findPrototypes(pred, self._vltr)
+
+        vltr = np.array(self._vltr)
+        prototypes_labels = vltr[prototypes]
+
+        C, P, L = self.__dijkstra(pred, weight, prototypes, prototypes_labels)
+
+        # Storing data on the self.
+        self.C, self.P, self.L = C, P, L
+        self.vftr, self.vltr = self._vftr, self._vltr
+
+        if self._prune:
+            self.__prune(vftr, prototypes, metric, metric_kwargs)
+
+        assert len(self.vftr) == len(self.L)
+        assert len(self.L) == len(self.C)
+
+    def _trainingMetric(self, vf):
+        """
+        The metric of 'cdist', and its keyword arguments, that gives the
+        distances of 'distance.pdist(vf, self._distance)'.  As before, the
+        distance of the descriptor plugin named 'self._distance' is used if
+        SciPy does not know it, and the euclidean distance if neither does.
+        The variances of 'seuclidean' and 'mahalanobis' are computed from
+        all the samples, as 'pdist' does, and not from each pair of rows
+        given to 'cdist'.
+        """
         #Werneck
         #-------
         try:
-            graph = distance.squareform(distance.pdist(self._vftr, self._distance))
+            kwargs = {}
+            if self._distance == 'seuclidean':
+                kwargs['V'] = np.var(vf, axis=0, ddof=1)
+            elif self._distance == 'mahalanobis':
+                kwargs['VI'] = np.linalg.inv(np.cov(vf.T)).T
+            distance.cdist(vf[:1], vf[:1], self._distance, **kwargs)
+            return self._distance, kwargs
         except:
             try:
                 descriptor_path = os.path.join(os.path.dirname(__file__), '..',
@@ -80,26 +142,62 @@ class OPF(Classifier):
                 sys.path.append(descriptor_path)
                 software = __import__('plugin_' + self._distance)
                 print software
-                graph = distance.squareform(distance.pdist(self._vftr, software.distance))
+                distance.cdist(vf[:1], vf[:1], software.distance)
+                return software.distance, {}
             except:
-                graph = distance.squareform(distance.pdist(self._vftr))
+                return 'euclidean', {}
         #-------
 
-        mst = self.__prim(graph)  # mst = minimum spanning tree
-        prototypes = self.__findPrototypes(mst, self._vltr)
-        prototypes = np.array(prototypes)
+    def _chunkRows(self, n):
+        """
+        Number of samples whose distances to 'n' training samples are
+        computed at once.
+        """
+        if self._chunk_size > 0:
+            return self._chunk_size
+        return max(1, CHUNK_MEMORY // (8 * max(1, n)))
 
-        vltr = np.array(self._vltr)
-        prototypes_labels = vltr[prototypes]
+    def _winners(self, vfte, vftr, C, metric, metric_kwargs, exclude_self=False):
+        """
+        Index of the training sample that conquers each sample of 'vfte',
+        the one minimizing max(distance, cost), computed by blocks of
+        '_chunkRows' samples.  Ties go to the first training sample.
+        With 'exclude_self', 'vfte' is 'vftr' and a sample cannot
+        conquer itself.
+        """
+        rows = self._chunkRows(len(vftr))
+        C = np.asarray(C, dtype=np.float64)[np.newaxis, :]
 
-        C, P, L = self.__dijkstra(mst, prototypes, prototypes_labels)
+        ret = np.empty(len(vfte), int)
+        for start in xrange(0, len(vfte), rows):
+            D = distance.cdist(vfte[start:start + rows], vftr, metric, **metric_kwargs)
+            np.maximum(D, C, D)
+            if exclude_self:
+                D[np.arange(len(D)), np.arange(start, start + len(D))] = float("inf")
+            ret[start:start + len(D)] = D.argmin(axis=1)
 
-        # Storing data on the self.
-        self.C, self.P, self.L = C, P, L
-        self.vftr, self.vltr = self._vftr, self._vltr
+        return ret
 
-        assert len(self.vftr) == len(self.L)
-        assert len(self.L) == len(self.C)
+    def __prune(self, vftr, prototypes, metric, metric_kwargs):
+        """
+        Keeps only the prototypes and the training samples that conquer
+        some other training sample.  The parents of the samples whose
+        parent was removed become -1.  Approximate: the removed samples
+        can still conquer test samples, so predictions may change.
+        """
+        kept = np.zeros(len(vftr), bool)
+        kept[self._winners(vftr, vftr, self.C, metric, metric_kwargs, exclude_self=True)] = True
+        kept[prototypes] = True
+
+        new_index = np.ones(len(vftr), int) * -1
+        new_index[kept] = np.arange(kept.sum())
+
+        yellow_err('OPF.__prune(): {0} of {1} training samples kept'.format(kept.sum(), len(vftr)))
+
+        self.C, self.L = self.C[kept], self.L[kept]
+        self.P = new_index[self.P[kept].astype(int)].astype(self.P.dtype)
+        self.vftr = vftr[kept]
+        self.vltr = np.asarray(self._vltr)[kept]
 
     def _preAssertPredict(self, vte):
         assert self._trained
@@ -121,27 +219,14 @@ class OPF(Classifier):
         """
         Classifier.simpleclassify(self, auxiliar=None)
 
-        #Werneck
-        #-------
-        try:
-            lpr = map(lambda (i, _): self.L[i],
-                      map(lambda enumdists: min(enumdists, key=lambda (i, dist): max(dist, self.C[i])),
-                          map(enumerate, distance.cdist(self._vfte, self.vftr, self._distance))))
-        except:
-            try:
-                descriptor_path = os.path.join(os.path.dirname(__file__), '..',
-                        '..', 'descriptors', self._distance)
-                sys.path.append(descriptor_path)
-                software = __import__('plugin_' + self._distance)
-                print software
-                lpr = map(lambda (i, _): self.L[i],
-                          map(lambda enumdists: min(enumdists, key=lambda (i, dist): max(dist, self.C[i])),
-                              map(enumerate, distance.cdist(self._vfte, self.vftr, software.distance))))
-            except:
-                lpr = map(lambda (i, _): self.L[i],
-                          map(lambda enumdists: min(enumdists, key=lambda (i, dist): max(dist, self.C[i])),
-                              map(enumerate, distance.cdist(self._vfte, self.vftr))))
-        #-------
+        vfte = np.asarray(self._vfte, dtype=np.float64)
+        vftr = np.asarray(self.vftr, dtype=np.float64)
+
+        # As 'cdist(vfte, vftr)', the variances of 'seuclidean' and
+        # 'mahalanobis' come from both sets.
+        metric, metric_kwargs = self._trainingMetric(np.vstack((vfte, vftr)))
+        lpr = [self.L[i]
+               for i in self._winners(vfte, vftr, self.C, metric, metric_kwargs)]
 
 #         if lte is not None:     # For plotting purpose
         if False:
@@ -202,25 +287,40 @@ class OPF(Classifier):
 
         return lpr
 
-    def __dijkstra(self, A, seeds, seeds_labels):
+    def __dijkstra(self, pred, weight, seeds, seeds_labels):
         """
         Parameters:
-            A = the adjacency matrix of a graph
+            pred, weight = the MST, as returned by '__prim'.
             seeds = the indices of the nodes to be used as seeds of the SPF-Max
             seeds_labels = labels of the seeds.
         Note:
-            This function corresponds to the multi-source-max Dijkstra algorithm.
+            This function corresponds to the multi-source-max Dijkstra
+            algorithm over the MST.  The nodes of the heap whose cost
+            decreases are not removed from it: the outdated entries are
+            skipped when popped (lazy deletion), which gives the same
+            order of conquest.
         Return:
             c1 = costs to the corresponding parent root
             par = parents nodes
             lab = labels of the nodes
         """
         h = 0
-        n = A.shape[0]
+        n = len(pred)
         done = np.zeros(n).astype('bool')
         c1  = np.ones(n) * float("inf")
         par = np.ones(n) * -1
         lab = np.ones(n) * float("inf")
+
+        # Adjacency lists of the MST, each one in increasing order of node.
+        adjacency = [[] for _ in xrange(n)]
+        for q in xrange(n):
+            p = pred[q]
+            if p >= 0:
+                adjacency[p].append((q, weight[q]))
+                adjacency[q].append((p, weight[q]))
+        for edges in adjacency:
+            edges.sort()
+
         heap = []
         for i, v0 in enumerate(seeds):
             c1[v0] = h
@@ -229,19 +329,15 @@ class OPF(Classifier):
             heappush(heap, (h, v0))
 
         while len(heap) > 0:
-            (_, p) = heappop(heap)
+            (cost, p) = heappop(heap)
+            if done[p] or cost > c1[p]:
+                continue            # outdated entry
             done[p] = True
-            for q in xrange(n):
-                if p == q or done[q]:
+            for q, w in adjacency[p]:
+                if done[q]:
                     continue
-                c = max(c1[p], A[p, q])  # fcost
+                c = max(c1[p], w)  # fcost
                 if c < c1[q]:
-                    if c1[q] < float("inf"):
-                        try:
-                            heap.remove((c1[q], q))
-                            heapify(heap)
-                        except:
-                            pass
                     c1[q]  = c
                     par[q] = p
                     lab[q] = lab[p]
@@ -250,46 +346,45 @@ class OPF(Classifier):
         return c1, par, lab
 
 #   @staticmethod
-    def __prim(self, A):
+    def __prim(self, vf, metric, metric_kwargs):
         """
         Parameters:
-        A = Weighted adjacency matrix. Non connected nodes have weigh 'Inf'.
+        vf = feature vectors, the nodes of the complete graph.
+        metric, metric_kwargs = the distance between the nodes, as given to 'cdist'.
         Note:
-
+        O(n^2) Prim's algorithm.  The distances from a vertex are computed
+        when it enters the tree, only to the vertices still out of it, so
+        the n x n graph is never stored.  Ties are broken by the smallest
+        vertex, as before.
         Return:
-        B =  weighted adjacency matrix corresponding to the MST of A.
+        pred = predecessor of each vertex in the MST (-1 for the root).
+        weight = weight of the edge between each vertex and its predecessor.
         """
         root = 0
-        # prevents zero-weighted MSTs
-        A = A.astype('double')
-
-        n = A.shape[0]
-        if n == 0: return []
-
-        d = np.zeros(n)         # type(d) = numpy.ndarray
-        pred = np.zeros(n, int)  # type(pred) = numpy.ndarray
-        B = np.ones(A.shape) * float("inf")  # type(B) = numpy.ndarray
-
-        b0 = root         # first vertex as root. type(b0) = int
-        Q = range(0, n)   # all vertices. type(Q) = list
-        Q.remove(root)    # except the root.
-        d[Q] = A[Q, b0]   # distances from root.
-        pred[Q] = b0      # predecessor as root.
-
-        while Q != []:
-            s = np.argmin(d[Q])  # function `argmin' in module `numpy.core.fromnumeric'.
-            closest_i = Q[s]  # find vertex in Q with smallest weight from b0
-            Q.remove(closest_i)
-            b0 = closest_i
-            b1 = pred[closest_i]
-            B[b0, b1] = B[b1, b0] = A[b0, b1]  # insert this edge in MST weight matrix
-            if Q == []: break
-            QA = np.array(Q)    # remaining vertexes.
-            iii = np.where(A[QA, closest_i] < d[QA])
-            d[QA[iii]] = A[QA[iii], closest_i]     # update weights to pred
-            pred[QA[iii]] = closest_i             # update pred
-
-        return B
+
+        n = len(vf)
+        pred = np.ones(n, int) * -1
+        weight = np.zeros(n)
+        if n == 0: return pred, weight
+
+        Q = np.arange(n)                # vertices out of the tree, in increasing order.
+        Q = Q[Q != root]
+        d = distance.cdist(vf[[root]], vf[Q], metric, **metric_kwargs)[0]  # distances from root.
+        predQ = np.ones(len(Q), int) * root  # predecessor as root.
+
+        while len(Q) > 0:
+            s = np.argmin(d)    # find vertex in Q with smallest weight to the tree
+            closest_i = Q[s]
+            pred[closest_i] = predQ[s]  # insert this edge in MST
+            weight[closest_i] = d[s]
+            Q, d, predQ = np.delete(Q, s), np.delete(d, s), np.delete(predQ, s)
+            if len(Q) == 0: break
+            row = distance.cdist(vf[[closest_i]], vf[Q], metric, **metric_kwargs)[0]
+            iii = row < d
+            d[iii] = row[iii]                # update weights to pred
+            predQ[iii] = closest_i           # update pred
+
+        return pred, weight
 
 #   @staticmethod
     def _binDecision(self, LM, CM, check):
@@ -366,26 +461,151 @@ class OPF(Classifier):
         return labels.astype(int)
 
 #   @staticmethod
-    def __findPrototypes(self, MST, labels):
+    def __findPrototypes(self, pred, labels):
         """
         Parameters:
-        MST = MST adjacency matrix
+        pred = the MST, as returned by '__prim'
         labels = labels of the nodes
         Note:
-
+        The prototypes are the vertices with a neighbour of another label
+        in the MST.
         Return:
-        seeds = List with OPF prototypes
+        seeds = Array with OPF prototypes, in increasing order
+        """
+        n = len(pred)
+        if n != len(labels): return np.array([], int)
+
+        labels = np.asarray(labels)
+        children = np.flatnonzero(pred >= 0)
+        boundary = children[labels[children] != labels[pred[children]]]
+
+        is_seed = np.zeros(n, bool)
+        is_seed[boundary] = True
+        is_seed[pred[boundary]] = True
+
+        return np.flatnonzero(is_seed)
+
+
+class OPFKNN(OPF):
+    """
+    Supervised OPF over the k-nearest-neighbour graph of the training
+    samples (OPF-kNN), for training sets whose complete graph is too
+    large.  Only the k neighbours of each sample are kept, so memory is
+    O(nk) and the distances are computed by blocks, as in
+    'OPF.simpleclassify'.
+
+    The cost of a sample is the minimum probability density along its
+    path, which is maximized: the maxima of the density of each class
+    become the prototypes, and a sample is conquered only by samples of
+    its class.  A test sample receives the label of the neighbour 's'
+    maximizing min(C(s), density of the test sample).
+
+    Parameters: those of 'OPF', except 'prune', and 'k' (default 10).
+    """
+    def simple__init__(self):
+        OPF.simple__init__(self)
+
+        self._k = (self._parameters['k']
+                   if self._parameters.has_key('k')
+                   else 10)
+        assert isinstance(self._k, int) and self._k > 0
+
+    def simple__repr__(self):
+        return 'OPFKNN'
+
+    def _neighbours(self, vfte, vftr, k, metric, metric_kwargs, exclude_self=False):
+        """
+        The 'k' nearest training samples of each sample of 'vfte', and
+        their distances, both of shape (len(vfte), k) in increasing order
+        of distance.
         """
-        n = MST.shape[0]
-        if n != len(labels): return []
+        rows = self._chunkRows(len(vftr))
+
+        idx = np.empty((len(vfte), k), int)
+        dist = np.empty((len(vfte), k))
+        for start in xrange(0, len(vfte), rows):
+            D = distance.cdist(vfte[start:start + rows], vftr, metric, **metric_kwargs)
+            if exclude_self:
+                D[np.arange(len(D)), np.arange(start, start + len(D))] = float("inf")
+            nearest = np.argpartition(D, k - 1, axis=1)[:, :k]
+            nearest_dist = D[np.arange(len(D))[:, np.newaxis], nearest]
+            order = np.argsort(nearest_dist, axis=1, kind='mergesort')
+            idx[start:start + len(D)] = nearest[np.arange(len(D))[:, np.newaxis], order]
+            dist[start:start + len(D)] = nearest_dist[np.arange(len(D))[:, np.newaxis], order]
+
+        return idx, dist
+
+    def _density(self, dist):
+        """
+        Gaussian probability density of the samples from the distances to
+        their neighbours.
+        """
+        sigma2 = self._sigma2
+        return (np.exp(-dist ** 2 / (2 * sigma2)).sum(axis=1) /
+                (np.sqrt(2 * np.pi * sigma2) * dist.shape[1]))
+
+    def simplefit(self):
+        Classifier.simplefit(self)
+
+        vftr = np.asarray(self._vftr, dtype=np.float64)
+        vltr = np.asarray(self._vltr)
+        n = len(vftr)
+        k = min(self._k, n - 1)
+        assert k > 0
+
+        metric, metric_kwargs = self._trainingMetric(vftr)
+        adjacency, adjacency_dist = self._neighbours(vftr, vftr, k, metric, metric_kwargs,
+                                                     exclude_self=True)
+
+        # sigma = d_f / 3, d_f the largest weight of the graph.
+        self._sigma2 = max(adjacency_dist.max() / 3.0, np.finfo(float).eps) ** 2
+        rho = self._density(adjacency_dist)
+
+        # The plateaus of density are broken by 'delta'.
+        diffs = np.abs(rho[:, np.newaxis] - rho[adjacency])
+        diffs = diffs[diffs > 0]
+        delta = diffs.min() if len(diffs) > 0 else 1.0
+
+        done = np.zeros(n, bool)
+        C = rho - delta
+        P = np.ones(n) * -1
+        heap = [(-C[s], s) for s in xrange(n)]
+        heapify(heap)
+
+        while len(heap) > 0:
+            cost, s = heappop(heap)
+            if done[s] or -cost < C[s]:
+                continue            # outdated entry
+            done[s] = True
+            if P[s] == -1:          # not conquered: a prototype
+                C[s] = rho[s]
+            for t in adjacency[s]:
+                if done[t] or vltr[t] != vltr[s]:
+                    continue
+                tmp = min(C[s], rho[t])
+                if tmp > C[t]:
+                    C[t] = tmp
+                    P[t] = s
+                    heappush(heap, (-C[t], t))
+
+        # Storing data on the self.
+        self.C, self.P, self.L = C, P, vltr.astype(np.float64)
+        self.vftr, self.vltr = vftr, vltr
+        self._k_fit = k
+
+        assert len(self.vftr) == len(self.L)
+        assert len(self.L) == len(self.C)
+
+    def simpleclassify(self, auxiliar=None):
+        Classifier.simpleclassify(self, auxiliar=None)
+
+        vfte = np.asarray(self._vfte, dtype=np.float64)
 
-        seeds = []
+        metric, metric_kwargs = self._trainingMetric(np.vstack((vfte, self.vftr)))
+        idx, dist = self._neighbours(vfte, self.vftr, self._k_fit, metric, metric_kwargs)
+        rho = self._density(dist)
 
-        for i in range(n):
-            w = MST[i, :]
-            wix = np.where(w != float("inf"))[0]
-            l = map(lambda x: labels[x], wix)
-            if set(l + [labels[i]]).__len__() > 1:
-                seeds.append(i)
+        costs = np.minimum(self.C[idx], rho[:, np.newaxis])
+        winners = idx[np.arange(len(idx)), costs.argmax(axis=1)]
 
-        return seeds
+        return [self.L[i] for i in winners]
@@ -0,0 +1,97 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+"""
+Benchmark of the exact OPF against the OPF over the k-NN graph (OPFKNN):
+accuracy and time of fit and classification on a random split of a
+feature file in the format of 'common.loadFeatures'.
+
+Example:
+    python benchmark_OPF.py features.txt --train 0.5 --k 5 10 20
+"""
+
+#Python imports
+import os
+import sys
+
+#Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+import common
+import OPF
+
+def benchmark(features_path, train_fraction, list_k, dist, skip_exact, seed):
+    """
+    Prints a line per classifier: name, accuracy, fit and classification
+    times.
+    """
+    
+    labels, feats = common.loadFeatures(features_path)
+    
+    train, test = common.splitTrainTest(labels, train_fraction, seed)
+    
+    print "Train samples:", len(train), "Test samples:", len(test)
+    print "%-12s %10s %12s %12s" % ("Classifier", "Accuracy", "Fit (s)",
+            "Classify (s)")
+    
+    classifiers = []
+    if not skip_exact:
+        classifiers.append(("OPF", OPF.OPF(distance=dist)))
+    for k in list_k:
+        classifiers.append(("OPFKNN k=" + str(k),
+                OPF.OPFKNN(distance=dist, k=k)))
+    
+    for name, classifier in classifiers:
+        accuracy, fit_time, classify_time = common.evaluate(classifier,
+                feats[train], labels[train], feats[test], labels[test])
+        print "%-12s %10.4f %12.2f %12.2f" % (name, accuracy, fit_time,
+                classify_time)
+
+if __name__ == "__main__":
+
+    # Argument parser
+    parser = common.benchmarkParser("OPF x OPF-kNN benchmark", "OPF",
+            "Seed of the split.")
+    parser.add_argument('--k', type=int, nargs='+', default=[10],
+            help="Values of k of the OPF-kNN.")
+    parser.add_argument('--distance', default='euclidean',
+            help="Distance of the classifiers.")
+    
+    args = parser.parse_args()
+    
+    benchmark(args.features_path, args.train, args.k, args.distance,
+            args.skip_exact, args.seed)
@@ -38,13 +38,12 @@
 #Python imports
 import os
 import sys
-import numpy
-from sklearn import preprocessing
 from sklearn.externals import joblib
 
 #Framework imports
 dirname = os.path.abspath(os.path.dirname(__file__))
 sys.path.append(os.path.dirname(dirname))
+import common
 import Classifier
 import OPF
 
@@ -87,55 +86,39 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
         parameters):
     """
     Performs the classification of the test_set according to the train_set.
+    
+    The parameter "Approximate pruning" drops the training samples that do
+    not conquer other training samples, which is faster but may change the
+    predictions of the complete graph.
     """
     
     print "Classification: OPF"
     
     #Get parameters
     dist = distance(parameters["Distance"], descriptor)
+    prune = bool(parameters.get("Approximate pruning", False))
+    graph = parameters.get("Graph", "Complete")
+    k = int(parameters.get("k", 10))
     
     #Paths
     #dirname = os.path.abspath(os.path.join(os.path.dirname(__file__)))
-    temp_path = os.path.abspath(os.path.join(dirname, "..", "..", "temp"))
+    temp_path = common.tempFolder()
     model_path = os.path.join(temp_path, "iteration:" + str(iteration) + \
             "-OPF_" + str(pos_fold) + ".model")
     
-    #Preprocess each class to a unique value to the classification
-    label_encoder = preprocessing.LabelEncoder()
-    label_encoder.fit(classes_list)
-    print "List of classes of this experiment:", label_encoder.classes_
-    
-    #Read the train list and save the list of class and the list
-    #of feature vectors
-    list_class = []
-    list_fv = []
-    
-    for img in train_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(numpy.array(images[img][POS_FV][INDEX_ZERO]))
-    
-    list_train = numpy.array(list_fv)
-    list_train_class = numpy.array(list_class)
-    
-    #Given a list of classes, transform each value in this list to a integer
-    list_train_class = label_encoder.transform(list_train_class)
-    
-    #Read the test list and save the list of class and the list
-    #of feature vectors
+    #Train and test matrices, with the classes of the training set encoded
+    #as indexes of the classes of the experiment
+    classes, list_train, list_train_class, list_test, list_test_class = \
+            common.foldMatrices(images, classes_list, train_set, test_set)
     list_img = test_set
-    list_class = []
-    list_fv = []
-    
-    for img in test_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(numpy.array(images[img][POS_FV][INDEX_ZERO]))
-    
-    list_test = numpy.array(list_fv)
-    list_test_class = numpy.array(list_class)
+    print "List of classes of this experiment:", classes
     
     #Classification
     #--------------------------------------------------------------------------
-    opf = OPF.OPF(distance=dist)
+    if graph == "k-NN":
+        opf = OPF.OPFKNN(distance=dist, k=k)
+    else:
+        opf = OPF.OPF(distance=dist, prune=prune)
     
     #Fit
     print "\tFit: Beginning"
@@ -150,21 +133,25 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
     list_predict = opf.classify(list_test)
     print "\tPredict: Done"
     
-    #Mapping the results into integers
-    list_predict = map(int, list_predict)
-    #Returning the result to strings
-    list_predict = label_encoder.inverse_transform(list_predict)
-    
-    list_result = []
-    for predict in list_predict:
-        img_result = [0] * len(label_encoder.classes_)
-        #Find all predict in the list label_encoder.classes_ and grab the
-        #first index
-        pos = label_encoder.classes_.tolist().index(predict)
-        img_result[pos] = 1
-        list_result.append(img_result)
+    list_result = common.oneHot(list_predict, len(classes)).tolist()
     
     #--------------------------------------------------------------------------
     
-    return list_img, list_test_class, list_result, label_encoder.classes_, \
+    return list_img, list_test_class, list_result, classes, \
            model_paths
+
+def load_model(model_paths, parameters):
+    """
+    Loads the model saved by classify, given the paths of its files, with its
+    arrays memory-mapped.
+    """
+    
+    return joblib.load(model_paths[INDEX_ZERO], mmap_mode='r')
+
+def predict(model, list_fv, parameters):
+    """
+    Predicts the classes of the feature vectors in list_fv with a model
+    loaded by load_model, as indexes of the classes of the classifier.
+    """
+    
+    return map(int, model.classify(list_fv))
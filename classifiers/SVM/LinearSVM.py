@@ -0,0 +1,343 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+from termcolor import *
+import sys
+cyan_err('import LinearSVM')
+
+import numpy as np
+from sklearn.svm import LinearSVC
+from sklearn.linear_model import LogisticRegression
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+import common
+from Classifier import Classifier
+
+"""
+Fraction of the training samples, of each class, that fits the linear
+models of the grid search of C.  The others validate them.
+"""
+FITTING_FRACTION = 0.8
+
+
+def linearModel(loss, c):
+    """
+    Input:
+    loss = 'hinge' (linear SVM, squared hinge loss) or 'logistic'
+    (logistic regression).
+    c = penalty of the errors.
+
+    Output:
+    Unfitted LIBLINEAR model of 'loss', solved by dual coordinate
+    descent.  Multiclass problems are solved one-versus-all.
+    """
+    assert loss in ['hinge', 'logistic']
+
+    if loss == 'logistic':
+        return LogisticRegression(C=c, dual=True)
+    return LinearSVC(C=c, dual=True)
+
+
+def balancedAccuracy(vl, vlpr):
+    """
+    Mean, over the classes of 'vl', of the accuracy on its samples.
+    """
+    vl, vlpr = np.asarray(vl), np.asarray(vlpr)
+
+    return np.mean([np.mean(vlpr[vl == clss] == clss)
+                    for clss in np.unique(vl)])
+
+
+def approximationParameters(parameters):
+    """
+    Input:
+    parameters = parameters of a plugin of the SVM, with the optional
+    'Kernel approximation' ('Nystroem' or 'Random Fourier features'),
+    'Components' and 'Seed'.
+
+    Output:
+    Keyword arguments of 'ApproximateRBFSVM': the feature map ('nystroem',
+    'fourier', or None for the exact kernel, also when the experiment
+    does not have the parameter), its number of components and the seed
+    of its samples or frequencies.
+    """
+    approximation = parameters.get('Kernel approximation')
+    if approximation == 'Nystroem':
+        approximation = 'nystroem'
+    elif approximation == 'Random Fourier features':
+        approximation = 'fourier'
+    else:
+        approximation = None
+
+    return {'approximation': approximation,
+            'components': int(parameters.get('Components', 1000)),
+            'seed': int(parameters.get('Seed', 0))}
+
+
+class LinearSVM(Classifier):
+    """
+    Linear SVM, or logistic regression with 'loss' = 'logistic',
+    trained by the dual coordinate descent of LIBLINEAR.  Its cost does
+    not grow with the square of the samples as the RBF SVMs of LIBSVM,
+    which makes it the choice for features of thousands of dimensions.
+
+    Multiclass problems are solved one-versus-all by LIBLINEAR itself,
+    and it is also a binary classifier of 'MCBBClassifier' ('bc'): the
+    decision value of each sample is appended to 'auxiliar'.  The
+    features may be a scipy sparse matrix.
+
+    Without 'C', it is searched on a stratified split of the training
+    samples, with the 'search' of the SVMs ('grid' or 'halving'), the
+    points evaluated by 'processes' processes (default: all the cores).
+    """
+    _sparse_features = True
+
+    def simple__init__(self):
+        Classifier.simple__init__(self)
+
+        self._loss = (self._parameters['loss']
+                      if self._parameters.has_key('loss')
+                      else 'hinge')
+        self._processes = (self._parameters['processes']
+                           if self._parameters.has_key('processes')
+                           else 0)
+
+        assert self._loss in ['hinge', 'logistic']
+
+        self._gridsearch = not self._parameters.has_key('C')
+
+    def simple__repr__(self):
+        return 'LinearSVM' if self._loss == 'hinge' else 'LinearLR'
+
+    def _validationSplit(self):
+        """
+        Output:
+        (vffi, vlfi, vfva, vlva): features and labels of the stratified
+        split of the training samples for the search of the parameters,
+        'FITTING_FRACTION' of each class fitting the models, and the
+        others validating them.
+        """
+        vltr = np.array(self._vltr)
+        itr = common.subsampleIndexes(self._vltr, FITTING_FRACTION)
+        iva = sorted(set(range(len(self._vltr))) - set(itr))
+        if len(iva) == 0:
+            iva = itr
+
+        return self._vftr[itr], vltr[itr], self._vftr[iva], vltr[iva]
+
+    def _search(self, of, *params, **kwargs):
+        """
+        Search of the parameters of 'of(fraction, *params)', with the
+        'search' of the SVMs ('grid', the default, or 'halving'), the
+        points evaluated by 'processes' processes.
+        """
+        search = (self._parameters['search']
+                  if self._parameters.has_key('search')
+                  else 'grid')
+        assert search in ['grid', 'halving']
+
+        kwargs['processes'] = self._processes
+        if search == 'halving':
+            return common.gridSearchHalving('min', of, *params, **kwargs)
+        return common.gridSearchExponential('min',
+                                            lambda *point: of(1.0, *point),
+                                            *params, **kwargs)
+
+    def _featureMap(self, vf):
+        """
+        Features of the linear model for the samples 'vf': the samples
+        themselves.
+        """
+        return vf
+
+    def simple__gridsearch__(self):
+        Classifier.simple__gridsearch__(self)
+
+        """
+        vffi = vector of fitting features
+        vlfi = vector of fitting labels
+        vfva = vector of validation features
+        vlva = vector of validation labels
+        """
+        vffi, vlfi, vfva, vlva = self._validationSplit()
+
+        def ofLinearSVM(fraction, c):
+            """
+            Objective Function.
+            """
+            sub = common.subsampleIndexes(vlfi, fraction)
+            model = linearModel(self._loss, c).fit(vffi[sub], vlfi[sub])
+            ret = balancedAccuracy(vlva, model.predict(vfva))
+
+            yellow_err('LinearSVM.simple__gridsearch__(): C = {0} result: {1}'.format(c, ret))
+            return ret
+
+        c, = self._search(ofLinearSVM, [2**i for i in range(-10, 10 + 1)])
+
+        self._parameters['C'] = c
+
+        yellow_err('LinearSVM.simple__gridsearch__(): C = {0}'.format(c))
+
+    def simplefit(self):
+        Classifier.simplefit(self)
+
+        self._model = linearModel(self._loss, self._parameters['C'])
+        self._model.fit(self._featureMap(self._vftr), np.array(self._vltr))
+
+    def simpleclassify(self, auxiliar=None):
+        Classifier.simpleclassify(self, auxiliar)
+
+        vfte = self._featureMap(self._vfte)
+        vlpr = self._model.predict(vfte).tolist()
+
+        if auxiliar is not None:
+            vpr = self._model.decision_function(vfte)
+            if vpr.ndim == 1:
+                vpr = vpr[:, np.newaxis]
+            for x in vpr.tolist():
+                auxiliar.append(x)
+
+        assert len(vlpr) == self._samples(self._vfte)
+
+        return vlpr
+
+
+class ApproximateRBFSVM(LinearSVM):
+    """
+    RBF SVM approximated by a 'LinearSVM' on an explicit feature map of
+    'components' dimensions (default 1000), whose inner products
+    approximate the RBF kernel of 'gamma': the Nystroem map, from
+    'components' training samples ('approximation' = 'nystroem', the
+    default), or random Fourier features ('approximation' = 'fourier').
+    'seed' (default 0) draws the samples or the frequencies.
+
+    The exact RBF SVM costs between n^2 and n^3 in the n training
+    samples; the approximation costs n * 'components' to map them, and
+    the linear model is linear in n.
+
+    Without 'C' and 'gamma', they are searched as in 'BSVM', each gamma
+    mapping the samples once for every C.
+    """
+    def simple__init__(self):
+        LinearSVM.simple__init__(self)
+
+        self._approximation = (self._parameters['approximation']
+                               if self._parameters.has_key('approximation')
+                               else 'nystroem')
+        self._components = (self._parameters['components']
+                            if self._parameters.has_key('components')
+                            else 1000)
+        self._seed = (self._parameters['seed']
+                      if self._parameters.has_key('seed')
+                      else 0)
+
+        assert self._approximation in ['nystroem', 'fourier']
+        assert self._components > 0
+
+        self._gridsearch = not (self._parameters.has_key('C') and
+                                self._parameters.has_key('gamma'))
+
+    def simple__repr__(self):
+        return '{0}_{1}'.format(LinearSVM.simple__repr__(self),
+                                self._approximation)
+
+    def _kernelMap(self, vf, gamma):
+        """
+        The feature map of the RBF kernel of 'gamma', fitted to the
+        samples 'vf'.
+        """
+        if self._approximation == 'nystroem':
+            ret = Nystroem(kernel='rbf', gamma=gamma,
+                           n_components=min(self._components,
+                                            self._samples(vf)),
+                           random_state=self._seed)
+        else:
+            ret = RBFSampler(gamma=gamma, n_components=self._components,
+                             random_state=self._seed)
+
+        return ret.fit(vf)
+
+    def _featureMap(self, vf):
+        return self._map.transform(vf)
+
+    def simple__gridsearch__(self):
+        Classifier.simple__gridsearch__(self)
+
+        vffi, vlfi, vfva, vlva = self._validationSplit()
+        maps = {}
+
+        def ofApproximateRBFSVM(fraction, c, g):
+            """
+            Objective Function, with the samples mapped once per gamma.
+            """
+            sub = common.subsampleIndexes(vlfi, fraction)
+            if not maps.has_key((fraction, g)):
+                maps.clear()
+                kernel_map = self._kernelMap(vffi[sub], g)
+                maps[(fraction, g)] = (kernel_map.transform(vffi[sub]),
+                                       kernel_map.transform(vfva))
+            vfmi, vfmv = maps[(fraction, g)]
+
+            model = linearModel(self._loss, c).fit(vfmi, vlfi[sub])
+            ret = balancedAccuracy(vlva, model.predict(vfmv))
+
+            yellow_err('ApproximateRBFSVM.simple__gridsearch__(): C, gamma = {0}, {1} result: {2}'.format(c, g, ret))
+            return ret
+
+        cs = [2**i for i in range(-5, 15 + 1)]
+        gs = [2**i for i in range(-15, 3 + 1)]
+        if self._parameters.has_key('C'):
+            c = self._parameters['C']
+            g, = self._search(lambda fraction, g: ofApproximateRBFSVM(fraction, c, g),
+                              gs)
+        elif self._parameters.has_key('gamma'):
+            g = self._parameters['gamma']
+            c, = self._search(lambda fraction, c: ofApproximateRBFSVM(fraction, c, g),
+                              cs, chunksize=len(cs))
+        else:
+            """
+            The points of a gamma are consecutive, one chunk per gamma.
+            """
+            c, g = self._search(ofApproximateRBFSVM, cs, gs, chunksize=len(cs))
+
+        self._parameters['C'] = c
+        self._parameters['gamma'] = g
+
+        yellow_err('ApproximateRBFSVM.simple__gridsearch__(): C, gamma = {0}, {1}'.format(c, g))
+
+    def simplefit(self):
+        self._map = self._kernelMap(self._vftr, self._parameters['gamma'])
+        LinearSVM.simplefit(self)
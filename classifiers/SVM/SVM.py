@@ -3,11 +3,16 @@ from termcolor import *
 import sys
 cyan_err('import SVM')
 
+import os
+import tempfile
+import multiprocessing as mp
 import svmutil
 import svmutil1vs
 import numpy as np
 import common
 import hashfile
+import svmnode
+import LinearSVM
 import mlpy
 import random
 from Classifier import Classifier
@@ -88,7 +93,162 @@ def one_class_svm_training_function(vltr, vftr, parameters):
     return svmutil.svm_train(vltr, vftr, ' -s 2 ' + parameters)
 
 
+"""
+Memory, in bytes, that the precomputed kernels of the grid search of a
+'BSVM' may take.  Each process evaluating the grid holds about
+PRECOMPUTED_KERNEL_BYTES per entry of the kernel of a gamma (its
+'svm_node' and the NumPy array it is computed in), besides the 8 bytes of
+the squared distances shared by all of them.  Larger problems compute the
+kernel on the fly, as before.
+"""
+PRECOMPUTED_KERNEL_MEMORY = 2**30
+PRECOMPUTED_KERNEL_BYTES = 24
+
+
+def squaredDistances(vfa, vfb):
+    """
+    Squared euclidean distances between the rows of 'vfa' and the rows of
+    'vfb', as an array of shape (len(vfa), len(vfb)).
+    """
+    vfa = np.asarray(vfa, dtype=np.float64)
+    vfb = np.asarray(vfb, dtype=np.float64)
+
+    ret = np.dot(vfa, vfb.T)
+    ret *= -2
+    ret += (vfa ** 2).sum(axis=1)[:, np.newaxis]
+    ret += (vfb ** 2).sum(axis=1)[np.newaxis, :]
+    np.maximum(ret, 0, ret)
+
+    return ret
+
+
+def modelToString(model, library):
+    """
+    Serialize a LIBSVM model, using the svm_save_model of 'library'
+    (svmutil or svmutil1vs).
+    """
+    fd, path = tempfile.mkstemp(suffix='.model', dir=common.tempFolder())
+    os.close(fd)
+    try:
+        library.svm_save_model(path, model)
+        with open(path, 'rb') as model_file:
+            return model_file.read()
+    finally:
+        os.remove(path)
+
+
+def modelFromString(string, library):
+    """
+    Inverse of 'modelToString'.
+    """
+    fd, path = tempfile.mkstemp(suffix='.model', dir=common.tempFolder())
+    try:
+        os.write(fd, string)
+    finally:
+        os.close(fd)
+    try:
+        return library.svm_load_model(path)
+    finally:
+        os.remove(path)
+
+
+def searchParameters(parameters):
+    """
+    The parameters of a multiclass SVM that are passed on to its binary
+    (or one-class) SVMs: the 'search' of their grid searches.
+    """
+    return dict((key, parameters[key])
+                for key in ['search']
+                if parameters.has_key(key))
+
+
 class SVM(Classifier):
+    """
+    A trained SVM can be pickled: the LIBSVM model is serialized with
+    svm_save_model.  It is what allows the binary classifiers of a
+    'MCBBClassifier' to be trained by other processes.
+    """
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for key in ['_nodes', '_nodes_idx', '_test_nodes', '_test_nodes_idx']:
+            state.pop(key, None)
+        if state.has_key('_model'):
+            state['_model'] = modelToString(self._model, self._modelLibrary())
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if state.has_key('_model'):
+            self._model = modelFromString(state['_model'], self._modelLibrary())
+
+    def _modelLibrary(self):
+        if self._parameters['training_function'] is svm_1vs_training_function:
+            return svmutil1vs
+        return svmutil
+
+    def useNodes(self, nodes=None, idx=None, test_nodes=None, test_idx=None):
+        """
+        'svm_node' arrays, already built, of the samples of the next fit
+        and of the next classification: the rows 'idx' of the NodeMatrix
+        'nodes' (all of them if None) are the training samples, and the
+        rows 'test_idx' of 'test_nodes' are the testing samples.  Without
+        them, a NodeMatrix of the samples is built on each call.  They are
+        not pickled.
+        """
+        self._nodes = nodes
+        self._nodes_idx = idx
+        self._test_nodes = test_nodes
+        self._test_nodes_idx = test_idx
+
+    def _trainingNodes(self):
+        """
+        Output:
+        (NodeMatrix, indexes) of the training samples, building the
+        NodeMatrix if 'useNodes' did not give one.
+        """
+        nodes = getattr(self, '_nodes', None)
+        if nodes is None:
+            return svmnode.NodeMatrix(self._vftr), range(len(self._vftr))
+        idx = getattr(self, '_nodes_idx', None)
+        return nodes, (list(idx) if idx is not None else range(len(nodes)))
+
+    def _rows(self, vf, nodes=None, idx=None):
+        """
+        Input:
+        vf = samples.
+        nodes = NodeMatrix with the samples, or None.
+        idx = rows of 'nodes' of the samples.  All of them if None.
+
+        Output:
+        NodeRows of 'vf' for the bindings of the model.
+        """
+        library = self._modelLibrary()
+        if nodes is None:
+            return svmnode.NodeMatrix(vf).rows(library)
+
+        ret = nodes.rows(library, idx)
+        assert len(ret) == len(vf)
+        return ret
+
+    def _gridSearch(self, of, *params, **kwargs):
+        """
+        Grid search of the parameters of 'of(fraction, *params)', which
+        must be evaluated with that fraction of its fitting samples.  The
+        parameter 'search' chooses between the exhaustive grid ('grid',
+        the default), always with all the samples, and successive halving
+        ('halving').
+        """
+        search = (self._parameters['search']
+                  if self._parameters.has_key('search')
+                  else 'grid')
+        assert search in ['grid', 'halving']
+
+        if search == 'halving':
+            return common.gridSearchHalving('min', of, *params, **kwargs)
+        return common.gridSearchExponential('min',
+                                            lambda *point: of(1.0, *point),
+                                            *params, **kwargs)
+
     def simple__init__(self):
         Classifier.simple__init__(self)
 
@@ -107,18 +267,12 @@ class SVM(Classifier):
     def simple__repr__(self):
         return 'SVM interface'
 
-    @staticmethod
-    def _featureVectorFromListToDict(lst):
-        ret = {idx + 1: value
-               for idx, value
-               in enumerate(lst)}
-
-        return ret
-
     def simplefit(self):
         Classifier.simplefit(self)
 
-        vftr = map(SVM._featureVectorFromListToDict, self._vftr)
+        vftr = self._rows(self._vftr,
+                          getattr(self, '_nodes', None),
+                          getattr(self, '_nodes_idx', None))
 
         vltr = [label
                 if label is not None
@@ -142,7 +296,9 @@ class SVM(Classifier):
     def simpleclassify(self, auxiliar=None):
         Classifier.simpleclassify(self, auxiliar)
 
-        vfte = map(SVM._featureVectorFromListToDict, self._vfte)
+        vfte = self._rows(self._vfte,
+                          getattr(self, '_test_nodes', None),
+                          getattr(self, '_test_nodes_idx', None))
 
         vlte = [label
                 if label is not None
@@ -221,8 +377,8 @@ class BSVM(SVM):
         vfva = vector of validation features
         vlva = vector of validation labels
         """
-        vffi, vlfi = (np.array(self._vftr)[itr]).tolist(), (np.array(self._vltr)[itr]).tolist()
-        vfva, vlva = (np.array(self._vftr)[iva]).tolist(), (np.array(self._vltr)[iva]).tolist()
+        vffi, vlfi = self._vftr[itr], (np.array(self._vltr)[itr]).tolist()
+        vfva, vlva = self._vftr[iva], (np.array(self._vltr)[iva]).tolist()
 
         """
         Printing
@@ -234,17 +390,7 @@ class BSVM(SVM):
             assert isinstance(vlva2, list)
             yellow_err('BSVM.simple__gridsearch__(): {0} {1} {2}'.format(c, vlfi2.count(c), vlva2.count(c)))
 
-        def ofBSVM(c, g):
-            """
-            Objective Function.
-            """
-            classifier = SVM(training_function=self._training_function,
-                             prediction_function=self._prediction_function,
-                             C=c,
-                             gamma=g)
-            classifier.fit(vffi, vlfi)
-            vlpr = classifier.classify(vfva, vlva)
-
+        def resultBSVM(g, vlpr):
             """
             One of the two labels is considered unknown for
             result acquisition.
@@ -265,9 +411,92 @@ class BSVM(SVM):
                        .format(g, ret, results['AKS'], results['AUS']))
             return ret
 
-        params = common.gridSearchExponential('min', ofBSVM,
-                                              [2**i for i in range(-5, 15 + 1)],
-                                              [2**i for i in range(-15, 3 + 1)])
+        """
+        The 'svm_node' arrays of the samples are built once, for all the
+        points of the grid.
+        """
+        nodes, nodes_idx = self._trainingNodes()
+        idx_fi = [nodes_idx[i] for i in itr]
+        idx_va = [nodes_idx[i] for i in iva]
+
+        def ofBSVM(fraction, c, g):
+            """
+            Objective Function.
+            """
+            classifier = SVM(training_function=self._training_function,
+                             prediction_function=self._prediction_function,
+                             C=c,
+                             gamma=g)
+            sub = common.subsampleIndexes(vlfi, fraction)
+            classifier.useNodes(nodes, [idx_fi[i] for i in sub], nodes, idx_va)
+            classifier.fit(vffi[sub], [vlfi[i] for i in sub])
+            vlpr = classifier.classify(vfva, vlva)
+
+            return resultBSVM(g, vlpr)
+
+        """
+        The kernel of a gamma does not depend on C.  When the kernels fit
+        in PRECOMPUTED_KERNEL_MEMORY, the squared distances are computed
+        once, and the 'svm_node' arrays of the kernels of each gamma once
+        per process, with all the fitting samples: LIBSVM is trained with
+        the rows of any fraction of them ('-t 4'), and predicts the
+        validation samples, with the same arrays for every C.  The
+        kernels are held by the processes that evaluate the grid, one
+        inside a worker of a pool.
+        """
+        cs = [2**i for i in range(-5, 15 + 1)]
+        gs = [2**i for i in range(-15, 3 + 1)]
+        processes = (1
+                     if mp.current_process().daemon
+                     else min(mp.cpu_count(), len(gs)))
+        entries = len(vffi) * (len(vffi) + len(vfva))
+        if entries * (8 + PRECOMPUTED_KERNEL_BYTES * processes) <= PRECOMPUTED_KERNEL_MEMORY:
+            yellow_err('BSVM.simple__gridsearch__(): precomputed kernels of {0} entries in {1} processes'.format(entries, processes))
+
+            vdfi = squaredDistances(vffi, vffi)
+            vdva = squaredDistances(vfva, vffi)
+            vltk = [x if x is not None else self._unknown_label for x in vlfi]
+            vlvk = [x if x is not None else self._unknown_label for x in vlva]
+            library = self._modelLibrary()
+            kernels = {}
+
+            def kernelMatrix(vd, g, serials):
+                kernel = vd * -g
+                np.exp(kernel, kernel)
+                return svmnode.KernelMatrix(kernel, serials)
+
+            def ofBSVMPrecomputed(fraction, c, g):
+                """
+                Objective Function, with the kernel of 'g'.
+                """
+                idx = common.subsampleIndexes(vltk, fraction)
+                if not kernels.has_key(g):
+                    kernels.clear()
+                    vftk = kernelMatrix(vdfi, g, True)
+                    vfvk = kernelMatrix(vdva, g, False)
+                    kernels[g] = (vftk, vfvk.rows(library))
+                vftk, vfvk = kernels[g]
+
+                model = self._training_function([vltk[i] for i in idx],
+                                                vftk.rows(library, idx),
+                                                ' -q -t 4 -c {0} '.format(c))
+                vlpr, _, _ = self._prediction_function(vlvk, vfvk, model, ' -q ')
+                vlpr = [x if x != self._unknown_label else None
+                        for x in vlpr]
+
+                return resultBSVM(g, vlpr)
+
+            """
+            The points of a gamma are consecutive, one chunk per gamma.
+            """
+            params = self._gridSearch(ofBSVMPrecomputed,
+                                      cs,
+                                      gs,
+                                      chunksize=len(cs))
+        else:
+            params = self._gridSearch(ofBSVM,
+                                      cs,
+                                      gs)
         c, g = params
 
         assert not self._parameters.has_key('C')
@@ -346,7 +575,9 @@ class SVMSH(BSVM):
         # SVM.simplefit(self) below, but with another parameter to the training function
         Classifier.simplefit(self)
 
-        vftr = map(SVM._featureVectorFromListToDict, self._vftr)
+        vftr = self._rows(self._vftr,
+                          getattr(self, '_nodes', None),
+                          getattr(self, '_nodes_idx', None))
 
         vltr = [label
                 if label is not None
@@ -367,7 +598,9 @@ class SVMSH(BSVM):
     def simpleclassify(self, auxiliar=None):
         Classifier.simpleclassify(self, auxiliar)
 
-        vfte = map(SVM._featureVectorFromListToDict, self._vfte)
+        vfte = self._rows(self._vfte,
+                          getattr(self, '_test_nodes', None),
+                          getattr(self, '_test_nodes_idx', None))
 
         vlte = [label
                 if label is not None
@@ -405,17 +638,109 @@ class SVMSH(BSVM):
         lls = [x if x == self._parameters['positive_label'] else -x for x in lls]
         idx = lls.index(self._parameters['positive_label'])
         lls = lls[idx:] + lls[:idx]
-        lfs = lfs[idx:] + lfs[:idx]
+        lfs = np.concatenate((lfs[idx:], lfs[:idx]))
 
         assert next(len(x) == 1 and x.pop() == self._parameters['positive_label'] for x in [set([y for y in lls if y > 0])])
 
         self._vltr = lls
         self._vftr = lfs
 
+        if getattr(self, '_nodes', None) is not None:
+            nodes_idx = (list(self._nodes_idx)
+                         if self._nodes_idx is not None
+                         else range(len(self._nodes)))
+            self._nodes_idx = nodes_idx[idx:] + nodes_idx[:idx]
+
+
+def sharedNodes(vf, classifier):
+    """
+    Input:
+    vf = samples.
+    classifier = binary (or one-class) classifier of an ensemble.
+
+    Output:
+    NodeMatrix of 'vf' for the copies of 'classifier', with the rows of
+    its library already built, so that all of them (and the processes
+    forked after it) use the same 'svm_node' arrays.  None if
+    'classifier' is not a SVM.
+    """
+    if not isinstance(classifier, SVM):
+        return None
+
+    ret = svmnode.NodeMatrix(vf)
+    ret.rows(classifier._modelLibrary())
+    return ret
+
+
+def classifyWithNodes(classifier, test_nodes, vfte, vlte, auxiliar):
+    """
+    'classifier.classify(vfte, vlte, auxiliar)', with the 'svm_node'
+    arrays of 'vfte' taken from the NodeMatrix 'test_nodes' of
+    'sharedNodes', if it is not None, instead of being built again.
+    """
+    if test_nodes is None:
+        return classifier.classify(vfte, vlte, auxiliar)
+
+    classifier.useNodes(test_nodes=test_nodes)
+    try:
+        return classifier.classify(vfte, vlte, auxiliar)
+    finally:
+        classifier.useNodes()
+
+
+"""
+The 'MCBBClassifier' being fitted or used to classify.  The processes
+of the pool are forked after it is assigned, so they share the
+training and testing features instead of receiving them pickled for
+each binary classifier.
+"""
+_mcbb_shared = None
+
+
+def _mcbbFitTask(task):
+    return _mcbb_shared._fitBinaryClassifier(task)
+
+
+def _mcbbClassifyTask(idx):
+    return _mcbb_shared._classifyBinaryClassifier(idx)
+
+
+def _mcbbMap(mcbb, function, tasks):
+    """
+    Apply 'function' to each task in a pool of 'mcbb._processes'
+    processes (all the cores if it is 0 or less), returning the results
+    in the order of the tasks.  The tasks are run by this process when
+    there is only one process, or when this process is already a worker
+    of a pool, which cannot have children.
+    """
+    global _mcbb_shared
+
+    processes = mcbb._processes if mcbb._processes > 0 else mp.cpu_count()
+    processes = min(processes, len(tasks))
+
+    previous = _mcbb_shared
+    _mcbb_shared = mcbb
+    try:
+        if processes <= 1 or mp.current_process().daemon:
+            return map(function, tasks)
+
+        yellow_err('MCBBClassifier: {0} tasks in {1} processes'.format(len(tasks), processes))
+        pool = mp.Pool(processes, initializer=random.seed)
+        try:
+            return pool.map(function, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        _mcbb_shared = previous
+
 
 class MCBBClassifier(Classifier):
     """
     Multiclass binary-based classifier.
+
+    The binary classifiers are fitted, and classify, in parallel by
+    'processes' processes (default: all the cores).
     """
     def simple__init__(self):
         """
@@ -440,6 +765,10 @@ class MCBBClassifier(Classifier):
                             if self._parameters.has_key('ovaonlyone')
                             else False)
 
+        self._processes = (self._parameters['processes']
+                           if self._parameters.has_key('processes')
+                           else 0)
+
         self._gridsearch = False
 
         assert self._approach in ['OVO', 'OVA']
@@ -447,65 +776,105 @@ class MCBBClassifier(Classifier):
     def simple__repr__(self):
         return 'MCBBClassifier'
 
-    def simplefit(self):
-        Classifier.simplefit(self)
-
-        assert self._bc
-        assert self._unknown_label not in self._vltr
-
-        self._binary_classifiers = []
-
+    def _binaryTasks(self):
+        """
+        The pair of classes of each OVO binary classifier, or the
+        positive class of each OVA binary classifier.
+        """
         if self._approach == 'OVO':
-            for i in range(0, len(self._acs)):
-                for j in range(i + 1, len(self._acs)):
-                    vl, vf = common.limitTraining(self._vltr,
-                                                  self._vftr,
-                                                  [self._acs[i],
-                                                   self._acs[j]])
+            return [[self._acs[i], self._acs[j]]
+                    for i in range(0, len(self._acs))
+                    for j in range(i + 1, len(self._acs))]
+        elif self._approach == 'OVA':
+            return self._acs[:]
+        else:
+            raise ValueError('Unrecognized approach for multiclass classification.')
 
-                    bc = self._bc.copy()
-                    bc.fit(vf, vl)
+    def _fitBinaryClassifier(self, task):
+        n = len(self._vltr)
+        if self._approach == 'OVO':
+            rows_idx = [i for i, l in enumerate(self._vltr) if l in task]
+            vl, vf = [self._vltr[i] for i in rows_idx], self._vftr[rows_idx]
 
-                    self._binary_classifiers.append(bc)
+        else:
+            clss = task
+            vl = [l
+                  if l == clss
+                  else self._unknown_label
+                  for l in self._vltr]
+            vf = self._vftr
+            rows_idx = range(n)
+
+            if (vl.count(self._unknown_label) > 0 and
+                vl[0] != self._unknown_label):
+                """
+                Making all negative samples be first on the list
+                of training samples.  The SVM1VS treats
+                differently depending on the order of the samples.
 
-        elif self._approach == 'OVA':
-            for clss in self._acs:
-                vl = [l
-                      if l == clss
-                      else self._unknown_label
-                      for l in self._vltr]
-                vf = self._vftr[:]
-
-                if (vl.count(self._unknown_label) > 0 and
-                    vl[0] != self._unknown_label):
-                    """
-                    Making all negative samples be first on the list
-                    of training samples.  The SVM1VS treats
-                    differently depending on the order of the samples.
+                pedrormjunior 20131029
+                """
+                idx = vl.index(self._unknown_label)
+                vl = vl[idx:] + vl[:idx]
+                rows_idx = range(idx, n) + range(0, idx)
+                vf = vf[rows_idx]
+
+        bc = self._bc.copy()
+        nodes = getattr(self, '_nodes', None)
+        if nodes is not None:
+            bc.useNodes(nodes, rows_idx)
+        bc.fit(vf, vl)
+        if nodes is not None:
+            bc.useNodes()
+
+        return bc
+
+    def _classifyBinaryClassifier(self, idx):
+        margin_distances = []
+        vlpr = classifyWithNodes(self._binary_classifiers[idx],
+                                 getattr(self, '_test_nodes', None),
+                                 self._vfte,
+                                 self._vlte,
+                                 margin_distances)
+
+        return vlpr, margin_distances
 
-                    pedrormjunior 20131029
-                    """
-                    idx = vl.index(self._unknown_label)
-                    vl = vl[idx:] + vl[:idx]
-                    vf = vf[idx:] + vf[:idx]
+    def simplefit(self):
+        Classifier.simplefit(self)
 
-                bc = self._bc.copy()
-                bc.fit(vf, vl)
+        assert self._bc
+        assert self._unknown_label not in self._vltr
 
-                self._binary_classifiers.append(bc)
+        """
+        The 'svm_node' arrays of the training samples are built once,
+        before the processes are forked, for all the binary SVMs.
+        """
+        self._nodes = sharedNodes(self._vftr, self._bc)
+        try:
+            self._binary_classifiers = _mcbbMap(self, _mcbbFitTask,
+                                                self._binaryTasks())
+        finally:
+            self._nodes = None
 
-        else:
-            raise ValueError('Unrecognized approach for multiclass classification.')
+    def _classifyBinaryClassifiers(self):
+        """
+        The predictions and the margin distances of every binary
+        classifier.  The 'svm_node' arrays of the testing samples are
+        built once, before the processes are forked, for all the binary
+        SVMs.
+        """
+        self._test_nodes = sharedNodes(self._vfte, self._bc)
+        try:
+            return _mcbbMap(self, _mcbbClassifyTask,
+                            range(len(self._binary_classifiers)))
+        finally:
+            self._test_nodes = None
 
     def simpleclassify(self, auxiliar=None):
         Classifier.simpleclassify(self, auxiliar)
 
         lst_vlpr, lst_margin_distances = [], []
-        for bc in self._binary_classifiers:
-            margin_distances = []
-            vlpr = bc.classify(self._vfte,
-                               self._vlte,
-                               margin_distances)
+        for vlpr, margin_distances in self._classifyBinaryClassifiers():
             vlpr = [label
                     if label != self._unknown_label
                     else None
@@ -672,7 +1041,7 @@ class MCSVM(MCBBClassifier):
 
         assert not self._parameters.has_key('bc')
 
-        self._parameters['bc'] = BSVM()
+        self._parameters['bc'] = BSVM(**searchParameters(self._parameters))
 
         MCBBClassifier.simple__init__(self)
 
@@ -690,6 +1059,34 @@ class MCSVM(MCBBClassifier):
         return ret
 
 
+class MCLinearSVM(MCBBClassifier):
+    """
+    MCBBClassifier of binary 'LinearSVM's, given the 'loss' and the
+    'search' of their C, or of binary 'ApproximateRBFSVM's when an
+    'approximation' is given, with its 'components' and 'seed'.
+    """
+    def simple__init__(self):
+        Classifier.simple__init__(self)
+
+        assert not self._parameters.has_key('bc')
+
+        bc_parameters = searchParameters(self._parameters)
+        for key in ['loss', 'approximation', 'components', 'seed']:
+            if self._parameters.has_key(key):
+                bc_parameters[key] = self._parameters[key]
+        if bc_parameters.has_key('approximation'):
+            self._parameters['bc'] = LinearSVM.ApproximateRBFSVM(**bc_parameters)
+        else:
+            self._parameters['bc'] = LinearSVM.LinearSVM(**bc_parameters)
+
+        MCBBClassifier.simple__init__(self)
+
+        self._gridsearch = False
+
+    def simple__repr__(self):
+        return '{0}_{1}'.format(self._bc.simple__repr__(), self._approach)
+
+
 class MCSVMexternal(MCBBClassifier):
     def simple__init__(self):
         Classifier.simple__init__(self)
@@ -746,8 +1143,8 @@ class MCSVMexternal(MCBBClassifier):
         vfva = vector of validation features
         vlva = vector of validation labels
         """
-        vffi, vlfi = (np.array(self._vftr)[itr]).tolist(), (np.array(self._vltr)[itr]).tolist()
-        vfva, vlva = (np.array(self._vftr)[iva]).tolist(), (np.array(self._vltr)[iva]).tolist()
+        vffi, vlfi = self._vftr[itr], (np.array(self._vltr)[itr]).tolist()
+        vfva, vlva = self._vftr[iva], (np.array(self._vltr)[iva]).tolist()
 
         """
         Printing
@@ -810,7 +1207,7 @@ class MCSVMDBC(MCBBClassifier):
 
         assert not self._parameters.has_key('bc')
 
-        self._parameters['bc'] = SVMDBC()
+        self._parameters['bc'] = SVMDBC(**searchParameters(self._parameters))
 
         MCBBClassifier.simple__init__(self)
 
@@ -862,11 +1259,14 @@ class MCSVMSH(MCBBClassifier):
         Classifier.simpleclassify(self, auxiliar)
 
         lst_vlpr, lst_margin_distances = [], []
+        test_nodes = sharedNodes(self._vfte, self._bc)
         for bc in self._binary_classifiers:
             margin_distances = []
-            vlpr = bc.classify(self._vfte,
-                               self._vlte,
-                               margin_distances)
+            vlpr = classifyWithNodes(bc,
+                                     test_nodes,
+                                     self._vfte,
+                                     self._vlte,
+                                     margin_distances)
             vlpr = [label
                     if label != self._unknown_label
                     else None
@@ -956,18 +1356,23 @@ class OCSVM(SVM):
     def simple__gridsearch__(self):
         Classifier.simple__gridsearch__(self)
 
-        ovltr, ovftr = (map(list,
-                            zip(*filter(lambda (l, f): l < 0,
-                                        zip(self._vltr, self._vftr))))
-                        if len(filter(lambda x: x < 0,
-                                      self._vltr)) >= 1
-                        else [[], []])
-        ovltr = map(lambda _: None,
-                    ovltr)
+        """
+        The 'svm_node' arrays of the samples are built once, for all the
+        points of the grid: pidx and oidx are their rows of the positive
+        and of the other samples.
+        """
+        nodes, nodes_idx = self._trainingNodes()
+        pidx = [nodes_idx[i] for i, l in enumerate(self._vltr) if l > 0]
+        oidx = [nodes_idx[i] for i, l in enumerate(self._vltr) if l < 0]
+        if getattr(self, '_nodes', None) is not None:
+            self._nodes_idx = pidx
+
+        oi = [i for i, l in enumerate(self._vltr) if l < 0]
+        pi = [i for i, l in enumerate(self._vltr) if l > 0]
+
+        ovltr, ovftr = [None] * len(oi), self._vftr[oi]
 
-        self._vltr, self._vftr = map(list,
-                                     zip(*filter(lambda (l, f): l > 0,
-                                                 zip(self._vltr, self._vftr))))
+        self._vltr, self._vftr = [self._vltr[i] for i in pi], self._vftr[pi]
 
         #Werneck
         #hf = current_simulations_settings['hf']
@@ -992,8 +1397,8 @@ class OCSVM(SVM):
         vfva = vector of validation features
         vlva = vector of validation labels
         """
-        vffi, vlfi = (np.array(self._vftr)[itr]), (np.array(self._vltr)[itr])
-        vfva, vlva = (np.array(self._vftr)[iva]).tolist(), (np.array(self._vltr)[iva]).tolist()
+        vffi, vlfi = self._vftr[itr], (np.array(self._vltr)[itr])
+        vfva, vlva = self._vftr[iva], (np.array(self._vltr)[iva]).tolist()
 
         """
         Printing
@@ -1005,13 +1410,18 @@ class OCSVM(SVM):
             assert isinstance(vlva2, list)
             yellow_err('OCSVM.simple__gridsearch__(): {0} {1} {2}'.format(c, vlfi2.count(c), vlva2.count(c)))
 
-        def ofOCSVM(g):
+        idx_fi = [pidx[i] for i in itr]
+        idx_va = [pidx[i] for i in iva] + oidx
+
+        def ofOCSVM(fraction, g):
             """
             Objective Function.
             """
             classifier = OCSVM(gamma=g)
-            classifier.fit(vffi, vlfi)
-            vlpr = classifier.classify(vfva + ovftr,
+            sub = common.subsampleIndexes(vlfi, fraction)
+            classifier.useNodes(nodes, [idx_fi[i] for i in sub], nodes, idx_va)
+            classifier.fit(vffi[sub], vlfi[sub])
+            vlpr = classifier.classify(np.vstack((vfva, ovftr)),
                                        vlva + ovltr,
                                        )
 
@@ -1032,7 +1442,7 @@ class OCSVM(SVM):
             yellow_err('OCSVM.simple__gridsearch__(): gamma = {0} result: {1}'.format(g, ret))
             return ret
 
-        params = common.gridSearchExponential('min', ofOCSVM, [2**i for i in range(-15, 3 + 1)])
+        params = self._gridSearch(ofOCSVM, [2**i for i in range(-15, 3 + 1)])
         g, = params
 
         self._parameters['gamma'] = g
@@ -1101,10 +1511,8 @@ class MCOCBClassifier(Classifier):
                 occ.fit(self._vftr, vl)
 
             else:
-                vf, vl = map(list,
-                             zip(*[(f, l)
-                                   for f, l in zip(self._vftr, self._vltr)
-                                   if l == clss]))
+                idx = [i for i, l in enumerate(self._vltr) if l == clss]
+                vf, vl = self._vftr[idx], [self._vltr[i] for i in idx]
 
                 occ = self._occ.copy()
                 occ.fit(vf, vl)
@@ -1115,11 +1523,14 @@ class MCOCBClassifier(Classifier):
         Classifier.simpleclassify(self, auxiliar)
 
         lst_vlpr, lst_margin_distances = [], []
+        test_nodes = sharedNodes(self._vfte, self._occ)
         for occ in self._one_class_classifiers:
             margin_distances = []
-            vlpr = occ.classify(self._vfte,
-                                self._vlte,
-                                margin_distances)
+            vlpr = classifyWithNodes(occ,
+                                     test_nodes,
+                                     self._vfte,
+                                     self._vlte,
+                                     margin_distances)
 
             lst_vlpr.append(vlpr);
             lst_margin_distances.append([x[0]
@@ -1204,7 +1615,7 @@ class MCOCSVM(MCOCBClassifier):
 
         assert not self._parameters.has_key('occ')
 
-        self._parameters['occ'] = OCSVM()
+        self._parameters['occ'] = OCSVM(**searchParameters(self._parameters))
 
         MCOCBClassifier.simple__init__(self)
 
@@ -1274,8 +1685,8 @@ class SVM1VS(BSVM):
         vfva = vector of validation features
         vlva = vector of validation labels
         """
-        vffi, vlfi = (np.array(self._vftr)[itr]).tolist(), (np.array(self._vltr)[itr]).tolist()
-        vfva, vlva = (np.array(self._vftr)[iva]).tolist(), (np.array(self._vltr)[iva]).tolist()
+        vffi, vlfi = self._vftr[itr], (np.array(self._vltr)[itr]).tolist()
+        vfva, vlva = self._vftr[iva], (np.array(self._vltr)[iva]).tolist()
 
         """
         Printing
@@ -1287,8 +1698,16 @@ class SVM1VS(BSVM):
             assert isinstance(vlva2, list)
             yellow_err('SVM1VS.simple__gridsearch__(): {0} {1} {2}'.format(c, vlfi2.count(c), vlva2.count(c)))
 
+        """
+        The 'svm_node' arrays of the samples are built once, for all the
+        points of the grid.
+        """
+        nodes, nodes_idx = self._trainingNodes()
+        idx_fi = [nodes_idx[i] for i in itr]
+        idx_va = [nodes_idx[i] for i in iva]
+
         if self._parameters['kernel_type'] == 2:
-            def ofSVM1VS(c, g, near_pressure, far_pressure):
+            def ofSVM1VS(fraction, c, g, near_pressure, far_pressure):
                 """
                 Objective Function.
                 """
@@ -1299,7 +1718,9 @@ class SVM1VS(BSVM):
                     near_pressure=near_pressure,
                     far_pressure=far_pressure,
                     )
-                classifier.fit(vffi, vlfi)
+                sub = common.subsampleIndexes(vlfi, fraction)
+                classifier.useNodes(nodes, [idx_fi[i] for i in sub], nodes, idx_va)
+                classifier.fit(vffi[sub], [vlfi[i] for i in sub])
                 vlpr = classifier.classify(vfva, vlva)
 
                 """
@@ -1322,12 +1743,12 @@ class SVM1VS(BSVM):
                            .format(c, g, near_pressure, far_pressure, ret, results['AKS'], results['AUS']))
                 return ret
 
-            params = common.gridSearchExponential('min', ofSVM1VS,
-                                                  [2**i for i in range(-5, 15 + 1)],
-                                                  [2**i for i in range(-15, 3 + 1)],
-                                                  [2**i for i in [-15, -7, -2, 0, 2]],
-                                                  [2**i for i in [-15, -7, -2, 0, 2]],
-                                                  )
+            params = self._gridSearch(ofSVM1VS,
+                                      [2**i for i in range(-5, 15 + 1)],
+                                      [2**i for i in range(-15, 3 + 1)],
+                                      [2**i for i in [-15, -7, -2, 0, 2]],
+                                      [2**i for i in [-15, -7, -2, 0, 2]],
+                                      )
             c, g, near_pressure, far_pressure = params
 
             assert not self._parameters.has_key('C')
@@ -1343,7 +1764,7 @@ class SVM1VS(BSVM):
             yellow_err('SVM1VS.simple__gridsearch__(): C, gamma, near, far = {0}, {1}, {2}, {3}'.format(c, g, near_pressure, far_pressure))
 
         elif self._parameters['kernel_type'] == 0:
-            def ofSVM1VS(c, near_pressure, far_pressure):
+            def ofSVM1VS(fraction, c, near_pressure, far_pressure):
                 """
                 Objective Function.
                 """
@@ -1353,7 +1774,9 @@ class SVM1VS(BSVM):
                     near_pressure=near_pressure,
                     far_pressure=far_pressure,
                     )
-                classifier.fit(vffi, vlfi)
+                sub = common.subsampleIndexes(vlfi, fraction)
+                classifier.useNodes(nodes, [idx_fi[i] for i in sub], nodes, idx_va)
+                classifier.fit(vffi[sub], [vlfi[i] for i in sub])
                 vlpr = classifier.classify(vfva, vlva)
 
                 """
@@ -1376,11 +1799,11 @@ class SVM1VS(BSVM):
                            .format(c, near_pressure, far_pressure, ret, results['AKS'], results['AUS']))
                 return ret
 
-            params = common.gridSearchExponential('min', ofSVM1VS,
-                                                  [2**i for i in range(-5, 15 + 1)],
-                                                  [2**i for i in [-15, -7, -2, 0, 2]],
-                                                  [2**i for i in [-15, -7, -2, 0, 2]],
-                                                  )
+            params = self._gridSearch(ofSVM1VS,
+                                      [2**i for i in range(-5, 15 + 1)],
+                                      [2**i for i in [-15, -7, -2, 0, 2]],
+                                      [2**i for i in [-15, -7, -2, 0, 2]],
+                                      )
             c, near_pressure, far_pressure = params
 
             assert not self._parameters.has_key('C')
@@ -1414,6 +1837,7 @@ class MCSVM1VS(MCBBClassifier):
 
         self._parameters['bc'] = SVM1VS(
             kernel_type=self._parameters['kernel_type'],
+            **searchParameters(self._parameters)
             )
 
         MCBBClassifier.simple__init__(self)
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+"""
+Benchmark of the exact RBF SVM (LIBSVM) against the RBF SVM approximated by
+the Nystroem map and by random Fourier features, with a linear SVM on them
+(LIBLINEAR): accuracy on held-out samples, and time of fit and
+classification, on a random split of a feature file in the format of
+'common.loadFeatures'.
+
+Without --C and --gamma, each classifier searches them on its training
+samples.
+
+Example:
+    python benchmark_SVM.py features.txt --train 0.5 --components 500 2000
+"""
+
+#Python imports
+import os
+import sys
+
+#Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+import common
+import SVM
+import LinearSVM
+
+def benchmark(features_path, train_fraction, list_components, c, gamma,
+        skip_exact, seed):
+    """
+    Prints a line per classifier: name, accuracy, fit and classification
+    times.
+    """
+    
+    labels, feats = common.loadFeatures(features_path)
+    
+    train, test = common.splitTrainTest(labels, train_fraction, seed)
+    
+    print "Train samples:", len(train), "Test samples:", len(test)
+    print "%-20s %10s %12s %12s" % ("Classifier", "Accuracy", "Fit (s)",
+            "Classify (s)")
+    
+    #Parameters given to every classifier
+    parameters = {}
+    if c is not None:
+        parameters['C'] = c
+    if gamma is not None:
+        parameters['gamma'] = gamma
+    
+    classifiers = []
+    if not skip_exact:
+        if c is not None and gamma is not None:
+            exact = SVM.MCBBClassifier(bc=SVM.BSVM(**parameters),
+                                       approach='OVA')
+        else:
+            exact = SVM.MCSVM(approach='OVA')
+        classifiers.append(("RBF SVM", exact))
+    for components in list_components:
+        for approximation in ['nystroem', 'fourier']:
+            classifiers.append(("%s %d" % (approximation, components),
+                    LinearSVM.ApproximateRBFSVM(approximation=approximation,
+                                                components=components,
+                                                seed=seed, **parameters)))
+    
+    for name, classifier in classifiers:
+        accuracy, fit_time, classify_time = common.evaluate(classifier,
+                feats[train], labels[train], feats[test], labels[test])
+        print "%-20s %10.4f %12.2f %12.2f" % (name, accuracy, fit_time,
+                classify_time)
+
+if __name__ == "__main__":
+
+    # Argument parser
+    parser = common.benchmarkParser("Exact x approximated RBF SVM benchmark",
+            "RBF SVM", "Seed of the split and of the approximations.")
+    parser.add_argument('--components', type=int, nargs='+', default=[1000],
+            help="Dimensions of the feature maps of the approximations.")
+    parser.add_argument('--C', type=float, default=None,
+            help="C of every classifier.  Searched if not given.")
+    parser.add_argument('--gamma', type=float, default=None,
+            help="gamma of the RBF kernel of every classifier.  Searched if "
+            "not given.")
+    
+    args = parser.parse_args()
+    
+    benchmark(args.features_path, args.train, args.components, args.C,
+            args.gamma, args.skip_exact, args.seed)
@@ -38,8 +38,6 @@
 #Python imports
 import os
 import sys
-import numpy
-from sklearn import preprocessing
 from sklearn.externals import joblib
 from subprocess import call
 
@@ -50,8 +48,10 @@ call(["./prepareLibSVM.sh", "clean"], cwd="{0}".format(dirname))
 call(["./prepareLibSVM.sh"], cwd="{0}".format(dirname))
 call(["./prepareLib1VS.sh", "clean"], cwd="{0}".format(dirname))
 call(["./prepareLib1VS.sh"], cwd="{0}".format(dirname))
+import common
 import Classifier
 import SVM
+import LinearSVM
 import svmutil
 
 #CONSTANTS
@@ -72,6 +72,18 @@ def svm_approach(string):
     else:
         return 'OVA'
 
+def svm_search(string):
+    """
+    Function to translate the string of the hyperparameter search to a string
+    recognized by the plugin.  Experiments without the parameter use the
+    exhaustive grid.
+    """
+    
+    if string == 'Successive Halving':
+        return 'halving'
+    else:
+        return 'grid'
+
 def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
         parameters):
     """
@@ -84,48 +96,33 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
     
     #Get parameters
     MCSVM_approach = svm_approach(parameters['Approach'])
+    MCSVM_search = svm_search(parameters.get('Search'))
+    MCSVM_approximation = LinearSVM.approximationParameters(parameters)
     
     #Paths
-    temp_path = os.path.abspath(os.path.join(dirname, "..", "..", "temp"))
+    temp_path = common.tempFolder()
     model_path = os.path.join(temp_path, "iteration:" + str(iteration) + \
             "-MCSVM_" + str(pos_fold) + ".model")
     
-    #Preprocess each class to a unique value to the classification
-    label_encoder = preprocessing.LabelEncoder()
-    label_encoder.fit(classes_list)
-    print "List of classes of this experiment:", label_encoder.classes_
-    
-    #Read the train file and save the list of class and the list
-    #of feature vectors
-    list_class = []
-    list_fv = []
-    
-    for img in train_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(images[img][POS_FV][INDEX_ZERO])
-    
-    list_train = numpy.array(list_fv)
-    list_train_class = numpy.array(list_class)
-    
-    #Given a list of classes, transform each value in this list to a integer
-    list_train_class = label_encoder.transform(list_train_class)
-    
-    #Read the test list and save the list of class and the list
-    #of feature vectors
+    #Train and test matrices, with the classes of the training set encoded
+    #as indexes of the classes of the experiment
+    classes, list_train, list_train_class, list_test, list_test_class = \
+            common.foldMatrices(images, classes_list, train_set, test_set)
     list_img = test_set
-    list_class = []
-    list_fv = []
-    
-    for img in test_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(numpy.array(images[img][POS_FV][INDEX_ZERO]))
-    
-    list_test = numpy.array(list_fv)
-    list_test_class = numpy.array(list_class)
+    print "List of classes of this experiment:", classes
     
     #Classification
     #--------------------------------------------------------------------------
-    mcsvm = SVM.MCSVM(approach=MCSVM_approach)
+    if MCSVM_approximation['approximation'] is None:
+        mcsvm = SVM.MCSVM(approach=MCSVM_approach, search=MCSVM_search)
+    elif MCSVM_approach == 'OVA':
+        #RBF kernel approximated by a feature map, and a linear SVM on it,
+        #One vs All by LIBLINEAR itself
+        mcsvm = LinearSVM.ApproximateRBFSVM(search=MCSVM_search,
+                                            **MCSVM_approximation)
+    else:
+        mcsvm = SVM.MCLinearSVM(approach=MCSVM_approach, search=MCSVM_search,
+                                **MCSVM_approximation)
     
     #Fit
     print "\tFit: Beginning"
@@ -140,20 +137,8 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
     list_predict = mcsvm.classify(list_test)
     print "\tPredict: Done"
     
-    #Mapping the results into integers
-    list_predict = map(int, list_predict)
-    #Returning the result to strings
-    list_predict = label_encoder.inverse_transform(list_predict)
-    
-    list_result = []
-    for predict in list_predict:
-        img_result = [0] * len(label_encoder.classes_)
-        #Find all predict in the list label_encoder.classes_ and grab the
-        #first index
-        pos = label_encoder.classes_.tolist().index(predict)
-        img_result[pos] = 1
-        list_result.append(img_result)
+    list_result = common.oneHot(list_predict, len(classes)).tolist()
     #--------------------------------------------------------------------------
     
-    return list_img, list_test_class, list_result, label_encoder.classes_, \
+    return list_img, list_test_class, list_result, classes, \
             model_paths
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+from termcolor import *
+import sys
+cyan_err('import svmnode')
+
+import ctypes
+import numpy as np
+
+"""
+The 'svm_node' of LIBSVM: an int index followed by a double value, with
+the padding of the C struct.
+"""
+NODE = np.dtype([('index', np.intc), ('value', np.float64)], align=True)
+
+
+class NodeRows(list):
+    """
+    List of rows of a 'NodeMatrix', each one a pointer to the 'svm_node'
+    array of a sample.  The libraries (svm.py and svm1vs.py) take these
+    pointers as they are, instead of building the 'svm_node' array of
+    each sample, and 'max_index' as the number of features of the problem.
+    """
+    pass
+
+
+class NodeMatrix(object):
+    """
+    The samples of a 2-D array of features as 'svm_node' arrays of LIBSVM,
+    all of them packed in one buffer built by vectorized NumPy operations.
+    As in 'gen_svm_nodearray', the indexes start at 1 and the zeros are
+    left out.
+
+    The same 'NodeMatrix' gives the rows of any subset of its samples, so
+    it is built once per training matrix and used by every fit of a grid
+    search and by every binary classifier of a 'MCBBClassifier', and once
+    per testing matrix for the predictions of all of them.
+    """
+    def __init__(self, matrix):
+        matrix = np.ascontiguousarray(matrix, dtype=np.float64)
+        if matrix.ndim == 1 and len(matrix) == 0:
+            matrix = matrix.reshape((0, 0))
+        assert matrix.ndim == 2
+
+        rows_idx, cols = np.nonzero(matrix)  # row by row
+        counts = np.bincount(rows_idx, minlength=len(matrix))
+        ends = np.cumsum(counts + 1)    # one past the terminator of each row
+        self._offsets = ends - counts - 1
+
+        first = np.cumsum(counts) - counts  # first nonzero of each row
+        positions = (self._offsets[rows_idx] +
+                     np.arange(len(rows_idx)) - first[rows_idx])
+
+        self._nodes = np.zeros(ends[-1] if len(ends) > 0 else 0, NODE)
+        self._nodes['index'][positions] = cols + 1
+        self._nodes['value'][positions] = matrix[rows_idx, cols]
+        self._nodes['index'][ends - 1] = -1
+
+        self.max_index = int(cols.max()) + 1 if len(cols) > 0 else 0
+        self._rows = {}
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __repr__(self):
+        return 'NodeMatrix({0} samples)'.format(len(self))
+
+    def rows(self, library, idx=None):
+        """
+        Input:
+        library = the module of the bindings (svmutil or svmutil1vs), whose 'svm_node' is used.
+        idx = indexes of the samples.  All of them if None.
+
+        Output:
+        NodeRows of the samples.  Each pointer keeps the buffer alive, so
+        the models trained with them can outlive this 'NodeMatrix'.
+        """
+        if not self._rows.has_key(library):
+            array = (library.svm_node * len(self._nodes)).from_buffer(self._nodes)
+            self._rows[library] = [ctypes.pointer(array[int(offset)])
+                                   for offset in self._offsets]
+
+        rows = self._rows[library]
+        ret = NodeRows(rows
+                       if idx is None
+                       else [rows[i] for i in idx])
+        ret.max_index = self.max_index
+
+        return ret
+
+
+class KernelMatrix(NodeMatrix):
+    """
+    The rows of a kernel in the format of the precomputed kernel of LIBSVM
+    (kernel_type 4), packed in one buffer as a 'NodeMatrix': node 0 holds
+    the serial number of the sample (1 for the first row, or 0 for the
+    testing samples, whose serial is not read), and node j the kernel
+    value with the j-th training sample, zeros included, since LIBSVM
+    reads them by position.
+
+    LIBSVM finds the kernel value of two training samples by the serial
+    number of one in the row of the other, so the rows of any subset of
+    the samples of a kernel of all of them train a model of the subset,
+    and the testing rows against all of them predict with that model.
+    """
+    def __init__(self, kernel, serials=True):
+        kernel = np.asarray(kernel, dtype=np.float64)
+        assert kernel.ndim == 2
+        n, m = kernel.shape
+
+        nodes = np.zeros((n, m + 2), NODE)
+        nodes['index'] = np.arange(m + 2)
+        nodes['index'][:, -1] = -1
+        nodes['value'][:, 1:m + 1] = kernel
+        if serials:
+            nodes['value'][:, 0] = np.arange(1, n + 1)
+
+        self._nodes = nodes.reshape(-1)
+        self._offsets = np.arange(n) * (m + 2)
+        self.max_index = m
+        self._rows = {}
@@ -36,10 +36,16 @@
 ###############################################################################
 
 #Python imports
+import os
+import sys
 
 #Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(dirname)
+import common
 
-def classify(images, train_set, test_set, fv_pos, descriptor, parameters):
+def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
+        parameters):
     """
     Performs the classification of the test_set according to the train_set.
     """
@@ -48,35 +54,49 @@ def classify(images, train_set, test_set, fv_pos, descriptor, parameters):
     
     #Get parameters
     
-    #Read the train file and save the list of class and the list
-    #of feature vectors
-    list_class = []
-    list_fv = []
-    
-    for img in train_set:
-        list_class.append(images[img][0])
-        list_fv.append(images[img][1][fv_pos])
+    #Train and test matrices, filled once, with the classes of the training
+    #set encoded as indexes of the sorted classes of the experiment
+    classes, list_train, list_train_class, list_test, list_class = \
+            common.foldMatrices(images, classes_list, train_set, test_set)
+    print "List of classes of this experiment:", classes
     
     #Classification
     #--------------------------------------------------------------------------
-    #Preprocess the list of class to integers
-    label_encoder = preprocessing.LabelEncoder()
-    list_class = label_encoder.fit_transform(list_class)
-    print "List of classes of this experiment:", label_encoder.classes_
     
     #Save configuration of the EXAMPLE
     str_configuration = None
     
     list_img = test_set
-    list_class = []
-    list_fv = []
-    
-    for img in test_set:
-        list_class.append(images[img][0])
-        list_fv.append(images[img][1][fv_pos])
     
-    list_result = []
+    #One row per image of test_set, with 1 in the column of its predicted
+    #class (common.oneHot), or with the score of each class
+    list_predict = []
+    list_result = common.oneHot(list_predict, len(classes)).tolist()
     #--------------------------------------------------------------------------
     
-    return list_img, list_class, list_result, label_encoder.classes_, \
+    return list_img, list_class, list_result, classes, \
            str_configuration
+
+def load_model(model_paths, parameters):
+    """
+    Optional. Loads the model saved by classify, given the paths of its files
+    (the paths returned by classify, the main one first).
+    
+    Together with predict, it allows the prediction of new images with the
+    saved models (predict.py), without running the experiment again.
+    """
+    
+    model = None
+    
+    return model
+
+def predict(model, list_fv, parameters):
+    """
+    Optional. Predicts the classes of the feature vectors in list_fv with a
+    model loaded by load_model, as indexes of the classes returned by
+    classify.
+    """
+    
+    list_predict = []
+    
+    return list_predict
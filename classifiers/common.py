@@ -40,11 +40,14 @@ import sys
 cyan_err('import common')
 
 import hashfile
+import os
 import itertools as it
+import multiprocessing as mp
 import random
 import numpy as np
 import sklearn.metrics as skms
 import math
+import time
 import traceback
 
 
@@ -95,6 +98,78 @@ def loadFeatures(file_name):
     return labels, feats
 
 
+def benchmarkParser(description, exact, seed_help):
+    """
+    Argument parser of the benchmarks of the classifiers, with the
+    arguments they share: the feature file of 'loadFeatures', '--train',
+    '--skip-exact' and '--seed'.  Each benchmark adds its own.
+
+    Input:
+    description :: String
+    exact :: String
+    exact: Name of the exact classifier skipped by '--skip-exact'.
+    seed_help :: String
+    seed_help: What '--seed' seeds.
+
+    Output:
+    parser :: argparse.ArgumentParser
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('features_path', help="Path to the feature file: "
+                        "one sample per line, the label followed by the features.")
+    parser.add_argument('--train', type=float, default=0.5,
+                        help="Fraction of the samples used for training.")
+    parser.add_argument('--skip-exact', action='store_true',
+                        help="Do not run the exact {0}.".format(exact))
+    parser.add_argument('--seed', type=int, default=0, help=seed_help)
+
+    return parser
+
+
+def splitTrainTest(labels, fraction, seed=0):
+    """
+    Random split of the samples of a benchmark.
+
+    Input:
+    labels :: np.array([Int])
+    fraction :: Float
+    fraction: Fraction of the samples used for training.
+    seed :: Int
+
+    Output:
+    train, test :: np.array([Int])
+    train, test: Indexes of the training and of the testing samples.
+    """
+    permutation = np.random.RandomState(seed).permutation(len(labels))
+    n_train = int(round(fraction * len(labels)))
+
+    return permutation[:n_train], permutation[n_train:]
+
+
+def evaluate(classifier, vftr, vltr, vfte, vlte):
+    """
+    Fits and classifies with 'classifier', a 'Classifier'.
+
+    Output:
+    accuracy :: Float
+    fit_time, classify_time :: Float
+    fit_time, classify_time: Seconds of the fit and of the classification.
+    """
+    start = time.time()
+    classifier.fit(vftr, vltr)
+    fit_time = time.time() - start
+
+    start = time.time()
+    lpr = classifier.classify(vfte)
+    classify_time = time.time() - start
+
+    accuracy = np.mean(np.array(lpr) == vlte)
+
+    return accuracy, fit_time, classify_time
+
+
 def splitTrainTestOS(labels, feats, acs):
     """
     Split 'labels' and 'feats' in train and test for
@@ -238,6 +313,70 @@ def limitTraining(lv, fv, acs):
     return lv, fv
 
 
+def subsampleIndexes(lv, fraction, seed=0):
+    """
+    Stratified subsample of the training samples, used to evaluate the
+    hyperparameters on part of the data.  The same 'fraction' and 'seed'
+    give the same samples, and every class keeps at least one sample.
+
+    Input:
+        lv :: [Float]
+        lv: Label vector.
+        fraction :: Float
+        fraction: Fraction of the samples of each class to keep.
+        seed :: Int
+
+    Output:
+        idx :: [Int]
+        idx: Indexes of the kept samples, in increasing order.  All the
+        indexes if 'fraction' is 1 or more.
+    """
+    labels = list(lv)
+
+    if fraction >= 1.0:
+        return range(len(labels))
+
+    random_state = np.random.RandomState(seed)
+    idx = []
+    for clss in sorted(set(labels)):
+        clss_idx = [i for i, l in enumerate(labels) if l == clss]
+        size = max(1, int(math.ceil(fraction * len(clss_idx))))
+        idx.extend(random_state.permutation(clss_idx)[:size].tolist())
+    idx.sort()
+
+    return idx
+
+
+def subsampleTraining(lv, fv, fraction, seed=0):
+    """
+    The samples of 'subsampleIndexes', in their original order.
+
+    Input:
+        lv :: [Float]
+        lv: Label vector.
+        fv :: [[Float]]
+        fv: Vector of feature vectors.
+        fraction :: Float
+        fraction: Fraction of the samples of each class to keep.  'lv' and
+        'fv' are returned as they are if it is 1 or more.
+        seed :: Int
+
+    Output:
+        (lv, fv) :: ([Float], [[Float]]), or numpy arrays if 'lv' and 'fv'
+        are numpy arrays.
+    """
+    assert len(lv) == len(fv)
+
+    if fraction >= 1.0:
+        return lv, fv
+
+    idx = subsampleIndexes(lv, fraction, seed)
+
+    if isinstance(lv, np.ndarray) and isinstance(fv, np.ndarray):
+        return lv[idx], fv[idx]
+    return [lv[i] for i in idx], [fv[i] for i in idx]
+
+
 #===============================================================================
 # Functions related to the acquisition of the results, based on the predicted
 # labels.
@@ -520,12 +659,81 @@ def mymeshgrid(*lst):
 
     return ret
 
-def gridSearch(iterations, max_or_min, of, *params): # PEDRORMJUNIOR: 20130806: add max_or_min
+"""
+Objective function, points and exception handling of the grid being
+evaluated.  The processes of the pool are forked after it is assigned,
+so the objective function can be a closure (it is not pickled).
+"""
+_grid_shared = None
+
+
+def _gridTask(i):
+    of, meshparams, catch = _grid_shared
+    if not catch:
+        return i, of(*meshparams[i]), None
+    try:                    # Maybe, the params are not valid.
+        return i, of(*meshparams[i]), None
+    except Exception as expt:
+        return i, None, traceback.format_exc()[:-1]
+
+
+def evaluateGrid(max_or_min, of, meshparams, catch=False, processes=0, chunksize=1):
+    """
+    Input:
+    of = objective function.
+    meshparams = list of points, each one a list of parameters of 'of'.
+    catch = if True, a point whose evaluation raises an exception is logged and left out of the results.
+    processes = number of processes evaluating the points.  All the cores if it is 0 or less.
+    chunksize = number of consecutive points sent to a process at once.
+
+    Output:
+    results = list of tuples (score, -i if max_or_min == 'min' else i, i), in the order of the points.  The best point is the maximum tuple, as in the serial evaluation.
+
+    The points are evaluated by this process when there is only one
+    process, or when this process is already a worker of a pool, which
+    cannot have children.
+    """
+    global _grid_shared
+
+    processes = processes if processes > 0 else mp.cpu_count()
+    processes = min(processes, len(meshparams))
+
+    previous = _grid_shared
+    _grid_shared = (of, meshparams, catch)
+    try:
+        if processes <= 1 or mp.current_process().daemon:
+            evaluations = map(_gridTask, range(len(meshparams)))
+        else:
+            yellow_err('gridSearch(): {0} points in {1} processes'.format(len(meshparams), processes))
+            pool = mp.Pool(processes)
+            try:
+                evaluations = pool.map(_gridTask, range(len(meshparams)), chunksize)
+            finally:
+                pool.close()
+                pool.join()
+    finally:
+        _grid_shared = previous
+
+    results = []
+    for i, score, error in evaluations:
+        if error is not None:
+            red_err(error)
+            red_err('gridSearch: except: i, params = {0} {1}'.format(i, meshparams[i]))
+        else:
+            results.append((score,
+                            (-i if max_or_min == 'min' else i),
+                            i))
+
+    return results
+
+
+def gridSearch(iterations, max_or_min, of, *params, **kwargs): # PEDRORMJUNIOR: 20130806: add max_or_min
     """
     Input:
     iterations = number of iterations
     of = objective function.  A function that receives 'n' parameters and return an accuracy measure.
     *params = lists of parameters.  The first list constains values to be grid searched as the first parameters of the 'of'.  The second list contains values to be grid searched as the second parameters of the 'of'.  And so on...
+    **kwargs = 'processes' and 'chunksize' of 'evaluateGrid'.
 
     Output:
     ret = a list of parameters of size 'n'.  The best combination of parameters according to the 'of'.
@@ -541,12 +749,7 @@ def gridSearch(iterations, max_or_min, of, *params): # PEDRORMJUNIOR: 20130806:
 
     meshparams = mymeshgrid(*params)
 
-    results = []
-    for i in range(len(meshparams)):
-        res = (of(*meshparams[i]),
-               (-i if max_or_min == 'min' else i),
-               i)
-        results.append(res)
+    results = evaluateGrid(max_or_min, of, meshparams, **kwargs)
     _, _, best_params_idx = max(results)
     yellow_err('gridSearch(): best_params = {0}'.format(meshparams[best_params_idx]))
 
@@ -561,16 +764,17 @@ def gridSearch(iterations, max_or_min, of, *params): # PEDRORMJUNIOR: 20130806:
                                          num=lenranges[i]).tolist(),
                         range(len(lenranges)))
 
-        ret = gridSearch(iterations - 1, max_or_min, of, *newparams)
+        ret = gridSearch(iterations - 1, max_or_min, of, *newparams, **kwargs)
 
     return ret
 
 
-def gridSearchExponential(max_or_min, of, *params): # PEDRORMJUNIOR: 20130806: add max_or_min
+def gridSearchExponential(max_or_min, of, *params, **kwargs): # PEDRORMJUNIOR: 20130806: add max_or_min
     """
     Input:
     of = objective function.  A function that receives 'n' parameters and return an accuracy measure.
     *params = lists of parameters.  The first list constains values to be grid searched as the first parameters of the 'of'.  The second list contains values to be grid searched as the second parameters of the 'of'.  And so on...
+    **kwargs = 'processes' and 'chunksize' of 'evaluateGrid'.
 
     Output:
     ret = a list of parameters of size 'n'.  The best combination of parameters according to the 'of'.
@@ -584,16 +788,7 @@ def gridSearchExponential(max_or_min, of, *params): # PEDRORMJUNIOR: 20130806: a
 
     meshparams = mymeshgrid(*params)
 
-    results = []
-    for i in range(len(meshparams)):
-        try:                    # Maybe, the params are not valid.
-            res = (of(*meshparams[i]),
-                   (-i if max_or_min == 'min' else i),
-                   i)
-            results.append(res)
-        except Exception as expt:
-            red_err(traceback.format_exc()[:-1])
-            red_err('gridSearch: except: i, params = {0} {1}'.format(i, meshparams[i]))
+    results = evaluateGrid(max_or_min, of, meshparams, catch=True, **kwargs)
 
     _, _, best_params_idx = max(results)
     yellow_err('gridSearch(): best_params = {0}'.format(meshparams[best_params_idx]))
@@ -603,6 +798,100 @@ def gridSearchExponential(max_or_min, of, *params): # PEDRORMJUNIOR: 20130806: a
     return ret
 
 
+def gridSearchHalving(max_or_min, of, *params, **kwargs):
+    """
+    Input:
+    of = objective function.  A function that receives the fraction of the training samples to be used, followed by 'n' parameters, and return an accuracy measure.
+    *params = lists of parameters, as in 'gridSearchExponential'.
+    **kwargs = 'eta' (default 3), 'min_fraction' (default 1/9), 'stride' (default 2), and the 'processes' and 'chunksize' of 'evaluateGrid'.
+
+    Output:
+    ret = a list of parameters of size 'n'.  The best combination of parameters according to the 'of'.
+
+    Successive halving over the grid of 'gridSearchExponential'.  The
+    first round evaluates a coarse grid, one of every 'stride' values of
+    each parameter, with 'min_fraction' of the samples.  Each round keeps
+    the best 1/'eta' of the points, adds the neighbours of the best
+    1/'eta'**2 while the grid is coarse, and multiplies the fraction of
+    the samples by 'eta', until the remaining points are evaluated with
+    all the samples.  Ties are broken as in 'gridSearchExponential'.
+    """
+    assert max_or_min in ['min', 'max']
+
+    eta = kwargs.pop('eta', 3)
+    fraction = kwargs.pop('min_fraction', 1.0 / 9)
+    stride = kwargs.pop('stride', 2)
+    assert eta > 1 and 0.0 < fraction <= 1.0 and stride >= 1
+
+    lenranges = map(len, params)
+    assert all(map(lambda x: x > 1, lenranges))
+
+    """
+    The points are in the order of 'mymeshgrid', the first parameter
+    varying fastest, so the ties are broken as in the exhaustive grid.
+    """
+    meshparams = [list(reversed(point))
+                  for point in it.product(*reversed(params))]
+    meshindexes = [tuple(reversed(idx))
+                   for idx in it.product(*map(range, reversed(lenranges)))]
+    positions = dict((idx, i) for i, idx in enumerate(meshindexes))
+
+    """
+    Neighbours in the grid of the indexes: every adjacent point when
+    there are up to two parameters, and only along the axes otherwise,
+    so that the refinement does not grow exponentially.
+    """
+    if len(lenranges) <= 2:
+        offsets = [o for o in it.product(*[range(-stride + 1, stride)] * len(lenranges))
+                   if any(o)]
+    else:
+        offsets = [tuple(s if j == k else 0 for j in range(len(lenranges)))
+                   for k in range(len(lenranges))
+                   for s in range(-stride + 1, stride) if s != 0]
+
+    candidates = [i for i, idx in enumerate(meshindexes)
+                  if all(x % stride == 0 for x in idx)]
+
+    fits, cost = 0, 0.0
+    while True:
+        round_fraction = fraction
+        results = evaluateGrid(max_or_min,
+                               lambda *point: of(round_fraction, *point),
+                               [meshparams[i] for i in candidates],
+                               catch=True, **kwargs)
+        results = [(score, (-candidates[j] if max_or_min == 'min' else candidates[j]), candidates[j])
+                   for score, _, j in results]
+        fits += len(candidates)
+        cost += len(candidates) * fraction
+        yellow_err('gridSearchHalving(): fraction = {0} points = {1}'.format(fraction, len(candidates)))
+
+        if fraction >= 1.0 or len(results) <= 1:
+            break
+
+        results.sort(reverse=True)
+        leaders = [i for _, _, i in results[:int(math.ceil(len(results) / float(eta)))]]
+        refined = set(leaders)
+        if stride > 1:
+            for _, _, i in results[:int(math.ceil(len(results) / float(eta ** 2)))]:
+                for o in offsets:
+                    idx = tuple(x + y for x, y in zip(meshindexes[i], o))
+                    if positions.has_key(idx):
+                        refined.add(positions[idx])
+            stride = 1
+
+        candidates = sorted(refined)
+        fraction = min(1.0, fraction * eta)
+
+    _, _, best_params_idx = max(results)
+    yellow_err('gridSearchHalving(): best_params = {0}'.format(meshparams[best_params_idx]))
+    yellow_err('gridSearchHalving(): {0} fits ({1:.1f} with all the samples) instead of the {2} of the grid, {3:.1f} saved'
+               .format(fits, cost, len(meshparams), len(meshparams) - cost))
+
+    ret = meshparams[best_params_idx]
+
+    return ret
+
+
 def putUnknownLabel(lte, acs):
     """
     Unknown classes receive the label 0.
@@ -616,3 +905,99 @@ def putUnknownLabel(lte, acs):
         lte[np.logical_not(indexes)] = 0
 
         return lte
+
+
+def tempFolder():
+    """
+    Output:
+    path :: String
+    path: Folder for the temporary files of the current process, inside the
+    'temp' folder of the framework.  Each process has its own folder, so
+    folds classified in parallel, or experiments running at the same time,
+    do not overwrite the models and data files of each other.  The names of
+    the files do not change, only their folder.
+    """
+    path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
+                                        'temp', 'process_{0}'.format(os.getpid())))
+    if not os.path.exists(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            pass
+
+    return path
+
+
+def foldMatrix(images, images_set):
+    """
+    Input:
+    images :: {String: [[String], [[Float]]]}
+    images: Dictionary given to the classifier plugins, mapping each image to
+    its classes and its feature vectors.
+    images_set :: [String]
+    images_set: Images of the fold, in the order of the rows.
+
+    Output:
+    fv :: np.array([[Float]])
+    fv: Feature vectors of images_set, filled row by row in a matrix
+    allocated once.
+    """
+    if len(images_set) == 0:
+        return np.empty((0, 0))
+
+    fv = np.empty((len(images_set), len(images[images_set[0]][1][0])))
+    for row, img in enumerate(images_set):
+        fv[row] = images[img][1][0]
+
+    return fv
+
+
+def foldMatrices(images, classes_list, train_set, test_set):
+    """
+    Input:
+    images :: {String: [[String], [[Float]]]}
+    images: Dictionary given to the classifier plugins.
+    classes_list :: [String]
+    classes_list: Classes of the experiment.
+    train_set, test_set :: [String]
+    train_set, test_set: Images of the fold.
+
+    Output:
+    classes :: np.array([String])
+    classes: Sorted classes of the experiment, the same as the 'classes_' of
+    a LabelEncoder fitted to classes_list.
+    vftr, vfte :: np.array([[Float]])
+    vftr, vfte: Feature vectors of the training and test sets.
+    vltr :: np.array([Int])
+    vltr: Index in classes of the class of each training image.
+    vlte :: np.array([String])
+    vlte: Classes of the test images, which may be out of classes.
+    """
+    classes = np.unique(classes_list)
+    index = dict((clss, i) for i, clss in enumerate(classes.tolist()))
+
+    vltr = np.array([index[images[img][0][0]] for img in train_set], dtype=int)
+    vlte = np.array([images[img][0][0] for img in test_set])
+
+    return classes, foldMatrix(images, train_set), vltr, \
+        foldMatrix(images, test_set), vlte
+
+
+def oneHot(predictions, num_classes):
+    """
+    Input:
+    predictions :: [Int]
+    predictions: Predicted index of the class of each sample.
+    num_classes :: Int
+
+    Output:
+    result :: np.array([[Int]])
+    result: One row per sample, with 1 in the column of its predicted class
+    and 0 in the others, the format of the results of the classifier
+    plugins.
+    """
+    predictions = np.asarray(predictions, dtype=int)
+    result = np.zeros((len(predictions), num_classes), dtype=int)
+    result[np.arange(len(predictions)), predictions] = 1
+
+    return result
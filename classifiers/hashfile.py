@@ -35,43 +35,68 @@
 # this program.  If not, see <http://www.gnu.org/licenses/>.
 ###############################################################################
 
+
 from termcolor import *
 import sys
 cyan_err('import hashfile')
 
 import types
 import numpy as np
-from random import random
 import os
-import multiprocessing as mp
-import signal
+import time
+import errno
+import hashlib
+import sqlite3
+import tempfile
 
 
-def no_signal_handler(signal, frame):
-    red_err('You pressed Ctrl+C in hashfile.py! Try again later!')
+"""
+Size, in bytes, of the storage files a 'HashFile' keeps.  Beyond it,
+the least recently used files are removed.
+"""
+STORAGE_MAX_SIZE = 2**32
 
 
 class StorageFile():
-    def __init__(self, hashname):
+    def __init__(self, hashname, hashfile=None, key=None):
         """
+        hashfile = the 'HashFile' that gave this file, told of its
+        hits, misses and savings.  key = the name of this file in it.
         """
         assert isinstance(hashname, str)
         assert hashname[-4:] == '.npz'
 
         self.__hashname = hashname
+        self.__hashfile = hashfile
+        self.__key = key
 
     def __repr__(self):
         return 'StorageFile({0})'.format(self.__hashname)
 
     def saveVars(self, **kwargs):
         """
+        The variables are written to a temporary file that is then
+        renamed, so other processes never load a partial file.
         """
         assert len(kwargs) > 0
 
         vartypes = [(k, type(v))
                         for k, v
                         in kwargs.iteritems()]
-        np.savez(self.__hashname, vartypes=vartypes, **kwargs)
+
+        fd, tmpname = tempfile.mkstemp(suffix='.npz',
+                                       dir=os.path.dirname(self.__hashname))
+        os.close(fd)
+        try:
+            np.savez(tmpname, vartypes=vartypes, **kwargs)
+            os.rename(tmpname, self.__hashname)
+        except:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+
+        if self.__hashfile is not None:
+            self.__hashfile._stored(self.__key)
 
     def loadVars(self, *args):
         """
@@ -85,37 +110,70 @@ class StorageFile():
                      if vartypes[arg] == np.ndarray
                      else vartypes[arg](data[arg]) for arg in args]
         except:
+            if self.__hashfile is not None:
+                self.__hashfile._count('misses')
             raise Exception
 
+        if self.__hashfile is not None:
+            self.__hashfile._loaded(self.__key)
+
         return ret if len(ret) > 1 else ret[0]
 
 class HashFile():
-    __lock = mp.Lock()
-
+    """
+    Persistent cache of 'StorageFile's, keyed by a digest of the
+    parameters given to 'getStorageFile' and by the name of its caller.
+
+    The storage files are in subdirectories of 'storagedir' named by
+    the first two digits of their digests.  An sqlite index, named as
+    'hashfile' with the '.sqlite' extension, keeps their sizes and last
+    accesses, to remove the least recently used ones when they exceed
+    'max_size' bytes, and the counts of hits, misses and evictions.
+    A lookup writes nothing: the index is updated only when a storage
+    file is loaded or saved.
+    Several processes can use it at the same time: sqlite serializes
+    the writes to the index, and each storage file is renamed into
+    place only once complete.
+    """
     def __repr__(self):
-        print 'HashFile: ', self.__hashfile
+        return 'HashFile({0})'.format(self.__index)
 
-    def __init__(self, storagedir, hashfile):
+    def __init__(self, storagedir, hashfile, max_size=STORAGE_MAX_SIZE):
         """
         """
         assert isinstance(storagedir, str)
         assert isinstance(hashfile, str)
         assert storagedir[-1] == '/'
-        assert hashfile[-4:] == '.npz'
         assert hashfile.find('/') == -1
+        assert max_size > 0
 
         self.__storagedir = storagedir
-        self.__hashfile = storagedir + hashfile
+        self.__index = storagedir + os.path.splitext(hashfile)[0] + '.sqlite'
+        self.__max_size = max_size
+
+        self.__execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' name TEXT PRIMARY KEY,'
+            ' size INTEGER NOT NULL DEFAULT 0,'
+            ' atime REAL NOT NULL)',
+            'CREATE INDEX IF NOT EXISTS entries_atime ON entries (atime)',
+            'CREATE TABLE IF NOT EXISTS statistics ('
+            ' event TEXT PRIMARY KEY,'
+            ' count INTEGER NOT NULL)',
+            )
 
     def getStorageFile(self, params):
         """
         Input:
-            prefixname :: String
-            hashnamekey :: String
+            params :: [a]
+            params: Everything the stored variables depend on.  The
+            arrays are digested by their bytes, the other values by
+            their repr.
 
-        If you change the function 'prefixname', then it is safe to
-            remove all files will prefix 'prefixname' stored in 'storagedir'
-            to ensure a correct results according to the changes.
+        If you change the function that calls 'getStorageFile', then it
+            is safe to remove all files with its name as prefix stored in
+            'storagedir' to ensure a correct results according to the
+            changes.
 
         Limitations:
             It is not useful in a nondeterministic function.
@@ -123,111 +181,174 @@ class HashFile():
         """
         assert isinstance(params, list)
 
-        signal.signal(signal.SIGINT, no_signal_handler)
-        HashFile.__lock.acquire()
+        callersname = sys._getframe(1).f_code.co_name
+        digest = HashFile.__digest(params)
+        key = os.path.join(digest[:2], callersname + '-' + digest + '.npz')
+
         try:
-             callersname = sys._getframe(1).f_code.co_name
-             hashnamekey = self.__createHashNameKey(callersname, params)
-
-             self.__hashtable = self.loadHashTable()
-             yellow_err('HashFile.getStorageFile(): size: {0}'.format(len(self.__hashtable)))
-             try:
-                 hashname = self.__hashtable[hashnamekey]
-             except:
-                 self.__hashtable[hashnamekey] = self.createHashName(callersname)
-                 while len(self.__hashtable) != len(set(self.__hashtable.values())):
-                     """
-                     To ensure the created hash name do not exists previously.
-
-                     It is very possible this part of the code will never run.
-                     """
-                     self.__hashtable[hashnamekey] = self.createHashName(callersname)
-                 self.__saveHashTable()
-                 hashname = self.__hashtable[hashnamekey]
-
-             return StorageFile(self.__storagedir + hashname + '.npz')
+            os.mkdir(self.__storagedir + digest[:2])
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+        return StorageFile(self.__storagedir + key, self, key)
+
+    def statistics(self):
+        """
+        Reads the whole index, so it is meant to be called on demand,
+        not for every lookup.
+
+        Output:
+            Dictionary with the number of 'entries', their total 'size'
+            in bytes, and the counts of 'hits', 'misses' and
+            'evictions'.
+        """
+        conn = self.__connect()
+        try:
+            entries, size = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+            ret = dict((str(event), count)
+                       for event, count
+                       in conn.execute('SELECT event, count FROM statistics'))
         finally:
-            HashFile.__lock.release()
-            signal.signal(signal.SIGINT, signal.default_int_handler)
+            conn.close()
+
+        for event in ['hits', 'misses', 'evictions']:
+            ret.setdefault(event, 0)
+        ret['entries'] = entries
+        ret['size'] = size
+
+        return ret
 
     def removeHashTable(self):
         """
         """
-        os.remove(self.__hashfile)
+        os.remove(self.__index)
 
-    @staticmethod
-    def createHashName(prefixname=''):
+    def _count(self, event):
         """
+        Counts one 'event' ('hits', 'misses' or 'evictions').
         """
-        assert isinstance(prefixname, str)
-
-        ret = (prefixname + '-'
-                 if len(prefixname) > 0
-                 else '') + str(random())[2:] + str(random())[2:] + str(random())[2:] + str(random())[2:]
-
-        assert isinstance(ret, str)
-
-        return ret
+        self.__execute(('INSERT OR IGNORE INTO statistics (event, count) VALUES (?, 0)',
+                        (event,)),
+                       ('UPDATE statistics SET count = count + 1 WHERE event = ?',
+                        (event,)))
 
-    def loadHashTable(self):
+    def _loaded(self, key):
+        """
+        Counts a hit and records the access to the storage file 'key',
+        just loaded.
+        """
+        self.__execute(('UPDATE entries SET atime = ? WHERE name = ?',
+                        (time.time(), key)),
+                       ('INSERT OR IGNORE INTO statistics (event, count) VALUES (?, 0)',
+                        ('hits',)),
+                       ('UPDATE statistics SET count = count + 1 WHERE event = ?',
+                        ('hits',)))
+
+    def _stored(self, key):
         """
+        Records the size of the storage file 'key', just saved, and
+        removes the least recently used other files while all of them
+        exceed 'max_size' bytes.
         """
+        size = os.path.getsize(self.__storagedir + key)
+
+        conn = self.__connect()
         try:
-            hashtable = np.load(self.__hashfile)
-            hashtable = dict(map(lambda (x, y): (x, str(y)),
-                                        dict(hashtable).iteritems()))
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('INSERT OR REPLACE INTO entries (name, size, atime) VALUES (?, ?, ?)',
+                         (key, size, time.time()))
+
+            total, = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()
+            evicted = 0
+            if total > self.__max_size:
+                for name, size in conn.execute('SELECT name, size FROM entries'
+                                               ' WHERE name != ? ORDER BY atime',
+                                               (key,)).fetchall():
+                    if total <= self.__max_size:
+                        break
+                    try:
+                        os.remove(self.__storagedir + name)
+                    except OSError:
+                        pass
+                    conn.execute('DELETE FROM entries WHERE name = ?', (name,))
+                    total -= size
+                    evicted += 1
+
+            if evicted > 0:
+                conn.execute('INSERT OR IGNORE INTO statistics (event, count) VALUES (?, 0)',
+                             ('evictions',))
+                conn.execute('UPDATE statistics SET count = count + ? WHERE event = ?',
+                             (evicted, 'evictions'))
+                yellow_err('HashFile._stored(): {0} files evicted'.format(evicted))
+
+            conn.execute('COMMIT')
         except:
-            hashtable = {}
+            conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
 
-        return hashtable
+    def __connect(self):
+        """
+        A connection to the index.  Connections are not kept, since they
+        cannot be shared by forked processes.
+        """
+        return sqlite3.connect(self.__index, timeout=600, isolation_level=None)
 
-    def __saveHashTable(self):
+    def __execute(self, *statements):
         """
+        Executes the statements (strings, or tuples of a string and its
+        parameters) in one transaction.
         """
+        conn = self.__connect()
         try:
-            np.savez(self.__hashfile, **self.__hashtable)
-        except:
-            raise Exception('Possibly, the arguments to the getStorageFile function are very big.')
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for statement in statements:
+                    if isinstance(statement, tuple):
+                        conn.execute(*statement)
+                    else:
+                        conn.execute(statement)
+                conn.execute('COMMIT')
+            except:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
 
     @staticmethod
-    def __myrepr(obj):
+    def __digest(params):
         """
+        SHA-1 digest of 'params', the same in every run, unlike the
+        'hash()' of their repr.
         """
-        if isinstance(obj, types.FunctionType):
-            return obj.func_name + '()'
-        elif isinstance(obj, list):
-            reprs = map(HashFile.__myrepr, obj)
-            reprs = reduce(lambda x, y: x + ',' + y, reprs)
-            return '[' + reprs + ']'
-        elif isinstance(obj, tuple):
-            if len(obj) == 0:
-                return '()'
-            reprs = map(HashFile.__myrepr, obj)
-            reprs = reduce(lambda x, y: x + ',' + y, reprs)
-            reprs += ',' if len(obj) == 1 else ''
-            return '(' + reprs + ')'
-        elif isinstance(obj, set):
-            reprs = HashFile.__myrepr(list(obj))
-            return 'set(' + reprs + ')'
-        elif isinstance(obj, dict):
-            reprs = zip(map(HashFile.__myrepr, obj.keys()), map(HashFile.__myrepr, obj.values()))
-            reprs = map(lambda (k,v): k + ':' + v, reprs)
-            reprs = reduce(lambda x, y: x + ',' + y, reprs)
-            return '{' + reprs + '}'
-        elif isinstance(obj, type):
-            return repr(obj).replace(' ', '')
-        else:
-            return repr(obj)
+        digest = hashlib.sha1()
+        HashFile.__update(digest, params)
+
+        return digest.hexdigest()
 
     @staticmethod
-    def __createHashNameKey(callersname, params):
+    def __update(digest, obj):
         """
         """
-        assert isinstance(callersname, str)
-        assert isinstance(params, list)
-
-        reprs = [str(hash(HashFile.__myrepr(par))) for par in params] # PEDRORMJUNIOR 20130806
-        reprs = reduce(lambda x, y: x + '|' + y, reprs)
-        hashnamekey = callersname + '()|' + reprs
-
-        return hashnamekey
+        if isinstance(obj, types.FunctionType):
+            digest.update('function:' + obj.func_name + ';')
+        elif isinstance(obj, np.ndarray) and obj.dtype != object:
+            obj = np.ascontiguousarray(obj)
+            digest.update('ndarray:{0}:{1}:'.format(obj.dtype.str, obj.shape))
+            digest.update(obj.data)
+        elif isinstance(obj, np.ndarray):
+            HashFile.__update(digest, obj.tolist())
+        elif isinstance(obj, (list, tuple)):
+            digest.update('{0}:{1}:'.format(type(obj).__name__, len(obj)))
+            for x in obj:
+                HashFile.__update(digest, x)
+        elif isinstance(obj, set):
+            digest.update('set:')
+            HashFile.__update(digest, sorted(obj))
+        elif isinstance(obj, dict):
+            digest.update('dict:')
+            HashFile.__update(digest, sorted(obj.items()))
+        else:
+            digest.update('{0}:{1};'.format(type(obj).__name__, repr(obj)))
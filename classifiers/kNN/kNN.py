@@ -0,0 +1,133 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+from termcolor import *
+import sys
+cyan_err('import kNN')
+
+import os
+import hashfile
+import numpy as np
+
+
+class NeighbourGraph(object):
+    """
+    The nearest training samples of each test sample, found by one
+    'kneighbors' query of a fitted 'KNeighborsClassifier' with the largest
+    k needed, from which the predictions of every k and weighting are
+    derived without new queries.
+
+    The neighbours are stored in the 'storage' folder of the framework,
+    keyed by the training and test samples and by the algorithm of the
+    query, so other nodes (or iterations) with the same samples reuse them
+    while they have enough neighbours.
+    """
+    def __init__(self, clf, vftr, vltr, vfte, k):
+        """
+        Input:
+        clf = 'KNeighborsClassifier' fitted with 'vftr' and 'vltr'.
+        vftr = training samples.
+        vltr = labels of the training samples, integers from 0.
+        vfte = test samples.
+        k = largest number of neighbours needed.
+        """
+        self._vltr = np.asarray(vltr, dtype=int)
+        self._nclasses = int(self._vltr.max()) + 1 if len(self._vltr) > 0 else 0
+        k = min(int(k), len(self._vltr))
+
+        hash_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "storage"))
+        if not os.path.exists(hash_path):
+            os.mkdir(hash_path)
+        hf = hashfile.HashFile(hash_path + os.sep, 'HashFile.npz')
+        sf = hf.getStorageFile([np.asarray(vftr, dtype=np.float64),
+                                np.asarray(vfte, dtype=np.float64),
+                                clf.algorithm, clf.metric, clf.p])
+
+        try:
+            dist, ind = sf.loadVars('dist', 'ind')
+            assert dist.shape[1] >= k
+            yellow_err('NeighbourGraph(): {0} neighbours from {1}'.format(dist.shape[1], sf))
+        except:
+            yellow_err('NeighbourGraph(): query of {0} neighbours'.format(k))
+            dist, ind = clf.kneighbors(vfte, n_neighbors=k)
+            sf.saveVars(dist=dist, ind=ind)
+
+        self._dist = dist
+        self._ind = ind
+
+    def predict(self, k, weights='uniform'):
+        """
+        Input:
+        k = number of neighbours.
+        weights = 'uniform' or 'distance', as in 'KNeighborsClassifier'.
+
+        Output:
+        Labels predicted by the 'k' nearest neighbours.  Ties go to the
+        smallest label, as in 'KNeighborsClassifier'.
+        """
+        assert weights in ['uniform', 'distance']
+        k = min(int(k), self._dist.shape[1])
+
+        labels = self._vltr[self._ind[:, :k]]
+        if weights == 'uniform':
+            votes = np.ones(labels.shape)
+        else:
+            dist = self._dist[:, :k]
+            with np.errstate(divide='ignore'):
+                votes = 1. / dist
+            """
+            A test sample equal to training samples is predicted by them
+            only.
+            """
+            zeros = (dist == 0).any(axis=1)
+            votes[zeros] = (dist[zeros] == 0).astype(float)
+
+        scores = np.zeros((len(labels), self._nclasses))
+        rows = np.repeat(np.arange(len(labels)), k)
+        np.add.at(scores, (rows, labels.ravel()), votes.ravel())
+
+        return scores.argmax(axis=1)
+
+    def predictAll(self, ks, weightings=('uniform', 'distance')):
+        """
+        Output:
+        Dictionary from (k, weights) to the labels of 'predict'.
+        """
+        return dict(((k, weights), self.predict(k, weights))
+                    for k in ks
+                    for weights in weightings)
@@ -39,13 +39,14 @@
 import os
 import sys
 import numpy
-from sklearn import preprocessing
 from sklearn.externals import joblib
 from sklearn import neighbors
 
 #Framework imports
 dirname = os.path.abspath(os.path.dirname(__file__))
 sys.path.append(os.path.dirname(dirname))
+import common
+import kNN
 
 #CONSTANTS
 POS_CLASSES = 0
@@ -63,42 +64,16 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
     
     #Paths
     #dirname = os.path.abspath(os.path.join(os.path.dirname(__file__)))
-    temp_path = os.path.abspath(os.path.join(dirname, "..", "..", "temp"))
+    temp_path = common.tempFolder()
     model_path = os.path.join(temp_path, "iteration:" + str(iteration) + \
             "-kNN_" + str(pos_fold) + ".model")
     
-    #Preprocess each class to a unique value to the classification
-    label_encoder = preprocessing.LabelEncoder()
-    label_encoder.fit(classes_list)
-    print "List of classes of this experiment:", label_encoder.classes_
-    
-    #Read the train list and save the list of class and the list
-    #of feature vectors
-    list_class = []
-    list_fv = []
-    
-    for img in train_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(numpy.array(images[img][POS_FV][INDEX_ZERO]))
-    
-    list_train = numpy.array(list_fv)
-    list_train_class = numpy.array(list_class)
-    
-    #Given a list of classes, transform each value in this list to a integer
-    list_train_class = label_encoder.transform(list_train_class)
-    
-    #Read the test list and save the list of class and the list
-    #of feature vectors
+    #Train and test matrices, with the classes of the training set encoded
+    #as indexes of the classes of the experiment
+    classes, list_train, list_train_class, list_test, list_test_class = \
+            common.foldMatrices(images, classes_list, train_set, test_set)
     list_img = test_set
-    list_class = []
-    list_fv = []
-    
-    for img in test_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(numpy.array(images[img][POS_FV][INDEX_ZERO]))
-    
-    list_test = numpy.array(list_fv)
-    list_test_class = numpy.array(list_class)
+    print "List of classes of this experiment:", classes
     
     #Classification
     #--------------------------------------------------------------------------
@@ -114,26 +89,50 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
     #Save configuration of the KNN
     model_paths = joblib.dump(clf, model_path)
     
-    #Predict
+    #Predict, from the neighbours of the largest k needed, found once
     print "\tPredict: Beginning"
-    list_predict = clf.predict(list_test)
+    sweep_k = int(parameters.get("Sweep k", 0))
+    graph = kNN.NeighbourGraph(clf, list_train, list_train_class, list_test,
+                               max(parameters["k"], sweep_k))
+    list_predict = graph.predict(parameters["k"], parameters["Weights"])
     print "\tPredict: Done"
     
-    #Mapping the results into integers
-    list_predict = map(int, list_predict)
-    #Returning the result to strings
-    list_predict = label_encoder.inverse_transform(list_predict)
-    
-    list_result = []
-    for predict in list_predict:
-        img_result = [0] * len(label_encoder.classes_)
-        #Find all predict in the list label_encoder.classes_ and grab the
-        #first index
-        pos = label_encoder.classes_.tolist().index(predict)
-        img_result[pos] = 1
-        list_result.append(img_result)
+    #Predictions of every odd k up to sweep_k, with both weightings, saved
+    #with the model
+    if sweep_k > 0:
+        model_paths = list(model_paths)
+        sweep = graph.predictAll(range(1, sweep_k + 1, 2))
+        for k, weights in sorted(sweep.keys()):
+            sweep_predict = sweep[(k, weights)]
+            print "\tk = %d, %s: accuracy %f" % (k, weights, numpy.mean(
+                    classes[sweep_predict] == list_test_class))
+            sweep_path = "%s.k%d.%s.txt" % (model_path, k, weights)
+            sweep_file = open(sweep_path, "wb")
+            for img, predict in zip(list_img, sweep_predict):
+                sweep_file.write("%s %s\n" % (img,
+                        classes[predict]))
+            sweep_file.close()
+            model_paths.append(sweep_path)
+    
+    list_result = common.oneHot(list_predict, len(classes)).tolist()
     
     #--------------------------------------------------------------------------
     
-    return list_img, list_test_class, list_result, label_encoder.classes_, \
+    return list_img, list_test_class, list_result, classes, \
            model_paths
+
+def load_model(model_paths, parameters):
+    """
+    Loads the model saved by classify, given the paths of its files, with its
+    arrays memory-mapped.
+    """
+    
+    return joblib.load(model_paths[INDEX_ZERO], mmap_mode='r')
+
+def predict(model, list_fv, parameters):
+    """
+    Predicts the classes of the feature vectors in list_fv with a model
+    loaded by load_model, as indexes of the classes of the classifier.
+    """
+    
+    return map(int, model.predict(list_fv))
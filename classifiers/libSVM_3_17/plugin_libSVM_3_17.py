@@ -37,26 +37,38 @@
 
 #Python imports
 import os
-from sklearn import preprocessing
-from itertools import izip
-from subprocess import call
+import sys
 import numpy
-import platform
+from sklearn.externals import joblib
 
 #Framework imports
-import grid
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(dirname)),
+        "libraries", "libsvm-3.17", "python"))
+sys.path.append(os.path.join(os.path.dirname(dirname), "SVM"))
+import common
+import svmutil
+import svmnode
+import LinearSVM
 
 #Constants
 POS_CLASSES = 0
 POS_FV = 1
 INDEX_ZERO = 0
-HEAD_LINES = 7
+GRID_FOLDS = 5
+HALVING_ETA = 3
+HALVING_MIN_FRACTION = 1.0 / 9
 
 def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
         parameters):
     """
     Performs the classification of the test_set according to the train_set.
     
+    The training, the grid search and the prediction are done by the
+    bundled libSVM 3.17 in this process, through its Python bindings, so
+    no data file is written and no svm-train or svm-predict is executed.
+    
     Input:
         - images: Python dictionary with all images from the dataset and its
         feature vector.
@@ -75,6 +87,12 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
             - gamma: gamma of the Kernel function
             - Cross-Validation: Number of folds in the cross-validation mode
             - Probabilities: Get as predict the probabilities of each class
+            - Search: Exhaustive grid of grid.py or successive halving
+            (optional)
+            - Kernel approximation: Nystroem or random Fourier features of
+            the RBF kernel, with a linear SVM on them (optional)
+            - Components, Seed: Dimensions of the feature map of the
+            approximation, and seed of its samples or frequencies (optional)
     Output:
         
     """
@@ -88,158 +106,151 @@ def classify(images, classes_list, train_set, test_set, pos_fold, descriptor,
     libSVM_gamma = float(parameters['gamma'])
     libSVM_cv = int(parameters['Cross-Validation'])
     libSVM_probability = int(parameters['Probabilities'])
+    libSVM_search = parameters.get('Search', 'Grid')
     
     #Paths
-    dirname = os.path.abspath(os.path.join(os.path.dirname(__file__)))
-    temp_path = os.path.abspath(os.path.join(dirname, "..", "..", "temp"))
-    train_path = os.path.join(temp_path, "libSVM.train")
+    temp_path = common.tempFolder()
     model_path = os.path.join(temp_path, "libSVM.train.model_" + str(pos_fold))
-    test_path = os.path.join(temp_path, "libSVM.test")
-    output_path = os.path.join(temp_path, "libSVM.output")
-
-    plugin_train = "svm-train"
-    plugin_test = "svm-predict"
-    system_platform = [platform.system(), platform.architecture()[0]]
-    if system_platform[0] == 'Linux':
-        if system_platform[1] == '32bit':
-            plugin_train += "_32l"
-            plugin_test += "_32l"
-    
-    #Preprocess each class to a unique value to the classification
-    label_encoder = preprocessing.LabelEncoder()
-    label_encoder.fit(classes_list)
-    print "List of classes of this experiment:", label_encoder.classes_
-    
-    list_class = []
-    list_fv = []
-    
-    #Read the train file and save the list of class and the list
-    #of feature vectors
-    for img in train_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(numpy.array(images[img][POS_FV][INDEX_ZERO]))
-    
-    list_train = numpy.array(list_fv)
-    list_train_class = numpy.array(list_class)
     
-    #Given a list of classes, transform each value in this list to a integer
-    list_train_class = label_encoder.transform(list_train_class)
+    #Train and test matrices, with the classes of the training set encoded
+    #as indexes of the classes of the experiment
+    classes, list_train, list_train_class, list_test, list_test_class = \
+            common.foldMatrices(images, classes_list, train_set, test_set)
+    print "List of classes of this experiment:", classes
     
-    #Read the test list and save the list of class and the list
-    #of feature vectors
-    list_img = test_set
-    list_class = []
-    list_fv = []
-    
-    for img in test_set:
-        list_class.append(images[img][POS_CLASSES][INDEX_ZERO])
-        list_fv.append(numpy.array(images[img][POS_FV][INDEX_ZERO]))
-    
-    list_test = numpy.array(list_fv)
-    list_test_class = numpy.array(list_class)
-    
-    list_test_class = label_encoder.transform(list_test_class)
+    #RBF kernel approximated by a feature map, with a linear SVM on it
+    approximation = LinearSVM.approximationParameters(parameters)
+    if approximation['approximation'] is not None and \
+            libSVM_kernel == kernel("RBF"):
+        print "\tKernel approximation:", approximation['approximation']
+        clf = LinearSVM.ApproximateRBFSVM(
+                search='halving' if libSVM_search == "Successive Halving"
+                       else 'grid',
+                **approximation)
+        clf.fit(list_train, list_train_class)
+        joblib.dump(clf, model_path)
+        list_result = common.oneHot(clf.classify(list_test), len(classes))
+        return test_set, list_test_class, list_result.tolist(), classes, \
+                [model_path]
     
     #SVM Fit
     #-------------------------------------------------------------------------
     print "\tFit"
-    #Create train file
-    train_file = open(train_path, "wb")
-    for item_class, item_fv in izip(list_train_class, list_train):
-        train_file.write(str(item_class) + " ")
-        for i in range(len(item_fv)):
-            train_file.write(str(i+1) + ":" + str(item_fv[i]) + " ")
-        train_file.write("\n")
-    train_file.close()
-
+    train_nodes = svmnode.NodeMatrix(list_train)
+    train_problem = svm_problem(list_train_class, train_nodes)
+    
     #Grid-Search
-    result, param = grid.find_parameters(train_path, '-gnuplot null')
-
+    if libSVM_search == "Successive Halving":
+        param = halving_search(list_train_class, train_nodes)
+    else:
+        param = grid_search(train_problem)
+    
     libSVM_c = param['c']
     libSVM_gamma = param['g']
     #-----------
     
-    cmd_train = """
-%s%s.%s%s -t %d -d %d -g %f -c %f -b %d "%s" "%s"
-    """ % (dirname, os.sep, os.sep, plugin_train, libSVM_kernel, libSVM_degree, libSVM_gamma,
-            libSVM_c, libSVM_probability, train_path, model_path)
-    print cmd_train
+    options_train = "-q -t %d -d %d -g %f -c %f -b %d" % (libSVM_kernel,
+            libSVM_degree, libSVM_gamma, libSVM_c, libSVM_probability)
+    print "\tsvm_train", options_train
     
-    #Execute SVM-Train
-    call(cmd_train, shell = True)
+    model = svmutil.svm_train(train_problem, svmutil.svm_parameter(options_train))
     print "\tEnd Fit"
     #-------------------------------------------------------------------------
     
-    #Read configuration of the libSVM model
-    model_file = open(model_path, "rb")
+    #Save the libSVM model
+    svmutil.svm_save_model(model_path, model)
     print model_path
-    count_head_lines = 0
-    for line in model_file.readlines():
-        key_model = line.split()[0]
-        if key_model == "label":
-            model_labels = map(int, line.split()[1:])
-            break
-    model_file.close()
+    model_labels = model.get_labels()
     model_paths = [model_path]
     
     #SVM Predict
     #-------------------------------------------------------------------------
-    #Create test file
-    test_file = open(test_path, "wb")
-    for item_class, item_fv in izip(list_test_class, list_test):
-        test_file.write(str(item_class) + " ")
-        for i in range(len(item_fv)):
-            test_file.write(str(i+1) + ":" + str(item_fv[i]) + " ")
-        test_file.write("\n")
-    test_file.close()
-    
-    #Execute SVM-Predict
-    cmd_test = """
-%s%s.%s%s -b %d "%s" "%s" "%s"
-    """ % (dirname, os.sep, os.sep, plugin_test, libSVM_probability, test_path, model_path,
-            output_path)
-    print cmd_test
-    
-    call(cmd_test, shell = True)
+    list_predict, _, list_values = svmutil.svm_predict(
+            numpy.searchsorted(classes, list_test_class).tolist(),
+            svmnode.NodeMatrix(list_test).rows(svmutil), model,
+            "-q -b %d" % libSVM_probability)
     print "\tEnd Predict"
     #-------------------------------------------------------------------------
     
-    #Read output file to get the result of the predict
-    output_file = open(output_path, "rb")
+    #Format the result of the predict, with the columns of the classes of
+    #the model placed at their indexes in classes
     if libSVM_probability:
-        output_file.readline()
-        list_result = []
-        for line in output_file.readlines():
-            dict_classes = {key_class: 0.0 for key_class in classes_list}
-            output_line = map(float, line.split()[1:])
-            for class_item, perc in \
-                    izip(list(label_encoder.inverse_transform(model_labels)),
-                    output_line):
-                dict_classes[class_item] = perc
-            percentage_list = [dict_classes[key_class] for key_class in \
-                    label_encoder.classes_]
-            list_result.append(percentage_list)
+        list_result = numpy.zeros((len(list_values), len(classes)))
+        list_result[:, model_labels] = list_values
     else:
-        list_predict = map(int, output_file.readlines())
-        list_predict = label_encoder.inverse_transform(list_predict)
-        
-        list_result = []
-        for predict in list_predict:
-            img_result = [0.0] * len(label_encoder.classes_)
-            #Find all predict in the list label_encoder.classes_ and grab the
-            #first index
-            pos = numpy.where(label_encoder.classes_ == predict)[0][0]
-            img_result[pos] = 1.0
-            list_result.append(img_result)
-    output_file.close()
-    
-    #Remove temporary files
-    os.remove(train_path)
-    os.remove(test_path)
+        list_result = common.oneHot(list_predict, len(classes)).astype(float)
     
-    return test_set, list_class, list_result, label_encoder.classes_, \
+    return test_set, list_test_class, list_result.tolist(), classes, \
             model_paths
 
+def svm_problem(list_class, nodes, index=None):
+    """
+    The libSVM problem of the samples of index (all of them if None), with
+    the svm_node rows of the NodeMatrix nodes, so the feature vectors are
+    never converted to lists.
+    """
+    
+    if index is not None:
+        list_class = list_class[index]
+    
+    return svmutil.svm_problem(map(int, list_class),
+                               nodes.rows(svmutil, index))
+
+def cross_validation(problem, log2c, log2g):
+    """
+    Cross-validation accuracy of the RBF SVM, as measured by grid.py with
+    'svm-train -c 2^log2c -g 2^log2g -v 5'.
+    """
+    
+    options = "-q -c %f -g %f -v %d" % (2.0 ** log2c, 2.0 ** log2g, GRID_FOLDS)
+    return svmutil.svm_train(problem, svmutil.svm_parameter(options))
+
+def grid_search(train_problem):
+    """
+    The grid of grid.py (log2c from -5 to 15 and log2g from 3 to -15, both
+    by steps of 2), evaluated by the processes of 'common.evaluateGrid'.
+    Returns the parameters as grid.find_parameters.
+    """
+    
+    log2c, log2g = common.gridSearchExponential('min',
+            lambda log2c, log2g: cross_validation(train_problem, log2c, log2g),
+            range(-5, 15 + 1, 2), range(3, -15 - 1, -2))
+    
+    return {'c': 2.0 ** log2c, 'g': 2.0 ** log2g}
+
+def halving_search(list_train_class, train_nodes):
+    """
+    Successive halving over the grid of grid.py, refined to every integer
+    exponent: the first round evaluates the grid of grid.py on a ninth of
+    the train set, and the best points and their neighbours are evaluated
+    again on growing stratified subsamples, up to the whole train set.
+    
+    Each point is evaluated, as in grid.py, by the 5-fold cross-validation
+    accuracy.  Returns the parameters as grid.find_parameters.
+    """
+    
+    #Problems of the subsamples of every round, built before the search so
+    #that the processes of the grid search share them
+    fraction_problems = {}
+    fraction = HALVING_MIN_FRACTION
+    while True:
+        index = common.subsampleIndexes(list_train_class, fraction)
+        fraction_problems[fraction] = svm_problem(list_train_class,
+                train_nodes, index)
+        if fraction >= 1.0:
+            break
+        fraction = min(1.0, fraction * HALVING_ETA)
+    
+    def objective(fraction, log2c, log2g):
+        closest = min(fraction_problems, key=lambda item: abs(item - fraction))
+        return cross_validation(fraction_problems[closest], log2c, log2g)
+    
+    log2c, log2g = common.gridSearchHalving('min', objective,
+            range(-5, 15 + 1), range(3, -15 - 1, -1), eta = HALVING_ETA,
+            min_fraction = HALVING_MIN_FRACTION)
+    
+    return {'c': 2.0 ** log2c, 'g': 2.0 ** log2g}
+
 def kernel(kernel_string):
     """
     Transforms the kernel string in an integer to be used by the svm-train.
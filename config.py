@@ -74,6 +74,28 @@ MESSAGE_EXPERIMENT_FINISH = '3'
 MESSAGE_ITERATION_FINISH = '4'
 MESSAGE_SEPARATOR = '///'
 
+#Reuse the parameters of a normalizer already fitted on the same training set
+CACHE_NORMALIZER = True
+
+#Reuse the model and the predictions of a classifier already fitted on the
+#same training set, with the same code (in other iterations or workflows),
+#instead of fitting a new one.  Only for classifiers whose fit is not random,
+#such as the seeded ones, or whose randomness does not matter
+CACHE_CLASSIFIER = False
+
+#Write the normalized feature vectors of a normalizer executed inside the
+#classifier that follows it
+WRITE_FUSED_NORMALIZER = False
+
+#Number of train/test splits classified in parallel (0 uses all the cores
+#whose splits fit in CLASSIFY_MEMORY)
+CLASSIFY_PROCESSES = 0
+
+#Memory, in bytes, for the splits held at the same time by the processes of
+#the classification when CLASSIFY_PROCESSES is 0 (0 uses half of the physical
+#memory)
+CLASSIFY_MEMORY = 0
+
 STAGE_BACKGROUND = '#AAAAAA'
 
 LINK_ATTRIBUTES = {'width': 3,
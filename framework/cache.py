@@ -0,0 +1,252 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+import os
+import hashlib
+import cPickle as pickle
+
+import numpy
+
+#Constants
+STORAGE_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..",
+                                            "storage"))
+FILE_BLOCK = int(1E6)
+#Size, in bytes, of the values of a namespace.  Beyond it, the least
+#recently used values are removed
+MAX_SIZE = 2**32
+#Files of the source of a folder, in folder_fingerprint
+SOURCE_EXTENSIONS = (".py", ".sh", ".xml", ".c", ".cpp", ".h")
+
+_folder_fingerprints = {}
+
+def fingerprint(*items):
+    """
+    Calculate a fingerprint of the given items.
+    
+    Parameters
+    ----------
+        items : objects
+            Strings, numbers, numpy arrays, and lists, tuples or dictionaries
+            of them.
+    
+    Returns
+    -------
+        key : string
+            SHA-1 hexadecimal digest of the items, which is the same for equal
+            items in any execution.
+    
+    """
+    
+    digest = hashlib.sha1()
+    for item in items:
+        _update(digest, item)
+    
+    return digest.hexdigest()
+
+def _update(digest, item):
+    """
+    Add the representation of an item to the digest.
+    """
+    
+    if isinstance(item, numpy.ndarray):
+        item = numpy.ascontiguousarray(item)
+        digest.update("ndarray%s%s" % (item.dtype.str, item.shape))
+        digest.update(item.tostring())
+    elif isinstance(item, dict):
+        digest.update("dict%d" % len(item))
+        for key in sorted(item.keys()):
+            _update(digest, key)
+            _update(digest, item[key])
+    elif isinstance(item, (list, tuple)):
+        digest.update("%s%d" % (type(item).__name__, len(item)))
+        for sub_item in item:
+            _update(digest, sub_item)
+    else:
+        digest.update("%s:%r;" % (type(item).__name__, item))
+
+def file_fingerprint(file_path):
+    """
+    Calculate the fingerprint of the content of a file.
+    """
+    
+    digest = hashlib.sha1()
+    cache_file = open(file_path, "rb")
+    block = cache_file.read(FILE_BLOCK)
+    while block:
+        digest.update(block)
+        block = cache_file.read(FILE_BLOCK)
+    cache_file.close()
+    
+    return digest.hexdigest()
+
+def folder_fingerprint(folder_path):
+    """
+    Calculate the fingerprint of the source files (SOURCE_EXTENSIONS) of a
+    folder and of its subfolders, following links, with their relative
+    paths.  It is calculated once per process for each folder.
+    """
+    
+    folder_path = os.path.abspath(folder_path)
+    if folder_path not in _folder_fingerprints:
+        files = []
+        for root, folders, names in os.walk(folder_path, followlinks=True):
+            folders.sort()
+            for name in sorted(names):
+                if name.endswith(SOURCE_EXTENSIONS):
+                    file_path = os.path.join(root, name)
+                    files.append((os.path.relpath(file_path, folder_path),
+                                  file_fingerprint(file_path)))
+        _folder_fingerprints[folder_path] = fingerprint(files)
+    
+    return _folder_fingerprints[folder_path]
+
+def load(namespace, key):
+    """
+    Load the value stored with the key in the namespace.
+    
+    Parameters
+    ----------
+        namespace : string
+            Name of the folder of the cache, inside STORAGE_PATH.
+        
+        key : string
+            Key of the value, usually created by fingerprint.
+    
+    Returns
+    -------
+        value : object
+            The stored value, or None if there is no value with the key or it
+            could not be read.  A value loaded becomes the most recently used
+            one of its namespace.
+    
+    """
+    
+    cache_path = os.path.join(STORAGE_PATH, namespace, key + ".pkl")
+    if not os.path.exists(cache_path):
+        return None
+    
+    try:
+        cache_file = open(cache_path, "rb")
+        try:
+            value = pickle.load(cache_file)
+        finally:
+            cache_file.close()
+        os.utime(cache_path, None)
+        return value
+    except Exception as error:
+        print "\tCache: could not load", cache_path, "-", error
+        return None
+
+def save(namespace, key, value):
+    """
+    Store the value with the key in the namespace.
+    
+    The value is pickled to a temporary file that is then renamed, so
+    processes reading the same key never see a partially written value.
+    When the values of the namespace exceed MAX_SIZE, the least recently
+    used ones are removed.
+    
+    Parameters
+    ----------
+        namespace : string
+            Name of the folder of the cache, inside STORAGE_PATH.
+        
+        key : string
+            Key of the value, usually created by fingerprint.
+        
+        value : object
+            Picklable value to be stored.
+    
+    Returns
+    -------
+        None
+    
+    """
+    
+    cache_folder = os.path.join(STORAGE_PATH, namespace)
+    if not os.path.exists(cache_folder):
+        try:
+            os.makedirs(cache_folder)
+        except OSError:
+            #Created by another process
+            pass
+    
+    cache_path = os.path.join(cache_folder, key + ".pkl")
+    temp_path = cache_path + ".%d.tmp" % os.getpid()
+    try:
+        cache_file = open(temp_path, "wb")
+        try:
+            pickle.dump(value, cache_file, pickle.HIGHEST_PROTOCOL)
+        finally:
+            cache_file.close()
+        os.rename(temp_path, cache_path)
+    except Exception as error:
+        print "\tCache: could not save", cache_path, "-", error
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    
+    evict(cache_folder)
+
+def evict(cache_folder, max_size=MAX_SIZE):
+    """
+    Remove the least recently used (loaded or saved) values of the folder of
+    a namespace until their size is at most max_size.
+    """
+    
+    entries = []
+    for name in os.listdir(cache_folder):
+        if not name.endswith(".pkl"):
+            continue
+        try:
+            stat = os.stat(os.path.join(cache_folder, name))
+        except OSError:
+            #Removed by another process
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+    
+    size = sum(entry[1] for entry in entries)
+    for _, entry_size, name in sorted(entries):
+        if size <= max_size:
+            break
+        try:
+            os.remove(os.path.join(cache_folder, name))
+            print "\tCache: evicted", name
+        except OSError:
+            #Removed by another process
+            pass
+        size -= entry_size
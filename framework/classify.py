@@ -43,30 +43,71 @@ import os
 import sys
 from datetime import datetime, timedelta
 from numpy import zeros
+import numpy
 import shutil
+import tempfile
+import glob
+import multiprocessing
+from itertools import imap
 
 #Framework import
 import config
 import util
+import cache
+import normalize_features
 
 #CONSTANTS
 START = config.MESSAGE_MODULE_START
 PROGRESS = config.MESSAGE_MODULE_PROGRESS
 END_EXPERIMENT = config.MESSAGE_EXPERIMENT_FINISH
+WRITE_FUSED_NORMALIZER = config.WRITE_FUSED_NORMALIZER
+CLASSIFY_PROCESSES = config.CLASSIFY_PROCESSES
+CLASSIFY_MEMORY = config.CLASSIFY_MEMORY
+#Bytes in memory of each byte of a file of feature vectors, parsed to lists
+#of floats
+FV_FILE_EXPANSION = 4
+#Bytes in memory of each value of a feature vector in a list
+FV_VALUE_BYTES = 32
+CACHE_CLASSIFIER = config.CACHE_CLASSIFIER
+CACHE_NAMESPACE = "classifiers"
+CHUNK_SIZE = 10000
+TEMP_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..",
+                                         "temp"))
+CLASSIFIERS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                "..", "classifiers"))
+#Code shared by the classifier plugins, part of the keys of their cache
+SHARED_CODE_FOLDERS = [os.path.join(CLASSIFIERS_PATH, "SVM"),
+                       os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                    "..", "libraries"))]
 POS_TRAIN = 0
 POS_TEST = 1
 POS_CLASSES = 0
 POS_FV = 1
 POS_PREDICT = 1
+INDEX_ZERO = 0
+MODELS_FILE = "models.txt"
+CLASSES_FILE = "classes.txt"
+
+#Global variables
+fold_context = {}
 
 def main(fv_paths, classes_list, train_test_list, experiment_folder, classifier,
-        parameters, descriptor, node_id):
+        parameters, descriptor, node_id, images=None, normalizer=None):
     """
     Main function of the classification module.
     
     This function calls the classify function of the specific classifier and
     calculates the time necessary to its execution.
     
+    When normalizer is given, the normalizer node that precedes the classifier
+    is fused with it: each split is normalized in memory, from images, right
+    before its classification, and nothing is written to disk unless
+    WRITE_FUSED_NORMALIZER is set.
+    
+    The splits are classified in parallel by up to CLASSIFY_PROCESSES
+    processes, which share the data of the experiment, and the results are
+    saved in the order of the splits.
+    
     Parameters
     ----------
         fv_paths : list
@@ -100,6 +141,15 @@ def main(fv_paths, classes_list, train_test_list, experiment_folder, classifier,
             
         node_id : string
             ID of the classifier plugin node in the experiment.
+        
+        images : dict, {string : [list, list]}, optional
+            Dictionary containing the classes and feature vectors for each
+            image of the experiment. Used instead of fv_paths when normalizer
+            is given.
+        
+        normalizer : dict, optional
+            Name ('name'), parameters ('parameters') and ID ('node_id') of the
+            normalizer node fused with the classifier.
     
     Returns
     -------
@@ -115,8 +165,13 @@ def main(fv_paths, classes_list, train_test_list, experiment_folder, classifier,
 
     """
     
+    global fold_context
+    
     #Send the start of the module
     try:
+        if normalizer is not None:
+            socket_framework.sendall("%s %s///" % (START,
+                    normalizer['node_id']))
         socket_framework.sendall("%s %s///" % (START, node_id))
     except:
         pass
@@ -143,69 +198,77 @@ def main(fv_paths, classes_list, train_test_list, experiment_folder, classifier,
     software = __import__("plugin_" + classifier)
     print software
     
+    #Import the plugin of the fused normalizer
+    norm_software = None
+    if normalizer is not None:
+        norm_software = normalize_features.import_normalizer(
+                normalizer['name'])
+        print "Normalizer fused with the classification:", norm_software
+    
+    #Data of the classification, read by the processes of the folds
+    fold_context = {'software': software, 'norm_software': norm_software,
+                    'normalizer': normalizer, 'fv_paths': fv_paths,
+                    'images': images, 'classes_list': classes_list,
+                    'train_test_list': train_test_list,
+                    'experiment_folder': experiment_folder,
+                    'descriptor': descriptor, 'parameters': parameters}
+    
     #Performs the classification for every test set
     total_classify = len(train_test_list)
+    num_processes = CLASSIFY_PROCESSES
+    if num_processes <= 0:
+        num_processes = memory_processes(fold_context)
+    num_processes = max(1, min(num_processes, total_classify))
+    print "Number of folds classified in parallel:", num_processes
+    
+    if num_processes > 1:
+        pool = multiprocessing.Pool(num_processes)
+        fold_results = pool.imap_unordered(classify_fold,
+                                           range(total_classify))
+    else:
+        pool = None
+        fold_results = imap(classify_fold, range(total_classify))
+    
+    #The results are saved in the order of the folds, as soon as the previous
+    #folds are done
+    pending_results = {}
+    next_pos = 0
     number_classify = 0
-    for pos in range(total_classify):
-        classification_path = experiment_path + str(pos) + ".txt"
-        
-        images = util.read_fv_file(fv_paths[pos])
-        
-        test_imgs, test_class, classification_result, images_classes, \
-                model_paths = software.classify(images, classes_list,
-                train_test_list[pos][POS_TRAIN],
-                train_test_list[pos][POS_TEST], pos, descriptor, parameters)
-        if test_imgs == None: # In case of error in the plugin, end experiment
-            socket_framework.sendall("%s %s///" % (END_EXPERIMENT, None))
-            socket_framework.close()
-            
-        print "Success of the classification"
-        
-        #Move the model of the classifier to the experiment_folder
-        if not isinstance(model_paths, list):
-            model_paths = [model_paths]
-        path_models = os.path.join(experiment_folder, "Models", 'Node ' + \
-                str(node_id) + ' - ' + classifier)
-        if not os.path.exists(path_models):
-            os.makedirs(path_models)
-        for item_path in model_paths:
-            new_item_path = "{0}_iter_{1}".format(item_path, iteration)
-            os.rename(item_path, new_item_path)
-            if os.path.exists(os.path.join(path_models, new_item_path.split(os.sep)[-1])):
-                os.remove(os.path.join(path_models, new_item_path.split(os.sep)[-1]))
-            shutil.move(new_item_path, path_models)
-
-        
-        classification_file = open(classification_path, "wb")
-        images_classes = list(images_classes)
-        classification_file.write(str(images_classes) + '\n')
-        for pos_test in range(len(test_imgs)):
-            img_path = test_imgs[pos_test]
-            img_classes = test_class[pos_test]
-            img_predict = classification_result[pos_test]
-            
-            #Save the new_images with the test set
-            np_zeros = zeros(len(images_classes))
-            if img_path not in new_images:
-                new_images[img_path] = [[img_classes], [np_zeros] * \
-                        total_classify]
-            new_images[img_path][POS_PREDICT][pos] = img_predict
-            
-            line = img_path + " " + str(img_classes) + " " + \
-                   str(img_predict) + "\n"
-            classification_file.write(line)
-        classification_file.close()
-        
-        #Save the classes of this execution
-        list_classes.append(images_classes)
+    worker_pids = set()
+    for fold_result in fold_results:
+        pending_results[fold_result[INDEX_ZERO]] = fold_result[1:-1]
+        worker_pids.add(fold_result[-1])
         
         #Send to the socket the train and test that was classified
         number_classify += 1
         try:
+            if normalizer is not None:
+                socket_framework.sendall("%s %s %f///" % (PROGRESS,
+                        normalizer['node_id'],
+                        (number_classify / total_classify)))
             socket_framework.sendall("%s %s %f///" % (PROGRESS, node_id,
                     (number_classify / total_classify)))
         except:
             pass
+        
+        while next_pos in pending_results:
+            images_classes = save_fold(next_pos,
+                    pending_results.pop(next_pos), new_images, total_classify,
+                    experiment_path, experiment_folder, classifier, node_id)
+            
+            #Save the classes of this execution
+            list_classes.append(images_classes)
+            next_pos += 1
+    
+    if pool is not None:
+        pool.close()
+        pool.join()
+        
+        #Remove the temporary folders of the processes of the pool
+        for pid in worker_pids:
+            shutil.rmtree(os.path.join(TEMP_PATH, "process_" + str(pid)),
+                          ignore_errors=True)
+    fold_context = {}
     
     #Time calculation of the classification
     end_classification = datetime.now()
@@ -214,3 +277,450 @@ def main(fv_paths, classes_list, train_test_list, experiment_folder, classifier,
     print "Total classification time:", classification_time, "seconds"
     
     return new_images, list_classes, classification_time
+
+def classify_fold(pos):
+    """
+    Classify the test set of a train/test split.
+    
+    Executed by the processes of the classification, which read the data of
+    the experiment from fold_context.
+    
+    Parameters
+    ----------
+        pos : int
+            Index of the train/test split.
+    
+    Returns
+    -------
+        fold_result : tuple
+            Index of the split followed by the outputs of the classify function
+            of the plugin: images of the test set, their classes, the
+            predictions, the classes of the classifier and the paths of the
+            models, and the id of the process that classified the split.
+    
+    """
+    
+    software = fold_context['software']
+    normalizer = fold_context['normalizer']
+    train_test_list = fold_context['train_test_list']
+    
+    #An incremental plugin is trained and applied in batches read from the
+    #file of the split, which is never loaded whole in memory
+    fv_path = None
+    images_fold = None
+    if normalizer is None and hasattr(software, "partial_fit"):
+        fv_path = fold_context['fv_paths'][pos]
+    elif normalizer is None:
+        images_fold = util.read_fv_file(fold_context['fv_paths'][pos])
+    else:
+        normalized_path = None
+        if WRITE_FUSED_NORMALIZER:
+            normalized_path = normalize_features.normalized_file_path(
+                    fold_context['experiment_folder'], normalizer['node_id'],
+                    normalizer['name'], pos)
+        images_fold = normalize_features.normalize_split(
+                fold_context['norm_software'], fold_context['images'],
+                train_test_list[pos], pos, normalizer['parameters'],
+                normalized_path)
+    
+    train_set = train_test_list[pos][POS_TRAIN]
+    test_set = train_test_list[pos][POS_TEST]
+    fit_key, test_key = classify_keys(software, images_fold, train_set,
+                                      test_set, fv_path)
+    
+    fold_result = load_classification(software, images_fold, test_set,
+                                      fit_key, test_key)
+    if fold_result is None:
+        print "Cache: miss of the model of the train/test", pos
+        if fv_path is not None:
+            fold_result = classify_file(software, fv_path,
+                    fold_context['classes_list'], train_set, test_set, pos,
+                    fold_context['parameters'])
+        else:
+            fold_result = software.classify(images_fold,
+                    fold_context['classes_list'], train_set, test_set, pos,
+                    fold_context['descriptor'], fold_context['parameters'])
+        save_classification(fit_key, test_key, fold_result)
+    test_imgs, test_class, classification_result, images_classes, \
+            model_paths = fold_result
+    del images_fold
+    
+    if images_classes is not None:
+        images_classes = list(images_classes)
+    
+    return pos, test_imgs, test_class, classification_result, \
+            images_classes, model_paths, os.getpid()
+
+def memory_processes(context):
+    """
+    Number of train/test splits that can be classified in parallel.
+    
+    Each process holds in memory the feature vectors of the split it
+    classifies, so the cores used are limited by CLASSIFY_MEMORY.
+    
+    Parameters
+    ----------
+        context : dict
+            Data of the classification, with the plugin, the fused normalizer,
+            the paths of the files of the splits and the images.
+    
+    Returns
+    -------
+        num_processes : int
+            Number of processes of the classification.
+    
+    """
+    
+    num_processes = multiprocessing.cpu_count()
+    
+    memory = CLASSIFY_MEMORY
+    if memory <= 0:
+        try:
+            memory = os.sysconf("SC_PAGE_SIZE") * \
+                    os.sysconf("SC_PHYS_PAGES") // 2
+        except (AttributeError, ValueError, OSError):
+            return num_processes
+    
+    #Estimated memory of the split of each process.  The incremental plugins
+    #read their splits in batches
+    fold_bytes = 0
+    if context['normalizer'] is not None:
+        images = context['images']
+        if images:
+            fv = images.itervalues().next()[POS_FV][INDEX_ZERO]
+            fold_bytes = len(images) * len(fv) * FV_VALUE_BYTES
+    elif not hasattr(context['software'], "partial_fit"):
+        fold_bytes = max([os.path.getsize(fv_path)
+                          for fv_path in context['fv_paths']]) * \
+                FV_FILE_EXPANSION
+    
+    if fold_bytes > 0:
+        num_processes = min(num_processes, max(1, memory // fold_bytes))
+    
+    return int(num_processes)
+
+def classify_keys(software, images_fold, train_set, test_set, fv_path=None):
+    """
+    Keys of the cache of the classification of a train/test split.
+    
+    Returns
+    -------
+        fit_key : string
+            Fingerprint of the classifier plugin (name and code_fingerprint),
+            its parameters, the classes and descriptor of the experiment, and the
+            images, classes and feature vectors of the training set (or, when
+            the split is read from fv_path, the content of the file).
+        
+        test_key : string
+            Fingerprint of fit_key and of the images and feature vectors of
+            the testing set.
+    
+    """
+    
+    if fv_path is not None:
+        train_data = cache.file_fingerprint(fv_path)
+        test_data = None
+    else:
+        train_data = [[images_fold[img][POS_CLASSES] for img in train_set],
+                      numpy.array([images_fold[img][POS_FV][INDEX_ZERO]
+                                   for img in train_set], dtype=numpy.float64)]
+        test_data = numpy.array([images_fold[img][POS_FV][INDEX_ZERO]
+                                 for img in test_set], dtype=numpy.float64)
+    
+    fit_key = cache.fingerprint(software.__name__,
+            code_fingerprint(software), fold_context['parameters'],
+            list(fold_context['classes_list']), fold_context['descriptor'],
+            list(train_set), train_data)
+    test_key = cache.fingerprint(fit_key, list(test_set), test_data)
+    
+    return fit_key, test_key
+
+def code_fingerprint(software):
+    """
+    Fingerprint of the code that fits and predicts with a classifier plugin:
+    the source of the folder of the plugin, of the modules shared by the
+    plugins (the files of CLASSIFIERS_PATH) and of SHARED_CODE_FOLDERS, so
+    that a change of any of them is not served the models of the old code.
+    """
+    
+    shared_files = sorted(path for path in
+                          glob.glob(os.path.join(CLASSIFIERS_PATH, "*"))
+                          if os.path.isfile(path) and
+                          not path.endswith(".xml"))
+    
+    return cache.fingerprint(
+            cache.folder_fingerprint(os.path.dirname(software.__file__)),
+            [(os.path.basename(path), cache.file_fingerprint(path))
+             for path in shared_files],
+            [cache.folder_fingerprint(path) for path in SHARED_CODE_FOLDERS])
+
+def classify_file(software, fv_path, classes_list, train_set, test_set, pos,
+                  parameters):
+    """
+    Classification of a train/test split with an incremental classifier
+    plugin, reading the file of the split in batches.
+    
+    The plugin is fitted with partial_fit on the batches of the training set,
+    for the number of epochs given by its parameter "Epochs", with the batches
+    in a random order, seeded by its parameter "Seed", and predicts
+    the testing set batch by batch, so only a batch of feature vectors is in
+    memory at a time.
+    
+    Parameters
+    ----------
+        software : module
+            Classifier plugin with the functions partial_fit, save_model and
+            predict.
+        
+        fv_path : string
+            Path to the file with the feature vectors of the split.
+        
+        classes_list, train_set, test_set, pos, parameters
+            As in the classify function of the plugins.
+    
+    Returns
+    -------
+        fold_result : tuple
+            Same outputs of the classify function of the plugins.
+    
+    """
+    
+    images_classes = sorted(set(classes_list))
+    class_index = dict((img_class, index)
+                       for index, img_class in enumerate(images_classes))
+    train = set(train_set)
+    test = set(test_set)
+    batch_size = int(parameters.get("Batch size", CHUNK_SIZE))
+    epochs = int(parameters.get("Epochs", 1))
+    
+    #Fit, with the batches of the file in a new random order in each epoch
+    random_state = numpy.random.RandomState(int(parameters.get("Seed", 0)))
+    offsets = util.fv_file_offsets(fv_path, batch_size)
+    fv_file = open(fv_path, "rb")
+    model = None
+    for epoch in range(epochs):
+        print "\tFit: epoch", epoch + 1, "of", epochs
+        for offset in random_state.permutation(offsets):
+            batch = util.read_fv_batch(fv_file, int(offset), batch_size)
+            batch = [(img_classes, fv) for img, img_classes, fv in batch
+                     if img in train]
+            if batch:
+                model = software.partial_fit(
+                        numpy.array([fv for _, fv in batch]),
+                        numpy.array([class_index[img_classes[INDEX_ZERO]]
+                                     for img_classes, _ in batch]),
+                        parameters, model, len(images_classes), random_state)
+    fv_file.close()
+    model_paths = software.save_model(model, pos)
+    
+    #Predict
+    print "\tPredict: Beginning"
+    test_imgs, test_class, classification_result = [], [], []
+    for batch in util.iter_fv_file(fv_path, batch_size):
+        batch = [item for item in batch if item[INDEX_ZERO] in test]
+        if not batch:
+            continue
+        list_predict = software.predict(model,
+                numpy.array([fv for _, _, fv in batch]), parameters)
+        for (img, img_classes, _), predict in zip(batch, list_predict):
+            img_result = [0] * len(images_classes)
+            img_result[predict] = 1
+            test_imgs.append(img)
+            test_class.append(img_classes[INDEX_ZERO])
+            classification_result.append(img_result)
+    print "\tPredict: Done"
+    
+    return test_imgs, numpy.array(test_class), classification_result, \
+            images_classes, model_paths
+
+def load_classification(software, images_fold, test_set, fit_key, test_key):
+    """
+    Outputs of the classify function of the plugin from the cache, if enabled.
+    
+    When the same classifier was already fitted on the same training set, its
+    model files are restored, and the testing set is predicted with them
+    (load_model and predict of the plugin), unless the predictions of the
+    same testing set are cached too.
+    
+    Returns
+    -------
+        fold_result : tuple
+            Outputs of the classify function of the plugin, or None if the
+            model is not cached or the plugin can not predict with it.
+    
+    """
+    
+    if not CACHE_CLASSIFIER:
+        return None
+    
+    model = cache.load(CACHE_NAMESPACE, fit_key)
+    if model is None:
+        return None
+    
+    outputs = cache.load(CACHE_NAMESPACE, test_key)
+    if outputs is None and (images_fold is None or
+                            not (hasattr(software, "load_model") and
+                                 hasattr(software, "predict"))):
+        return None
+    
+    #Restore the files of the model, with their names
+    if not os.path.exists(TEMP_PATH):
+        try:
+            os.makedirs(TEMP_PATH)
+        except OSError:
+            #Created by another process
+            pass
+    model_folder = tempfile.mkdtemp(prefix="model_", dir=TEMP_PATH)
+    model_paths = []
+    for model_name, content in model['files']:
+        model_path = os.path.join(model_folder, model_name)
+        model_file = open(model_path, "wb")
+        model_file.write(content)
+        model_file.close()
+        model_paths.append(model_path)
+    images_classes = model['images_classes']
+    
+    if outputs is not None:
+        print "Cache: hit of the model and of the predictions"
+        test_imgs, test_class, classification_result = outputs
+        return test_imgs, test_class, classification_result, images_classes, \
+                model_paths
+    
+    print "Cache: hit of the model, predicting the testing set"
+    loaded_model = software.load_model(model_paths,
+                                       fold_context['parameters'])
+    list_predict = software.predict(loaded_model,
+            numpy.array([images_fold[img][POS_FV][INDEX_ZERO]
+                         for img in test_set]), fold_context['parameters'])
+    del loaded_model
+    
+    test_imgs = list(test_set)
+    test_class = numpy.array([images_fold[img][POS_CLASSES][INDEX_ZERO]
+                              for img in test_set])
+    classification_result = []
+    for predict in list_predict:
+        img_result = [0] * len(images_classes)
+        img_result[predict] = 1
+        classification_result.append(img_result)
+    save_classification(None, test_key,
+            (test_imgs, test_class, classification_result, None, None))
+    
+    return test_imgs, test_class, classification_result, images_classes, \
+            model_paths
+
+def save_classification(fit_key, test_key, fold_result):
+    """
+    Save the model files (if fit_key is given) and the predictions of a
+    classification in the cache, if enabled.
+    """
+    
+    test_imgs, test_class, classification_result, images_classes, \
+            model_paths = fold_result
+    if not CACHE_CLASSIFIER or test_imgs is None:
+        return
+    
+    if fit_key is not None:
+        if not isinstance(model_paths, list):
+            model_paths = [model_paths]
+        files = []
+        for model_path in model_paths:
+            model_file = open(model_path, "rb")
+            files.append((os.path.basename(model_path), model_file.read()))
+            model_file.close()
+        cache.save(CACHE_NAMESPACE, fit_key,
+                   {'files': files, 'images_classes': list(images_classes)})
+    
+    cache.save(CACHE_NAMESPACE, test_key,
+               (test_imgs, test_class, classification_result))
+
+def save_fold(pos, fold_result, new_images, total_classify, experiment_path,
+              experiment_folder, classifier, node_id):
+    """
+    Save the classification of a train/test split.
+    
+    Moves the models of the classifier to the experiment folder, writes the
+    classification file of the split and adds the predictions to new_images.
+    
+    Returns
+    -------
+        images_classes : list
+            Classes of the classifier for this split.
+    
+    """
+    
+    test_imgs, test_class, classification_result, images_classes, \
+            model_paths = fold_result
+    classification_path = experiment_path + str(pos) + ".txt"
+    
+    if test_imgs == None: # In case of error in the plugin, end experiment
+        socket_framework.sendall("%s %s///" % (END_EXPERIMENT, None))
+        socket_framework.close()
+        
+    print "Success of the classification"
+    
+    #Move the model of the classifier to the folder of this iteration and
+    #split, keeping the names of the files, which the models saved in more
+    #than one file (joblib) refer to
+    if not isinstance(model_paths, list):
+        model_paths = [model_paths]
+    images_classes = list(images_classes)
+    path_models = models_folder(experiment_folder, node_id, classifier,
+                                iteration, pos)
+    if not os.path.exists(path_models):
+        os.makedirs(path_models)
+    model_names = []
+    for item_path in model_paths:
+        model_name = os.path.basename(item_path)
+        if os.path.exists(os.path.join(path_models, model_name)):
+            os.remove(os.path.join(path_models, model_name))
+        shutil.move(item_path, path_models)
+        model_names.append(model_name)
+    
+    #Remove the folders the models restored from the cache were written to
+    for model_folder in set(os.path.dirname(os.path.abspath(item_path))
+                            for item_path in model_paths):
+        if os.path.dirname(model_folder) == TEMP_PATH and \
+                os.path.basename(model_folder).startswith("model_") and \
+                not os.listdir(model_folder):
+            os.rmdir(model_folder)
+    
+    #Files read by the prediction with the saved models
+    models_file = open(os.path.join(path_models, MODELS_FILE), "wb")
+    models_file.write("\n".join(model_names) + "\n")
+    models_file.close()
+    classes_file = open(os.path.join(path_models, CLASSES_FILE), "wb")
+    classes_file.write("\n".join(map(str, images_classes)) + "\n")
+    classes_file.close()
+    
+    classification_file = open(classification_path, "wb")
+    classification_file.write(str(images_classes) + '\n')
+    for pos_test in range(len(test_imgs)):
+        img_path = test_imgs[pos_test]
+        img_classes = test_class[pos_test]
+        img_predict = classification_result[pos_test]
+        
+        #Save the new_images with the test set
+        np_zeros = zeros(len(images_classes))
+        if img_path not in new_images:
+            new_images[img_path] = [[img_classes], [np_zeros] * \
+                    total_classify]
+        new_images[img_path][POS_PREDICT][pos] = img_predict
+        
+        line = img_path + " " + str(img_classes) + " " + \
+               str(img_predict) + "\n"
+        classification_file.write(line)
+    classification_file.close()
+    
+    return images_classes
+
+def models_folder(experiment_folder, node_id, classifier, iteration, pos):
+    """
+    Folder with the models of a classifier node for a train/test split of an
+    iteration of the experiment, with the list of their files (MODELS_FILE,
+    the main one first) and the classes of the classifier (CLASSES_FILE), in
+    the order of its predictions.
+    """
+    
+    return os.path.join(experiment_folder, "Models", 'Node ' + str(node_id) + \
+            ' - ' + classifier, "iteration_" + str(iteration),
+            "train_test_" + str(pos))
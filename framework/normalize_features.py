@@ -41,16 +41,33 @@ import os
 from datetime import datetime, timedelta
 import sys
 import multiprocessing
+from multiprocessing import Manager
+
+import numpy
 
 import util
+import cache
 
 import config
 START = config.MESSAGE_MODULE_START
 PROGRESS = config.MESSAGE_MODULE_PROGRESS
+CACHE_NORMALIZER = config.CACHE_NORMALIZER
+CACHE_NAMESPACE = "normalizers"
+NORMALIZERS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                                "..", "normalizers"))
+#Code shared by the normalizer plugins and the code that fits them, part of
+#the keys of their cache
+SHARED_CODE_FILES = [os.path.join(NORMALIZERS_PATH, "running_stats.py"),
+                     os.path.splitext(os.path.abspath(__file__))[0] + ".py"]
 POS_CLASSES = 0
 POS_FV = 1
 POS_TRAIN = 0
 POS_TEST = 1
+INDEX_ZERO = 0
+CHUNK_SIZE = int(1E3)
+DTYPE = numpy.float32
+#Format of the normalized values in the files, enough to recover each float32
+FV_VALUE_FORMAT = "%.9g"
 
 #Global variables
 str_buffer = ""
@@ -62,9 +79,24 @@ total_images = 0
 curr_progress = -1
 
 def main(images, train_test_list, experiment_folder, normalizer, parameters,
-         id_node):
+         id_node, fv_paths=None):
     """
-    Call the descriptor plugin to extract the descriptors of the given images.
+    Call the normalizer plugin to normalize the feature vectors of the given
+    images.
+    
+    Plugins that implement fit and transform have their parameters calculated
+    once for each training set, and the feature vectors are normalized in
+    chunks of CHUNK_SIZE. Plugins that only implement normalize are called
+    once for each image.
+    
+    When images is None, the feature vectors are streamed from the files in
+    fv_paths, in two passes: the first accumulates the parameters of the
+    training set with the partial_fit of the plugin, and the second normalizes
+    the feature vectors. Only CHUNK_SIZE feature vectors are kept in memory.
+    
+    If CACHE_NORMALIZER is set, the parameters calculated for a training set
+    are stored, and reused by later iterations and experiments with the same
+    feature vectors, training set, normalizer and parameters.
     
     Parameters
     ----------
@@ -94,6 +126,10 @@ def main(images, train_test_list, experiment_folder, normalizer, parameters,
             
         id_node : string
             ID of the normalization plugin node in the experiment.   
+        
+        fv_paths : list, optional
+            The i'th entry is the path to the file with the feature vectors of
+            the i'th train/test split. Used when images is None.
     
     Returns
     -------
@@ -112,10 +148,12 @@ def main(images, train_test_list, experiment_folder, normalizer, parameters,
     global node_id
     global total_images
     global number_images
+    global curr_progress
     
     node_id = id_node
     number_images = 0
     total_images = 0
+    curr_progress = -1
     
     #Send the start of the module
     try:
@@ -133,12 +171,20 @@ def main(images, train_test_list, experiment_folder, normalizer, parameters,
     init_normalize = datetime.now()
     
     #Import
-    path_normalizers = os.path.abspath(os.path.join(os.path.dirname(__file__),
-                                       "..", "normalizers", normalizer))
-    sys.path.append(path_normalizers)
-    software = __import__("plugin_" + normalizer)
+    software = import_normalizer(normalizer)
     print software
     
+    #Plugins without the matrix interface share the images with the processes
+    matrix_api = hasattr(software, "fit") and hasattr(software, "transform")
+    if images is None:
+        if not hasattr(software, "partial_fit") or not matrix_api:
+            print "\n\tNormalizer", normalizer, "does not support feature", \
+                  "vectors from files. Exiting."
+            sys.exit(1)
+    elif not matrix_api:
+        manager = Manager()
+        images = manager.dict(images)
+    
     #Performs the normalization for every train and test
     total_normalize = len(train_test_list)
     for train, test in train_test_list:
@@ -148,45 +194,19 @@ def main(images, train_test_list, experiment_folder, normalizer, parameters,
         train_param = {}
         
         #Paths
-        normalized_path = experiment_folder + "iteration:" + str(iteration) + \
-                          "-normalizer-id:" + node_id + "-" + normalizer + \
-                          "-train_test" + str(i) + ".txt"
+        normalized_path = normalized_file_path(experiment_folder, node_id,
+                                               normalizer, i)
         norm_fv_paths.append(normalized_path)
         
-        num_cores = int(multiprocessing.cpu_count())
-        print "Number of cores used: ", num_cores
-        
-        print "Normalizing the training set"
-        pool = multiprocessing.Pool(num_cores)
-        #Normalization of the train set
-        for img in train_test_list[i][POS_TRAIN]:
-            img_classes = images[img][POS_CLASSES]
-            img_fv = images[img][POS_FV]
-            pool.apply_async(software.normalize, args = (img, images,
-                    train_test_list[i][POS_TRAIN], i, parameters, "train",
-                    train_param), callback = save_norm)
-        pool.close()
-        pool.join()
-        
-        print "Normalizing the testing set"
-        pool = multiprocessing.Pool(num_cores)
-        #Normalization of the test set
-        for img in train_test_list[i][POS_TEST]:
-            img_classes = images[img][POS_CLASSES]
-            img_fv = images[img][POS_FV]
-            pool.apply_async(software.normalize, args = (img, images,
-                    train_test_list[i][POS_TEST], i, parameters, "test",
-                    train_param), callback = save_norm)
-        pool.close()
-        pool.join()
-        
-        print "Saving rest of the buffer"
-        normalized_file = open(normalized_path, "ab")
-        normalized_file.write(str_buffer)
-        normalized_file.close()
-        
-        #Clean buffer
-        str_buffer = ""
+        if images is None:
+            train_param = normalize_file(software, fv_paths[i],
+                    train_test_list[i], parameters, normalized_path)
+        elif matrix_api:
+            train_param = normalize_fold(software, images, train_test_list[i],
+                    i, parameters, normalized_path)
+        else:
+            normalize_images(software, images, train_test_list[i], i,
+                    parameters)
     
     #End of the normalization
     print "Success of the normalization"
@@ -200,6 +220,439 @@ def main(images, train_test_list, experiment_folder, normalizer, parameters,
     
     return norm_fv_paths, normalize_time
 
+def normalized_file_path(experiment_folder, id_node, normalizer,
+                         pos_train_test):
+    """
+    Path of the file with the normalized feature vectors of a split.
+    """
+    
+    return experiment_folder + "iteration:" + str(iteration) + \
+           "-normalizer-id:" + id_node + "-" + normalizer + "-train_test" + \
+           str(pos_train_test) + ".txt"
+
+def fold_matrix(images, images_set, pos_train_test):
+    """
+    Gather the feature vectors of a set of images in a contiguous matrix of
+    DTYPE, filled row by row.
+    
+    Parameters
+    ----------
+        images : dict, {string : [list, list]}
+            Dictionary containing the classes and feature vectors for each
+            image of the experiment.
+        
+        images_set : list
+            Paths of the images, in the order of the rows of the matrix.
+        
+        pos_train_test : int
+            Index of the train/test split, used to select the feature vector
+            of images with one feature vector per split.
+    
+    Returns
+    -------
+        matrix : numpy.ndarray
+            Matrix with one feature vector in each row.
+    
+    """
+    
+    matrix = None
+    for row, img in enumerate(images_set):
+        try:
+            img_fv = images[img][POS_FV][pos_train_test]
+        except:
+            img_fv = images[img][POS_FV][INDEX_ZERO]
+        if matrix is None:
+            matrix = numpy.empty((len(images_set), len(img_fv)), dtype=DTYPE)
+        matrix[row] = img_fv
+    
+    if matrix is None:
+        matrix = numpy.empty((0, 0), dtype=DTYPE)
+    
+    return matrix
+
+def import_normalizer(normalizer):
+    """
+    Import the plugin of the normalizer from the normalizers folder.
+    """
+    
+    path_normalizers = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       "..", "normalizers", normalizer))
+    sys.path.append(path_normalizers)
+    
+    return __import__("plugin_" + normalizer)
+
+def fit_fold(software, images, train, pos_train_test, parameters):
+    """
+    Calculate the parameters of the normalization with the training set of a
+    split, or load them from the cache.
+    
+    Returns
+    -------
+        train_matrix : numpy.ndarray
+            Matrix with the feature vectors of the training set.
+        
+        fold_param : dict
+            Parameters of the normalization calculated with the training set.
+    
+    """
+    
+    train_matrix = fold_matrix(images, train, pos_train_test)
+    key = fit_key(software, parameters, train, train_matrix)
+    fold_param = load_fit(key)
+    if fold_param is None:
+        print "Fitting the training set"
+        fold_param = software.fit(train_matrix, parameters)
+        save_fit(key, fold_param)
+    
+    return train_matrix, fold_param
+
+def transform_fold(software, images, train_test, pos_train_test, parameters,
+                   train_matrix, fold_param):
+    """
+    Normalize the training and testing sets of a split in chunks of CHUNK_SIZE
+    feature vectors.
+    
+    The chunks of the training set are normalized in place in train_matrix,
+    and the ones of the testing set are gathered only when needed.
+    
+    Returns
+    -------
+        chunks : generator of tuple
+            Tuples (images_set, list_classes, norm_matrix) with the paths, the
+            classes and the normalized feature vectors of each chunk.
+    
+    """
+    
+    train, test = train_test
+    
+    print "Normalizing the training set"
+    for start in range(0, len(train), CHUNK_SIZE):
+        chunk = train[start:start + CHUNK_SIZE]
+        norm_matrix = software.transform(
+                train_matrix[start:start + CHUNK_SIZE], parameters, fold_param)
+        yield chunk, [images[img][POS_CLASSES] for img in chunk], norm_matrix
+    
+    print "Normalizing the testing set"
+    for start in range(0, len(test), CHUNK_SIZE):
+        chunk = test[start:start + CHUNK_SIZE]
+        norm_matrix = software.transform(
+                fold_matrix(images, chunk, pos_train_test), parameters,
+                fold_param)
+        yield chunk, [images[img][POS_CLASSES] for img in chunk], norm_matrix
+
+def normalize_fold(software, images, train_test, pos_train_test, parameters,
+                   output_path):
+    """
+    Normalize a train/test split with the fit and transform of the plugin.
+    
+    The parameters of the normalization are calculated once with the training
+    set, and applied to the training and testing sets in chunks of CHUNK_SIZE
+    feature vectors, which are written in output_path. The transform of the
+    plugin normalizes the chunks in place.
+    
+    Parameters
+    ----------
+        software : module
+            Normalizer plugin.
+        
+        images : dict, {string : [list, list]}
+            Dictionary containing the classes and feature vectors for each
+            image of the experiment.
+        
+        train_test : list
+            Training and testing sets of the split.
+        
+        pos_train_test : int
+            Index of the split.
+        
+        parameters : dict, {string : string}
+            Dictionary with the plugin-specific parameters.
+        
+        output_path : string
+            Path of the file with the normalized feature vectors.
+    
+    Returns
+    -------
+        fold_param : dict
+            Parameters of the normalization calculated with the training set.
+    
+    """
+    
+    train_matrix, fold_param = fit_fold(software, images,
+            train_test[POS_TRAIN], pos_train_test, parameters)
+    
+    normalized_file = open(output_path, "wb")
+    for chunk, list_classes, norm_matrix in transform_fold(software, images,
+            train_test, pos_train_test, parameters, train_matrix, fold_param):
+        write_chunk(normalized_file, chunk, list_classes, norm_matrix)
+        update_progress(len(chunk))
+    normalized_file.close()
+    
+    return fold_param
+
+def normalize_split(software, images, train_test, pos_train_test, parameters,
+                    output_path=None):
+    """
+    Normalize a train/test split in memory.
+    
+    Used when the normalizer is fused with the classifier that follows it: the
+    split is normalized inside the loop of the classification, and only one
+    split is kept in memory.
+    
+    Parameters
+    ----------
+        software : module
+            Normalizer plugin, with fit and transform.
+        
+        images : dict, {string : [list, list]}
+            Dictionary containing the classes and feature vectors for each
+            image of the experiment.
+        
+        train_test : list
+            Training and testing sets of the split.
+        
+        pos_train_test : int
+            Index of the split.
+        
+        parameters : dict, {string : string}
+            Dictionary with the plugin-specific parameters.
+        
+        output_path : string, optional
+            If given, the normalized feature vectors are also written in this
+            file.
+    
+    Returns
+    -------
+        fold_images : dict, {string : [list, list]}
+            Dictionary with the classes and the normalized feature vector of
+            each image of the split, in the format of util.read_fv_file.
+    
+    """
+    
+    train_matrix, fold_param = fit_fold(software, images,
+            train_test[POS_TRAIN], pos_train_test, parameters)
+    
+    if output_path is not None:
+        normalized_file = open(output_path, "wb")
+    
+    fold_images = {}
+    for chunk, list_classes, norm_matrix in transform_fold(software, images,
+            train_test, pos_train_test, parameters, train_matrix, fold_param):
+        if output_path is not None:
+            write_chunk(normalized_file, chunk, list_classes, norm_matrix)
+        #The classifiers receive the feature vectors in double precision, as
+        #when they are read from the files
+        norm_matrix = numpy.asarray(norm_matrix, dtype=numpy.float64)
+        for img, img_classes, norm_fv in zip(chunk, list_classes,
+                                             norm_matrix):
+            fold_images[img] = [img_classes, [norm_fv]]
+    
+    if output_path is not None:
+        normalized_file.close()
+    
+    return fold_images
+
+def normalize_file(software, fv_path, train_test, parameters, output_path):
+    """
+    Normalize a train/test split reading the feature vectors from a file.
+    
+    The file is read twice, in batches of CHUNK_SIZE feature vectors. The first
+    pass accumulates the parameters of the normalization with the feature
+    vectors of the training set, using the partial_fit of the plugin, and the
+    second pass normalizes all the feature vectors of the file, which are
+    written in output_path in the same order.
+    
+    Parameters
+    ----------
+        software : module
+            Normalizer plugin.
+        
+        fv_path : string
+            Path to the file with the feature vectors of the split.
+        
+        train_test : list
+            Training and testing sets of the split.
+        
+        parameters : dict, {string : string}
+            Dictionary with the plugin-specific parameters.
+        
+        output_path : string
+            Path of the file with the normalized feature vectors.
+    
+    Returns
+    -------
+        fold_param : dict
+            Parameters of the normalization calculated with the training set.
+    
+    """
+    
+    train = set(train_test[POS_TRAIN])
+    
+    key = fit_key(software, parameters, train_test[POS_TRAIN],
+                  cache.file_fingerprint(fv_path))
+    fold_param = load_fit(key)
+    if fold_param is None:
+        print "Fitting the training set"
+        fold_param = {}
+        for batch in util.iter_fv_file(fv_path, CHUNK_SIZE):
+            list_fv = [fv for img, img_classes, fv in batch if img in train]
+            if list_fv:
+                fold_param = software.partial_fit(
+                        numpy.array(list_fv, dtype=DTYPE), parameters,
+                        fold_param)
+        save_fit(key, fold_param)
+    
+    print "Normalizing the feature vectors"
+    normalized_file = open(output_path, "wb")
+    for batch in util.iter_fv_file(fv_path, CHUNK_SIZE):
+        img_paths, list_classes, list_fv = zip(*batch)
+        norm_matrix = software.transform(numpy.array(list_fv, dtype=DTYPE),
+                parameters, fold_param)
+        write_chunk(normalized_file, img_paths, list_classes, norm_matrix)
+        update_progress(len(batch))
+    normalized_file.close()
+    
+    return fold_param
+
+def fit_key(software, parameters, train, data):
+    """
+    Key of the parameters of a normalizer fitted on a training set.
+    
+    Parameters
+    ----------
+        software : module
+            Normalizer plugin. The source of its folder and SHARED_CODE_FILES
+            are part of the key, so a change in the code does not reuse old
+            parameters.
+        
+        parameters : dict, {string : string}
+            Dictionary with the plugin-specific parameters.
+        
+        train : list
+            Paths of the images of the training set.
+        
+        data : numpy.ndarray or string
+            Training matrix, or fingerprint of the file with the feature
+            vectors.
+    
+    Returns
+    -------
+        key : string
+            Fingerprint of the arguments.
+    
+    """
+    
+    return cache.fingerprint(software.__name__, code_fingerprint(software),
+                             parameters, list(train), data)
+
+def code_fingerprint(software):
+    """
+    Fingerprint of the code that fits a normalizer plugin: the source of the
+    folder of the plugin and SHARED_CODE_FILES.
+    """
+    
+    return cache.fingerprint(
+            cache.folder_fingerprint(os.path.dirname(software.__file__)),
+            [(os.path.basename(path), cache.file_fingerprint(path))
+             for path in SHARED_CODE_FILES])
+
+def load_fit(key):
+    """
+    Load the parameters of a normalization from the cache, if enabled.
+    """
+    
+    if not CACHE_NORMALIZER:
+        return None
+    
+    fold_param = cache.load(CACHE_NAMESPACE, key)
+    if fold_param is not None:
+        print "Using the parameters of the training set from the cache"
+    
+    return fold_param
+
+def save_fit(key, fold_param):
+    """
+    Save the parameters of a normalization in the cache, if enabled.
+    """
+    
+    if CACHE_NORMALIZER:
+        cache.save(CACHE_NAMESPACE, key, fold_param)
+
+def write_chunk(normalized_file, images_set, list_classes, norm_matrix):
+    """
+    Write a chunk of normalized feature vectors in the framework's format.
+    
+    Parameters
+    ----------
+        normalized_file : file
+            File opened for writing.
+        
+        images_set : list
+            Paths of the images of the chunk.
+        
+        list_classes : list
+            Classes of each image of the chunk.
+        
+        norm_matrix : sequence
+            Normalized feature vectors, in the order of images_set.
+    
+    Returns
+    -------
+        None
+    
+    """
+    
+    lines = []
+    for img, img_classes, norm_fv in zip(images_set, list_classes,
+                                         norm_matrix):
+        lines.append(img + " " + str(len(img_classes)) + " " + \
+                str(img_classes) + " [" + \
+                ", ".join([FV_VALUE_FORMAT % value for value in norm_fv]) + \
+                "]\n")
+    normalized_file.write("".join(lines))
+
+def normalize_images(software, images, train_test, pos_train_test,
+                     parameters):
+    """
+    Normalize a train/test split calling the normalize of the plugin for each
+    image.
+    
+    The results are saved in normalized_path by save_norm.
+    """
+    
+    global str_buffer
+    
+    num_cores = int(multiprocessing.cpu_count())
+    print "Number of cores used: ", num_cores
+    
+    print "Normalizing the training set"
+    pool = multiprocessing.Pool(num_cores)
+    #Normalization of the train set
+    for img in train_test[POS_TRAIN]:
+        pool.apply_async(software.normalize, args = (img, images,
+                train_test[POS_TRAIN], pos_train_test, parameters, "train",
+                train_param), callback = save_norm)
+    pool.close()
+    pool.join()
+    
+    print "Normalizing the testing set"
+    pool = multiprocessing.Pool(num_cores)
+    #Normalization of the test set
+    for img in train_test[POS_TEST]:
+        pool.apply_async(software.normalize, args = (img, images,
+                train_test[POS_TEST], pos_train_test, parameters, "test",
+                train_param), callback = save_norm)
+    pool.close()
+    pool.join()
+    
+    print "Saving rest of the buffer"
+    normalized_file = open(normalized_path, "ab")
+    normalized_file.write(str_buffer)
+    normalized_file.close()
+    
+    #Clean buffer
+    str_buffer = ""
+
 def save_norm(result):
     """
     Buffer a normalized fv and save to disk when the buffer is full.    
@@ -222,10 +675,6 @@ def save_norm(result):
     global str_buffer
     global normalized_path
     global train_param
-    global number_images
-    global node_id
-    global total_images
-    global curr_progress
 
     #Constants
     BUFFER_LIMIT = int(1E4)
@@ -252,7 +701,20 @@ def save_norm(result):
         str_buffer = ""
     str_buffer = str_buffer + "\n"
     
-    number_images += 1
+    update_progress(1)
+
+def update_progress(new_images):
+    """
+    Count the normalized feature vectors and send the progress of the module
+    to the interface.
+    """
+    
+    global number_images
+    global node_id
+    global total_images
+    global curr_progress
+    
+    number_images += new_images
     progress = number_images / total_images
     
     if int(100 * progress) > curr_progress:
@@ -0,0 +1,311 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+#Python import
+import os
+import sys
+import ast
+import glob
+import multiprocessing
+import xml.etree.cElementTree as ET
+from datetime import datetime
+import numpy
+
+#Framework import
+import util
+import classify
+
+#CONSTANTS
+BATCH_SIZE = 1000
+INDEX_ZERO = 0
+UNSUPPORTED_DESCRIPTORS = ["bag", "bovg", "read_features"]
+
+#Global variables
+descriptor_context = {}
+
+def main(experiment_folder, node_id, input_path, output_path, images=False,
+         iteration=0, pos=0, batch_size=BATCH_SIZE):
+    """
+    Predict the classes of new images with the models saved by a classifier
+    node of an experiment, without running the experiment again.
+    
+    The feature vectors are read, predicted and written in batches, so the
+    input is never loaded whole in memory, and the model is loaded only
+    once, with its arrays memory-mapped when the plugin supports it.
+    
+    Parameters
+    ----------
+        experiment_folder : string
+            Path to the folder of the experiment, with its xml file and the
+            folder Models.
+        
+        node_id : string
+            ID of the classifier node in the experiment.
+        
+        input_path : string
+            Path to a file with the feature vectors, in the format of the
+            framework, or, if images is True, to a file with the path of one
+            image per line.
+        
+        output_path : string
+            Path to the file where the image path and the predicted class of
+            each image are written, one per line.
+        
+        images : bool, optional
+            True if input_path is a list of images. Their feature vectors
+            are read from the extraction of the collection of the experiment
+            or, if missing, extracted with its descriptor.
+        
+        iteration : int, optional
+            Iteration of the experiment whose models are used.
+        
+        pos : int, optional
+            Index of the train/test split whose model is used.
+        
+        batch_size : int, optional
+            Number of images predicted at a time.
+    
+    Returns
+    -------
+        number_images : int
+            Number of predicted images.
+        
+        predict_time : float
+            Time taken to execute this function.
+    
+    """
+    
+    init_predict = datetime.now()
+    
+    print "Prediction module"
+    
+    xml = find_experiment(experiment_folder, node_id)
+    workflow = find_workflow(xml, node_id)
+    
+    classifier = workflow["classifier"]
+    classifier_name = classifier.get("name")
+    parameters = ast.literal_eval(classifier.get("parameters"))
+    
+    #Files saved by the classification
+    path_models = classify.models_folder(experiment_folder, node_id,
+                                         classifier_name, iteration, pos)
+    model_paths = [os.path.join(path_models, name)
+                   for name in read_lines(os.path.join(path_models,
+                                                       classify.MODELS_FILE))]
+    classes = read_lines(os.path.join(path_models, classify.CLASSES_FILE))
+    print "Models:", model_paths
+    print "List of classes of the classifier:", classes
+    
+    #Import the plugin of the classifier
+    classifiers_path = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       "..", "classifiers", classifier_name))
+    sys.path.append(classifiers_path)
+    software = __import__("plugin_" + classifier_name)
+    print software
+    if not (hasattr(software, "load_model") and hasattr(software, "predict")):
+        raise ValueError("The plugin of the classifier %s can not predict with "
+                         "its saved models." % classifier_name)
+    
+    model = software.load_model(model_paths, parameters)
+    
+    if images:
+        batches = iter_images(input_path, workflow, batch_size)
+    else:
+        batches = util.iter_fv_file(input_path, batch_size)
+    
+    number_images = 0
+    output_file = open(output_path, "wb")
+    for batch in batches:
+        list_fv = numpy.array([fv for _, _, fv in batch])
+        list_predict = software.predict(model, list_fv, parameters)
+        
+        str_buffer = ""
+        for (img_path, _, _), predict in zip(batch, list_predict):
+            str_buffer += img_path + " " + classes[predict] + "\n"
+        output_file.write(str_buffer)
+        
+        number_images += len(batch)
+        print "\tPredicted images:", number_images
+    output_file.close()
+    
+    #Time calculation of the prediction
+    end_predict = datetime.now()
+    predict_time = end_predict - init_predict
+    predict_time = predict_time.total_seconds()
+    print "Total prediction time:", predict_time, "seconds"
+    
+    return number_images, predict_time
+
+def read_lines(file_path):
+    """
+    Non-empty lines of a file, without the line breaks.
+    """
+    
+    lines_file = open(file_path, "rb")
+    lines = [line.strip() for line in lines_file if line.strip()]
+    lines_file.close()
+    
+    return lines
+
+def find_experiment(experiment_folder, node_id):
+    """
+    Parsed xml file of the experiment in experiment_folder with the
+    classifier node node_id.
+    """
+    
+    for xml_path in sorted(glob.glob(os.path.join(experiment_folder, "*.xml"))):
+        try:
+            xml = ET.parse(xml_path)
+        except ET.ParseError:
+            continue
+        if xml.find("links") is None:
+            continue
+        for element in xml.getroot().getchildren():
+            if element.tag == "classifier" and element.get("id") == node_id:
+                return xml
+    
+    raise ValueError("No experiment in %s with the classifier node %s." %
+                     (experiment_folder, node_id))
+
+def find_workflow(xml, node_id):
+    """
+    Nodes of the workflow that ends in the node node_id, indexed by their
+    tags, following the inputs of each node up to the collection.
+    
+    The normalizers and fusion methods are not supported: the normalization
+    of the training set and the other classifiers are not saved with the
+    models.
+    """
+    
+    nodes = {}
+    for element in xml.getroot().getchildren():
+        if element.tag != "links":
+            nodes[element.get("id")] = element
+    
+    inputs = {}
+    for link in xml.find("links").findall("link"):
+        inputs[link.get("id")] = [in_link.text.split()[0]
+                                  for in_link in link.findall("in")]
+    
+    workflow = {}
+    current = node_id
+    while current is not None:
+        node = nodes[current]
+        if node.tag in ["normalizer", "fusion_method"]:
+            raise ValueError("The classifier node %s follows a %s node, which "
+                             "is not supported by the prediction." %
+                             (node_id, node.tag))
+        workflow[node.tag] = node
+        parents = inputs.get(current, [])
+        current = parents[INDEX_ZERO] if parents else None
+    
+    return workflow
+
+def iter_images(input_path, workflow, batch_size):
+    """
+    Feature vectors of the images listed in input_path, in batches of
+    batch_size tuples (img_path, img_classes, fv) as util.iter_fv_file.
+    
+    The feature vectors already extracted for the collection of the
+    experiment are reused, and the missing ones are extracted by the
+    descriptor of the experiment in parallel.
+    """
+    
+    global descriptor_context
+    
+    descriptor = workflow["descriptor"]
+    descriptor_name = descriptor.get("name")
+    param = ast.literal_eval(descriptor.get("parameters"))
+    if descriptor_name in UNSUPPORTED_DESCRIPTORS:
+        raise ValueError("The features of the descriptor %s can not be "
+                         "extracted for new images." % descriptor_name)
+    
+    list_img = read_lines(input_path)
+    
+    #Feature vectors already extracted, in the same file as extract_features
+    extracted_path = os.path.join(os.path.dirname(__file__), "..", "results",
+            workflow["collection"].get("name"), descriptor_name + "." + \
+            str(param).replace(os.sep, '%') + ".fv")
+    wanted = set(list_img)
+    extracted = {}
+    if os.path.exists(extracted_path):
+        for batch in util.iter_fv_file(extracted_path, batch_size):
+            for img_path, img_classes, fv in batch:
+                if img_path in wanted:
+                    extracted[img_path] = (img_path, img_classes, fv)
+    print "Images with the feature vectors already extracted:", len(extracted)
+    
+    #Import the plugin of the descriptor
+    descriptors_path = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                       "..", "descriptors", descriptor_name))
+    sys.path.append(descriptors_path)
+    descriptor_context = {'software': __import__("plugin_" + descriptor_name),
+                          'param': param}
+    
+    pool = None
+    try:
+        for begin in range(0, len(list_img), batch_size):
+            batch = list_img[begin:begin + batch_size]
+            missing = [img_path for img_path in batch
+                       if img_path not in extracted]
+            if missing:
+                if pool is None:
+                    pool = multiprocessing.Pool(multiprocessing.cpu_count())
+                for img_path, (img_classes, fv) in zip(missing,
+                        pool.map(extract_image, missing)):
+                    extracted[img_path] = (img_path, img_classes, fv)
+            
+            yield [extracted[img_path] for img_path in batch]
+            for img_path in batch:
+                extracted.pop(img_path, None)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        descriptor_context = {}
+
+def extract_image(img_path):
+    """
+    Extract the feature vector of an image with the descriptor of
+    descriptor_context, shared by the processes of the pool.
+    """
+    
+    _, _, img_classes, fv = descriptor_context['software'].extract(img_path,
+            [], descriptor_context['param'])
+    
+    return img_classes, fv
@@ -45,7 +45,6 @@ import copy
 import socket
 import subprocess
 from datetime import datetime
-from multiprocessing import Manager
 
 #Framework imports
 import util
@@ -77,7 +76,7 @@ folder_name = "" # folder where intermediate/temporary files are stored
 tex_dict = {}
 openset_experiment = False
 
-def execute(node, previous, experiment_folder):
+def execute(node, previous, experiment_folder, fused=False):
     """
     Execute a task defined by the given node in the experiment graph.
     
@@ -96,6 +95,11 @@ def execute(node, previous, experiment_folder):
     experiment_folder : string
         String with the path to the experiment folder, where the files of the
         experiment will be saved.
+    
+    fused : bool
+        True if the node is a normalizer whose only child is a classifier. In
+        this case, the normalization is done by the classifier, split by
+        split, when the plugin of the normalizer supports it.
         
     Returns
     -------
@@ -178,40 +182,67 @@ def execute(node, previous, experiment_folder):
 
     elif node.tag == "normalizer":
         try:
-            manager = Manager()
-            images = manager.dict(exp_param['images'])
             train_test_list = exp_param['train_test_list']
+            #A previous normalizer leaves only the files of feature vectors
+            if 'images' in exp_param:
+                images = exp_param['images']
+                fv_paths = None
+            else:
+                images = None
+                fv_paths = exp_param['fv_paths']
         except:
             print "\n\tMissing Input. Exiting."
             sys.exit(1)
-            
-        norm_fv_paths, normalize_time = normalize_features.main(images,
-                train_test_list, experiment_folder, node_name, parameters,
-                node_id)
-        execution_time += normalize_time
+        
+        if fused and images is not None:
+            software = normalize_features.import_normalizer(node_name)
+            fused = hasattr(software, "fit") and hasattr(software, "transform")
+        else:
+            fused = False
+        
+        if fused:
+            #The classifier normalizes the images of each split
+            print "Normalizer", node_name, "fused with the classifier"
+            exp_param['fused_normalizer'] = {'name': node_name,
+                                             'parameters': parameters,
+                                             'node_id': node_id}
+        else:
+            norm_fv_paths, normalize_time = normalize_features.main(images,
+                    train_test_list, experiment_folder, node_name, parameters,
+                    node_id, fv_paths)
+            execution_time += normalize_time
 
-        del exp_param['images']
-        exp_param['fv_paths'] = norm_fv_paths
+            if 'images' in exp_param:
+                del exp_param['images']
+            exp_param['fv_paths'] = norm_fv_paths
 
     elif node.tag == "classifier":
         try:
             classes = exp_param['classes']
             train_test_list = exp_param['train_test_list']
             descriptor = exp_param['descriptor']
-            try:
-                fv_paths = exp_param['fv_paths']
-                del exp_param['fv_paths']
-            except:
+            fused_normalizer = None
+            images = None
+            if 'fused_normalizer' in exp_param:
+                fused_normalizer = exp_param['fused_normalizer']
+                del exp_param['fused_normalizer']
                 images = exp_param['images']
-                fv_paths = util.save_file_extract(images, train_test_list,
-                        experiment_folder)
+                fv_paths = None
+            else:
+                try:
+                    fv_paths = exp_param['fv_paths']
+                    del exp_param['fv_paths']
+                except:
+                    images = exp_param['images']
+                    fv_paths = util.save_file_extract(images, train_test_list,
+                            experiment_folder)
         except:
             print "\n\tMissing Input. Exiting."
             sys.exit(1)
         
         images, classes_list, classify_time = classify.main(fv_paths,
                 classes.keys(), train_test_list, experiment_folder, node_name,
-                parameters, descriptor, node_id)
+                parameters, descriptor, node_id, images, fused_normalizer)
         execution_time += classify_time
 
         exp_param['images'] = images
@@ -396,8 +427,17 @@ def process_node(xml, node, previous, experiment_folder):
             list_previous.append(fusion_dict[node_in])
         previous = list_previous
 
+    # A normalizer with a single classifier as child is executed by the
+    # classifier, split by split, instead of writing all the splits first.
+    fused = False
+    if node.tag == "normalizer" and len(list_out_links) == 1:
+        for element in xml.getroot().getchildren():
+            if element.get("id") == list_out_links[0]:
+                fused = element.tag == "classifier"
+
     # Save the experiment variables up to the executed node.
-    fusion_dict[node.get("id")] = execute(node, previous, experiment_folder)
+    fusion_dict[node.get("id")] = execute(node, previous, experiment_folder,
+                                          fused)
 
     if not list_out_links:
         return
@@ -129,35 +129,151 @@ def read_fv_file(file_path):
     lines = fv_file.readlines(BUFFER_LIMIT)
     while lines != []:
         for line in lines:
-            line = line.split()
-            
-            end_of_img_path = 0
-            for index in range(len(line)):
-                try:
-                    value = int(line[index])
-                    end_of_img_path = index - 1
-                except:
-                    pass
-            
-            img_path = " ".join(line[0:end_of_img_path + 1])
-            img_num_classes = int(line[end_of_img_path + 1])
-            
-            img_classes = line[end_of_img_path + 2 : end_of_img_path + 2 + img_num_classes]
-            img_classes = ''.join(img_classes)
-            img_classes = literal_eval(img_classes)
-            
-            fv = line[end_of_img_path + 2 + img_num_classes : ]
-            fv = ''.join(fv)
-            fv = fv[1:-1]
-            fv = fv.split(',')
-            fv = map(float, fv)
-            
+            img_path, img_classes, fv = parse_fv_line(line)
             new_images[img_path] = [img_classes, [fv]]
         lines = fv_file.readlines(BUFFER_LIMIT)
     fv_file.close()
     
     return new_images
 
+def iter_fv_file(file_path, batch_size):
+    """
+    Read the file with the feature vectors in batches, without loading the
+    whole file in memory.
+    
+    Parameters
+    ----------
+        file_path : string
+            Path to the file containing the feature vectors of the images of
+            the database.
+        
+        batch_size : int
+            Maximum number of images in each batch.
+    
+    Returns
+    -------
+        batches : generator of list
+            Lists with the tuples (img_path, img_classes, fv) of the next
+            batch_size lines of the file.
+    """
+    
+    batch = []
+    
+    fv_file = open(file_path, "rb")
+    for line in fv_file:
+        if not line.strip():
+            continue
+        batch.append(parse_fv_line(line))
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    fv_file.close()
+    
+    if batch:
+        yield batch
+
+def fv_file_offsets(file_path, batch_size):
+    """
+    Positions in the file with the feature vectors where its batches begin,
+    so they can be read in any order with read_fv_batch.
+    
+    Parameters
+    ----------
+        file_path : string
+            Path to the file containing the feature vectors of the images of
+            the database.
+        
+        batch_size : int
+            Maximum number of images in each batch.
+    
+    Returns
+    -------
+        offsets : list of int
+            Position of the first line of each batch of batch_size lines.
+    """
+    
+    offsets = []
+    lines = 0
+    
+    fv_file = open(file_path, "rb")
+    offset = fv_file.tell()
+    line = fv_file.readline()
+    while line:
+        if line.strip():
+            if lines % batch_size == 0:
+                offsets.append(offset)
+            lines += 1
+        offset = fv_file.tell()
+        line = fv_file.readline()
+    fv_file.close()
+    
+    return offsets
+
+def read_fv_batch(fv_file, offset, batch_size):
+    """
+    Read the batch of the file with the feature vectors that begins at
+    offset, given by fv_file_offsets.
+    
+    Parameters
+    ----------
+        fv_file : file
+            File containing the feature vectors, opened for reading.
+        
+        offset : int
+            Position of the first line of the batch.
+        
+        batch_size : int
+            Maximum number of images in the batch.
+    
+    Returns
+    -------
+        batch : list
+            List with the tuples (img_path, img_classes, fv) of the batch.
+    """
+    
+    batch = []
+    
+    fv_file.seek(offset)
+    line = fv_file.readline()
+    while line and len(batch) < batch_size:
+        if line.strip():
+            batch.append(parse_fv_line(line))
+        if len(batch) < batch_size:
+            line = fv_file.readline()
+    
+    return batch
+
+def parse_fv_line(line):
+    """
+    Split a line of the file with the feature vectors in the image path, the
+    list of classes and the feature vector.
+    """
+    
+    line = line.split()
+    
+    end_of_img_path = 0
+    for index in range(len(line)):
+        try:
+            value = int(line[index])
+            end_of_img_path = index - 1
+        except:
+            pass
+    
+    img_path = " ".join(line[0:end_of_img_path + 1])
+    img_num_classes = int(line[end_of_img_path + 1])
+    
+    img_classes = line[end_of_img_path + 2 : end_of_img_path + 2 + img_num_classes]
+    img_classes = ''.join(img_classes)
+    img_classes = literal_eval(img_classes)
+    
+    fv = line[end_of_img_path + 2 + img_num_classes : ]
+    fv = ''.join(fv)
+    fv = fv[1:-1]
+    fv = fv.split(',')
+    fv = map(float, fv)
+    
+    return img_path, img_classes, fv
+
 def save_file_extract(images, train_test_list, experiment_folder):
     """
     Create the files of the extraction in case that the experiment does not
@@ -84,8 +84,11 @@ def verificate_item(links, type_name, actual_id):
     parameters = []
     for able in list_abletolink:
         list_possible.append(able.text)
+    #Optional parameters can be missing in the experiment XML, as in the
+    #experiments created before the parameter was added to the plugin
     for param in list_parameters:
-        parameters.append(param.attrib['name'])
+        if param.get('optional', 'False') != 'True':
+            parameters.append(param.attrib['name'])
     
     #Visit every tag 'link' in the experiment XML to find the ID that is
     #been verified
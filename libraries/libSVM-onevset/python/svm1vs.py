@@ -43,6 +43,9 @@ class svm_node(Structure):
 	_fields_ = genFields(_names, _types)
 
 def gen_svm_nodearray(xi, feature_max=None, issparse=None):
+	# Row of a NodeMatrix (classifiers/SVM/svmnode.py), already built.
+	if isinstance(xi, POINTER(svm_node)):
+		return xi, 0
 	if isinstance(xi, dict):
 		index_range = xi.keys()
 	elif isinstance(xi, (list, tuple)):
@@ -85,7 +88,7 @@ class svm_problem(Structure):
 			tmp_xi, tmp_idx = gen_svm_nodearray(xi)
 			x_space += [tmp_xi]
 			max_idx = max(max_idx, tmp_idx)
-		self.n = max_idx
+		self.n = max(max_idx, getattr(x, 'max_index', 0))
 
 		self.y = (c_double * l)()
 		for i, yi in enumerate(y): self.y[i] = yi
@@ -47,6 +47,9 @@ class svm_node(Structure):
 		return '%d:%g' % (self.index, self.value)
 
 def gen_svm_nodearray(xi, feature_max=None, isKernel=None):
+	# Row of a NodeMatrix (classifiers/SVM/svmnode.py), already built.
+	if isinstance(xi, POINTER(svm_node)):
+		return xi, 0
 	if isinstance(xi, dict):
 		index_range = xi.keys()
 	elif isinstance(xi, (list, tuple)):
@@ -89,7 +92,7 @@ class svm_problem(Structure):
 			tmp_xi, tmp_idx = gen_svm_nodearray(xi,isKernel=isKernel)
 			x_space += [tmp_xi]
 			max_idx = max(max_idx, tmp_idx)
-		self.n = max_idx
+		self.n = max(max_idx, getattr(x, 'max_index', 0))
 
 		self.y = (c_double * l)()
 		for i, yi in enumerate(y): self.y[i] = yi
@@ -39,20 +39,75 @@
 from __future__ import division #import to change the operation '/' to return
                                 #a float
 import os
-from numpy import array
-from sklearn.preprocessing import MinMaxScaler
+import sys
+
+#Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+from running_stats import RunningStats, float_block
 
 #CONSTANTS
 POS_CLASSES = 0
 POS_FV = 1
 INDEX_ZERO = 0
 
+def partial_fit(batch, parameters, train_param):
+    """
+    Function that accumulates the normalization parameters of a batch of
+    feature vectors of the training set.
+    
+    Updates the minimum and maximum of each position of the feature vectors,
+    given as the rows of batch.
+    """
+    
+    train_param.setdefault('Stats', RunningStats()).update(batch)
+    
+    return train_param
+
+def fit(matrix, parameters):
+    """
+    Function that computes the normalization parameters of a training set.
+    
+    Calculates the minimum and maximum of each position of the feature vectors,
+    given as the rows of matrix.
+    """
+    
+    print "\t\tCalculate Scale"
+    
+    return partial_fit(matrix, parameters, {})
+
+def transform(matrix, parameters, train_param):
+    """
+    Function that performs the normalization of a set of feature vectors.
+    
+    Normalize in place each row of matrix in the interval defined by the user.
+    Positions with the same value in the whole training set are mapped to the
+    minimum.
+    """
+    
+    #Get values of min and max from the parameters
+    new_min = float(parameters['Min'])
+    new_max = float(parameters['Max'])
+    
+    data_min = train_param['Stats'].min
+    data_range = train_param['Stats'].max - data_min
+    data_range[data_range == 0] = 1.0
+    
+    matrix = float_block(matrix)
+    matrix -= data_min
+    matrix *= (new_max - new_min) / data_range
+    matrix += new_min
+    
+    return matrix
+
 def normalize(img_path, images, images_set, pos_train_test, parameters, method,
         train_param):
     """
     Function that performs the normalization of a feature vector.
     
-    Normalize the feature vector in the interval defined by the user.
+    Per-image interface, kept for compatibility. The scale is fitted by fit
+    when it is not in train_param, and the feature vector is normalized by
+    transform.
     """
     
     print "Normalizer: MIN MAX"
@@ -68,25 +123,17 @@ def normalize(img_path, images, images_set, pos_train_test, parameters, method,
           "being normalized by process", os.getpid()
     
     # Performs the normalization ---------------------------------------------
-    #Get values of min and max from the parameters
-    new_min = parameters['Min']
-    new_max = parameters['Max']
-    
     #If the execution is of the train step, get the train_param, if it exists
-    if 'Scale' not in train_param:
-        scale = MinMaxScaler([new_min, new_max])
-        scale = train_min_max(images, images_set, pos_train_test, scale)
-        train_param['Scale'] = scale
-    else:
-        print "\t\tGet Scale"
-        scale = train_param['Scale']
-    
-    fv_norm = scale.transform(array(img_fv)).tolist()
+    if 'Stats' not in train_param:
+        train_param.update(train_min_max(images, images_set, pos_train_test,
+                parameters))
+    
+    fv_norm = transform([img_fv], parameters, train_param)[INDEX_ZERO].tolist()
     #-------------------------------------------------------------------------
     
     return img_path, len(img_classes), img_classes, fv_norm, train_param
 
-def train_min_max(images, images_set, pos_train_test, scale):
+def train_min_max(images, images_set, pos_train_test, parameters):
     """
     Fit the training features in the scale.
     """
@@ -98,9 +145,6 @@ def train_min_max(images, images_set, pos_train_test, scale):
             training.append(images[img][POS_FV][pos_train_test])
         except:
             training.append(images[img][POS_FV][INDEX_ZERO])
-    training = array(training)
     
     #Performs the scale fit
-    scale = scale.fit(training)
-    
-    return scale
+    return fit(training, parameters)
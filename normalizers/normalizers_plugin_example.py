@@ -41,9 +41,40 @@ import os
 #Framework imports
 
 
+def fit(matrix, parameters):
+    """
+    Function that computes the normalization parameters of a training set.
+    
+    Each row of matrix is the feature vector of an image of the training set.
+    Returns a dictionary with the parameters used by transform.
+    """
+    
+    train_param = {}
+    
+    # Calculates the parameters ----------------------------------------------
+    
+    #-------------------------------------------------------------------------
+    
+    return train_param
+
+def transform(matrix, parameters, train_param):
+    """
+    Function that performs the normalization of a set of feature vectors.
+    
+    Returns the normalized rows of matrix, in the same order.
+    """
+    
+    # Performs the normalization ---------------------------------------------
+    
+    #-------------------------------------------------------------------------
+    
+    return matrix_norm
+
 def normalize(img_path, images, images_set, parameters):
     """
     Function that performs the normalization of a feature vector.
+    
+    Per-image interface, used only by plugins without fit and transform.
     """
     
     print "Normalizer: EXAMPLE"
@@ -0,0 +1,163 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+#Future
+from __future__ import division
+
+#Python imports
+import numpy
+
+#Constants
+DTYPE = numpy.float32
+
+def float_block(matrix):
+    """
+    Return matrix as a contiguous and writable block of DTYPE, which the
+    transforms of the normalizers modify in place. Only a matrix with other
+    type or layout, or a list, is copied.
+    """
+    
+    return numpy.require(matrix, dtype=DTYPE, requirements=['C', 'A', 'W'])
+
+class RunningStats(object):
+    """
+    Statistics of the columns of a set of feature vectors, accumulated over
+    batches of rows.
+    
+    Keeps the number of rows, the mean and the sum of squared deviations
+    (Welford), the minimum, the maximum and the document frequency (number of
+    rows with a value different from zero) of each column. Statistics of
+    different batches, or of shards computed by different processes, are
+    combined with merge, which gives the same result as computing them over all
+    the rows at once.
+    """
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = None
+        self.m2 = None
+        self.min = None
+        self.max = None
+        self.df = None
+    
+    def update(self, batch):
+        """
+        Accumulate the statistics of a batch of rows.
+        """
+        
+        batch = numpy.asarray(batch)
+        if batch.ndim == 1:
+            batch = batch.reshape(1, -1)
+        if batch.shape[0] == 0:
+            return self
+        
+        #The statistics are accumulated in double precision
+        batch_stats = RunningStats()
+        batch_stats.count = batch.shape[0]
+        batch_stats.mean = batch.mean(axis=0, dtype=numpy.float64)
+        deviation = batch - batch_stats.mean
+        deviation **= 2
+        batch_stats.m2 = deviation.sum(axis=0)
+        batch_stats.min = batch.min(axis=0).astype(numpy.float64)
+        batch_stats.max = batch.max(axis=0).astype(numpy.float64)
+        batch_stats.df = (batch != 0).sum(axis=0)
+        
+        return self.merge(batch_stats)
+    
+    def merge(self, other):
+        """
+        Combine the statistics of other into these statistics (Chan et al.).
+        """
+        
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count = other.count
+            self.mean = other.mean.copy()
+            self.m2 = other.m2.copy()
+            self.min = other.min.copy()
+            self.max = other.max.copy()
+            self.df = other.df.copy()
+            return self
+        
+        if self.mean.shape != other.mean.shape:
+            raise ValueError("Feature vectors with different sizes: %d and %d"
+                    % (self.mean.shape[0], other.mean.shape[0]))
+        
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * (other.count / count)
+        self.m2 = self.m2 + other.m2 + \
+                delta ** 2 * (self.count * other.count / count)
+        self.min = numpy.minimum(self.min, other.min)
+        self.max = numpy.maximum(self.max, other.max)
+        self.df = self.df + other.df
+        self.count = count
+        
+        return self
+    
+    def variance(self):
+        """
+        Population variance of each column.
+        """
+        
+        return self.m2 / self.count
+    
+    def std(self):
+        """
+        Population standard deviation of each column.
+        """
+        
+        return numpy.sqrt(self.variance())
+
+def normalize_rows(matrix, norm):
+    """
+    Divide in place each row of matrix by its 'l1' or 'l2' norm. Rows with
+    norm zero, or a norm None, leave the matrix unchanged.
+    """
+    
+    if norm == 'l1':
+        row_norm = numpy.abs(matrix).sum(axis=1)
+    elif norm == 'l2':
+        row_norm = numpy.sqrt(numpy.einsum('ij,ij->i', matrix, matrix))
+    else:
+        return matrix
+    row_norm[row_norm == 0] = 1.0
+    matrix /= row_norm[:, numpy.newaxis]
+    
+    return matrix
@@ -41,28 +41,59 @@ from __future__ import division #import to change the operation '/' to return
 
 #Python imports
 import os
-from sklearn.feature_extraction.text import TfidfTransformer
+import sys
 
 #Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+from running_stats import normalize_rows, float_block
     
 #CONSTANTS
 POS_CLASSES = 0
 POS_FV = 1
 ZERO_INDEX = 0
 
-def normalize(img_path, images, images_set, pos_train_test, parameters, method,
-        train_param):
+def partial_fit(batch, parameters, train_param):
     """
-    Function that performs the normalization of a feature vector.
+    Function that accumulates the normalization parameters of a batch of
+    feature vectors of the training set.
     
-    For each item in the feature vector, calculate the term frequency of this 
-    item in the feature vector, and return the feature with the term frequency
-    of an item in the place of that item.
+    The term frequency does not depend on the training set, so there is no
+    parameter to accumulate.
+    """
+    
+    return train_param
+
+def fit(matrix, parameters):
+    """
+    Function that computes the normalization parameters of a training set.
+    
+    The term frequency does not depend on the training set, so there is no
+    parameter to calculate.
+    """
+    
+    return {}
+
+def transform(matrix, parameters, train_param):
+    """
+    Function that performs the normalization of a set of feature vectors.
+    
+    Replace in place each item of the rows of matrix by its term frequency.
     """
     
     #Get parameters
     tfidf_norm = norm(parameters['Norm'])
     
+    return normalize_rows(float_block(matrix), tfidf_norm)
+
+def normalize(img_path, images, images_set, pos_train_test, parameters, method,
+        train_param):
+    """
+    Function that performs the normalization of a feature vector.
+    
+    Per-image interface, kept for compatibility with transform.
+    """
+    
     print "Normalizer: TERM FREQUENCY"
     
     #Get the list of classes and the feature vector of the img_path
@@ -76,8 +107,7 @@ def normalize(img_path, images, images_set, pos_train_test, parameters, method,
             "being normalized by process", os.getpid()
     
     # Performs the normalization --------------------------------------------- 
-    transformer = TfidfTransformer(norm=tfidf_norm, use_idf=False)
-    fv_norm = transformer.transform(img_fv).toarray().tolist()[0]
+    fv_norm = transform([img_fv], parameters, train_param)[ZERO_INDEX].tolist()
     #-------------------------------------------------------------------------
     
     return img_path, len(img_classes), img_classes, fv_norm, train_param
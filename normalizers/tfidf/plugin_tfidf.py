@@ -41,28 +41,74 @@ from __future__ import division #import to change the operation '/' to return
 
 #Python imports
 import os
-from sklearn.feature_extraction.text import TfidfTransformer
+import sys
+import numpy
+
+#Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+from running_stats import RunningStats, normalize_rows, float_block
 
 #Constants
 POS_CLASSES = 0
 POS_FV = 1
 ZERO_INDEX = 0
 
-def normalize(img_path, images, images_set, pos_train_test, parameters, method,
-        train_param):
+def partial_fit(batch, parameters, train_param):
     """
-    Function that performs the normalization of a feature vector.
+    Function that accumulates the normalization parameters of a batch of
+    feature vectors of the training set.
+    
+    Updates the number of feature vectors in which each item appears, given the
+    feature vectors as the rows of batch.
+    """
+    
+    train_param.setdefault('Stats', RunningStats()).update(batch)
+    
+    return train_param
+
+def fit(matrix, parameters):
+    """
+    Function that computes the normalization parameters of a training set.
+    
+    Calculate the document frequency of each item in the feature vectors,
+    given as the rows of matrix.
+    """
+    
+    print "\t\tCalculate IDF"
+    
+    return partial_fit(matrix, parameters, {})
+
+def transform(matrix, parameters, train_param):
+    """
+    Function that performs the normalization of a set of feature vectors.
     
-    For each item in the feature vector, calculate the term frequency of this
-    item in the feature vector and the inverse document frequency of the item
-    in the set of feature vectors, and return the feature with the term
-    frequency times the inverse document frequency of an item in the place of
-    that item.
+    Replace in place each item of the rows of matrix by its term frequency
+    times the smoothed inverse document frequency, log((1 + n) / (1 + df)) + 1,
+    and normalize the rows with the norm defined by the user.
     """
     
     #Get parameters
     tfidf_norm = norm(parameters['Norm'])
     
+    stats = train_param['Stats']
+    idf = numpy.log((1.0 + stats.count) / (1.0 + stats.df)) + 1.0
+    
+    matrix = float_block(matrix)
+    matrix *= idf
+    
+    return normalize_rows(matrix, tfidf_norm)
+
+def normalize(img_path, images, images_set, pos_train_test, parameters, method,
+        train_param):
+    """
+    Function that performs the normalization of a feature vector.
+    
+    Per-image interface, kept for compatibility. The inverse document frequency
+    is calculated by fit when it is not in train_param, and the feature vector
+    is normalized by transform.
+    """
+    
     print "Normalizer: TERM FREQUENCY - INVERSE DOCUMENT FREQUENCY"
     
     img_classes = images[img_path][POS_CLASSES]
@@ -75,7 +121,7 @@ def normalize(img_path, images, images_set, pos_train_test, parameters, method,
           "being normalized by process", os.getpid()
     
     # Performs the normalization ---------------------------------------------
-    if 'IDF' not in train_param:
+    if 'Stats' not in train_param:
         list_train = []
         for image in images_set:
             try:
@@ -83,17 +129,10 @@ def normalize(img_path, images, images_set, pos_train_test, parameters, method,
             except:
                 list_train.append(images[image][POS_FV][ZERO_INDEX])
         
-        transformer = TfidfTransformer(norm=tfidf_norm)
-        print "\t\tCalculate IDF"
-        transformer.fit(list_train)
-        
-        train_param['IDF'] = transformer
-    else:
-        print "\t\tGet IDF"
-        transformer = train_param['IDF']
+        train_param.update(fit(list_train, parameters))
     
     #variable with the feature vector normalized
-    fv_norm = transformer.transform(img_fv).toarray().tolist()[ZERO_INDEX]
+    fv_norm = transform([img_fv], parameters, train_param)[ZERO_INDEX].tolist()
     #-------------------------------------------------------------------------
     
     return img_path, len(img_classes), img_classes, fv_norm, train_param
@@ -40,22 +40,70 @@ from __future__ import division
 
 #Python imports
 import os
-import numpy
-from scipy import stats
+import sys
+
+#Framework imports
+dirname = os.path.abspath(os.path.dirname(__file__))
+sys.path.append(os.path.dirname(dirname))
+from running_stats import RunningStats, float_block
     
 #CONSTANTS
 POS_CLASSES = 0
 POS_FV = 1
 ZERO_INDEX = 0
 
+def partial_fit(batch, parameters, train_param):
+    """
+    Function that accumulates the normalization parameters of a batch of
+    feature vectors of the training set.
+    
+    Updates the running mean and standard deviation of each position of the
+    feature vectors, given as the rows of batch.
+    """
+    
+    train_param.setdefault('Stats', RunningStats()).update(batch)
+    
+    return train_param
+
+def fit(matrix, parameters):
+    """
+    Function that computes the normalization parameters of a training set.
+    
+    Calculates the sample mean and standard deviation of each position of the
+    feature vectors, given as the rows of matrix.
+    """
+    
+    print "\t\tCalculate Mean and Standard Deviation"
+    
+    return partial_fit(matrix, parameters, {})
+
+def transform(matrix, parameters, train_param):
+    """
+    Function that performs the normalization of a set of feature vectors.
+    
+    Calculates in place the z-score of each row of matrix with the parameters
+    returned by fit. Positions with standard deviation zero in the training set
+    are only centered, so every feature vector keeps its size.
+    """
+    
+    running = train_param['Stats']
+    deviation = running.std()
+    deviation[deviation == 0] = 1.0
+    
+    matrix = float_block(matrix)
+    matrix -= running.mean
+    matrix /= deviation
+    
+    return matrix
+
 def normalize(img_path, images, images_set, pos_train_test, parameters, method,
         train_param):
     """
     Function that performs the normalization of a feature vector.
     
-    Calculates the z-score of each position in the feature vector, relative to
-    the sample mean and standard deviation of that position in all feature
-    vectors.
+    Per-image interface, kept for compatibility. The parameters of the training
+    set are calculated by fit when they are not in train_param, and the feature
+    vector is normalized by transform.
     """
 
     print "Normalizer: ZSCORE"
@@ -65,7 +113,7 @@ def normalize(img_path, images, images_set, pos_train_test, parameters, method,
     try:
         img_fv = images[img_path][POS_FV][pos_train_test]
     except:
-        img_fv = images[img_path][POS_FV][0]
+        img_fv = images[img_path][POS_FV][ZERO_INDEX]
 
     print "\tFeature vector of image", img_path, \
           "being normalized by process", os.getpid()
@@ -73,7 +121,7 @@ def normalize(img_path, images, images_set, pos_train_test, parameters, method,
     # Performs the normalization ---------------------------------------------
     #If the parameters of normalization don't exists, calculate the mean and
     #   the standard deviation of the feature vectors in the train set
-    if 'Mean' not in train_param:
+    if 'Stats' not in train_param:
         list_train = []
         for image in images_set:
             try:
@@ -81,20 +129,9 @@ def normalize(img_path, images, images_set, pos_train_test, parameters, method,
             except:
                 list_train.append(images[image][POS_FV][ZERO_INDEX])
         
-        mean_list = numpy.mean(list_train, axis=0)
-        std_list = numpy.std(list_train, axis=0)
-        
-        train_param['Mean'] = mean_list
-        train_param['Deviation'] = std_list
-    #If the parameters of normalization already exists, load them
-    else:
-        print "\t\tGet Mean and Standard Deviation"
-        mean_list = train_param['Mean']
-        std_list = train_param['Deviation']
+        train_param.update(fit(list_train, parameters))
     
-    fv_norm = [(img_fv[index] - mean_list[index]) / std_list[index]
-            for index in range(len(img_fv))]
-    fv_norm = [fv_item for fv_item in fv_norm if not numpy.isnan(fv_item)]
+    fv_norm = transform([img_fv], parameters, train_param)[ZERO_INDEX].tolist()
     #-------------------------------------------------------------------------
 
     return img_path, len(img_classes), img_classes, fv_norm, train_param
@@ -0,0 +1,73 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+###############################################################################
+# This file is part of Kuaa.
+#
+# Kuaa is a framework for the automation of machine learning experiments.
+#
+# It provides a workflow-based standardized environment for easy evaluation of
+# feature descriptors, normalization techniques, classifiers and fusion
+# approaches.
+#
+# Techniques of each kind can be easily plugged into the framework as they can
+# be implemented as plugins, with standardized inputs and outputs.
+# The framework also provides a recommendation module in order to help
+# inexperienced researchers in choosing adequate or alternative techniques for
+# experiments.
+#
+# Copyright (C) 2016 under the GNU General Public License Version 3.
+#
+# This framework was developed during the research collaboration of Institute
+# of Computing (University of Campinas, Brazil) and Samsung Eletrônica da
+# Amazônia Ltda. entitled "Pattern recognition and classification by feature
+# engineering, *-fusion, open-set recognition, and meta-recognition", which was
+# sponsored by Samsung.
+#
+# This framework is provided "as is" without any guarantees or warranty. The
+# authors make no warranties, express of implied, that they are free of error,
+# or they will meet your requirements for any particular application.
+#
+# The framework was developed to be used for educational and research purposes.
+# It is expressly prohibited to use for any commercial purposes.
+#
+# You should have received a copy of the GNU General Public License along with
+# this program.  If not, see <http://www.gnu.org/licenses/>.
+###############################################################################
+
+
+#Python import
+import os
+import argparse
+
+#Framework import
+from framework import predict
+
+if __name__ == "__main__":
+
+    # Argument parser
+    parser = argparse.ArgumentParser(description="Kuaa Framework - Prediction "
+                                     "with the models of an experiment")
+    parser.add_argument('experiment_folder',
+                        help="Folder of the experiment, with its XML file.")
+    parser.add_argument('node_id', help="ID of the classifier node.")
+    parser.add_argument('input_path',
+                        help="File with the feature vectors, in the format "
+                        "of the framework, or list of images with --images.")
+    parser.add_argument('output_path',
+                        help="File where the predicted classes are written.")
+    parser.add_argument('--images', action='store_true',
+                        help="The input is a list of images, one per line.")
+    parser.add_argument('--iteration', type=int, default=0,
+                        help="Iteration of the experiment whose models are "
+                        "used.")
+    parser.add_argument('--train-test', type=int, default=0, dest='pos',
+                        help="Train/test split whose model is used.")
+    parser.add_argument('--batch-size', type=int, default=predict.BATCH_SIZE,
+                        help="Number of images predicted at a time.")
+    
+    args = parser.parse_args()
+    
+    predict.main(os.path.abspath(args.experiment_folder) + os.sep,
+                 args.node_id, args.input_path, args.output_path, args.images,
+                 args.iteration, args.pos, args.batch_size)